@@ -0,0 +1,224 @@
+"""
+Análisis global por línea de comandos, sin la interfaz de Streamlit.
+
+Corre el análisis de todas las instancias (iterar_analisis_general, la versión generadora de
+correr_analisis_general) y va escribiendo los arcos de cada instancia a disco apenas termina, así
+la memoria no depende de la cantidad de instancias. Al final escribe las tablas de resumen.
+Solo importa tdvrp_analyzer (pandas/numpy); pyarrow y openpyxl se cargan según el formato pedido.
+
+Con --corrida DIR el análisis se guarda por instancia en DIR (corridas.py) antes de exportar: si se corta,
+al volver a ejecutar el mismo comando se reanuda desde las instancias que faltaban.
+
+Uso:
+    python analisis_batch.py <instancias dir|zip> <solutions.json> --salida resultados/ --formato parquet --workers 4
+    python analisis_batch.py <instancias dir|zip> <solutions.json> --corrida corridas/completa --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import tdvrp_analyzer as core
+from cache_resultados import CacheResultados, cache_por_defecto
+from corridas import CorridaAnalisis
+from resumen_global import ResumenGlobal
+
+
+FORMATOS = ['parquet', 'arrow', 'csv', 'xlsx']
+
+
+class EscritorArcos:
+    '''
+    escribe la tabla de arcos por partes (una por instancia) en un único archivo:
+        - parquet: un row group por instancia (pyarrow.parquet.ParquetWriter)
+        - arrow: formato IPC de streaming (.arrows), que admite diccionarios distintos por lote
+        - csv: se agrega al final del archivo
+        - xlsx: hoja Todos_los_Arcos de un EscritorExcelStreaming (junto con las hojas de resumen)
+    '''
+
+    def __init__(self, formato: str, directorio: str):
+        self.formato = formato
+        self.filas = 0
+        self._escritor = None
+        self._esquema = None
+        extension = {'parquet': '.parquet', 'arrow': '.arrows', 'csv': '.csv', 'xlsx': '.xlsx'}[formato]
+        nombre = 'analisis_global' if formato == 'xlsx' else 'Todos_los_Arcos'
+        self.ruta = os.path.join(directorio, nombre + extension)
+        if formato == 'xlsx':
+            self._escritor = core.EscritorExcelStreaming(self.ruta)
+
+    def agregar(self, df) -> None:
+        if df.empty:
+            return
+        if self.formato == 'csv':
+            df.to_csv(self.ruta, mode='a' if self.filas else 'w', header=not self.filas, index=False)
+        elif self.formato == 'xlsx':
+            self._escritor.agregar_filas('Todos_los_Arcos', df)
+        else:
+            self._agregar_arrow(df)
+        self.filas += len(df)
+
+    def _agregar_arrow(self, df) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tabla = core.tabla_arrow(df).replace_schema_metadata(None)
+        if self._escritor is None:
+            self._esquema = tabla.schema
+            if self.formato == 'parquet':
+                self._escritor = pq.ParquetWriter(self.ruta, self._esquema)
+            else:
+                self._escritor = pa.ipc.new_stream(self.ruta, self._esquema)
+        elif tabla.schema != self._esquema:
+            tabla = tabla.cast(self._esquema)
+        self._escritor.write_table(tabla)
+
+    def cerrar(self, tablas_resumen: dict) -> list:
+        '''cierra la tabla de arcos y escribe las tablas de resumen; devuelve las rutas escritas'''
+        directorio = os.path.dirname(self.ruta)
+        if self.formato == 'xlsx':
+            for nombre, tabla in tablas_resumen.items():
+                self._escritor.agregar_tabla(nombre, tabla)
+            self._escritor.cerrar()
+            return [self.ruta]
+
+        if self._escritor is not None:
+            self._escritor.close()
+        rutas = [self.ruta] if self.filas else []
+        if self.formato == 'csv':
+            for nombre, tabla in tablas_resumen.items():
+                rutas.append(os.path.join(directorio, nombre + '.csv'))
+                tabla.to_csv(rutas[-1], index=False)
+        else:
+            rutas.extend(core.export_tablas_columnar(tablas_resumen, directorio, self.formato).values())
+        return rutas
+
+
+def _duracion(segundos: float) -> str:
+    minutos, segundos = divmod(int(round(segundos)), 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas}h{minutos:02d}m{segundos:02d}s" if horas else f"{minutos}m{segundos:02d}s" if minutos else f"{segundos}s"
+
+
+def correr(instancias: str, soluciones: str, salida: str, epsilon: float = 0.1, cant_muestras: int = 10,
+           workers: int = 1, formato: str = 'parquet', silencioso: bool = False, corrida: str = None,
+           cache: CacheResultados = None) -> int:
+    '''
+    corre el análisis global y escribe los resultados en el directorio salida.
+    con corrida, primero analiza (o reanuda) y guarda cada instancia en ese directorio, y después
+    exporta leyendo los resultados de disco. con cache, los pares sin cambios se leen de ella.
+    devuelve la cantidad de instancias con error (o sin analizar, si la corrida se interrumpió).
+    '''
+    def log(mensaje: str) -> None:
+        if not silencioso:
+            print(mensaje, file=sys.stderr, flush=True)
+
+    inicio = time.perf_counter()
+    paired_data = core.cargar_pares(instancias, soluciones)
+    log(f"{len(paired_data)} pares instancia-solución cargados en {time.perf_counter() - inicio:.1f}s "
+        f"(epsilon={epsilon}, cant_muestras={cant_muestras}, workers={workers}, formato={formato})")
+
+    inicio_analisis = time.perf_counter()
+
+    def log_avance(paso: dict, total: int, previas: int = 0) -> None:
+        transcurrido = time.perf_counter() - inicio_analisis
+        restante = transcurrido / paso['procesadas'] * (paso['total'] - paso['procesadas'])
+        avance = f"[{previas + paso['procesadas']}/{total}] {paso['instance_name']}"
+        if paso['error'] is not None:
+            log(f"{avance}: ERROR {paso['error']}")
+        else:
+            log(f"{avance}: {len(paso['instance_df'])} arcos "
+                f"(transcurrido {_duracion(transcurrido)}, restante ~{_duracion(restante)})")
+
+    if corrida is not None:
+        registro = CorridaAnalisis(corrida, epsilon, cant_muestras)
+        previas = len(registro.completas(paired_data))
+        if previas:
+            log(f"Reanudando la corrida en {corrida}: {previas} de {len(paired_data)} instancias ya estaban completas")
+        registro.ejecutar(paired_data, workers, al_avanzar=lambda paso: log_avance(paso, len(paired_data), previas),
+                          cache=cache)
+
+        pasos = pasos_guardados(registro.iterar_resultados(paired_data))
+    else:
+        def pasos_en_vivo():
+            for paso in core.iterar_analisis_general(paired_data, epsilon, cant_muestras, workers, cache=cache):
+                log_avance(paso, len(paired_data))
+                yield paso
+        pasos = pasos_en_vivo()
+
+    exportadas, filas, global_metrics, rutas = exportar(pasos, salida, formato)
+    errores = len(paired_data) - exportadas
+
+    log(f"Análisis terminado en {_duracion(time.perf_counter() - inicio)}: "
+        f"{exportadas} instancias, {filas} arcos, {errores} con error")
+    log_resultados(log, global_metrics, rutas)
+    return errores
+
+
+def pasos_guardados(resultados):
+    '''
+    convierte (instance_name, instance_df, instance_summary) ya calculados (de una corrida o de una
+    cola de trabajo) en pasos como los de iterar_analisis_general, con el ResumenGlobal acumulado.
+    '''
+    resumen = ResumenGlobal()
+    for instance_name, instance_df, instance_summary in resultados:
+        resumen.actualizar(instance_name, instance_summary['instance_type'], instance_df, instance_summary)
+        yield {'instance_name': instance_name, 'instance_df': instance_df, 'error': None, 'resumen': resumen}
+
+
+def exportar(pasos, salida: str, formato: str = 'parquet'):
+    '''
+    escribe en el directorio salida los arcos de cada paso (a medida que llegan) y las tablas de resumen.
+    devuelve (instancias exportadas, arcos escritos, global_metrics, rutas escritas).
+    '''
+    os.makedirs(salida, exist_ok=True)
+    escritor = EscritorArcos(formato, salida)
+    exportadas = 0
+    resumen = None
+    for paso in pasos:
+        if paso['error'] is None:
+            escritor.agregar(paso['instance_df'])
+            exportadas += 1
+        resumen = paso['resumen']
+
+    global_metrics = resumen.metricas_generales() if resumen is not None else {}
+    tablas_resumen = {}
+    if global_metrics:
+        tablas_resumen = core.tablas_analisis_general(None, global_metrics, resumen.datos_comparacion(),
+                                                      incluir_arcos=False)
+    rutas = escritor.cerrar(tablas_resumen)
+    return exportadas, escritor.filas, global_metrics, rutas
+
+
+def log_resultados(log, global_metrics: dict, rutas: list) -> None:
+    if global_metrics:
+        log(f"% óptimos (tiempo): {global_metrics['global_optimal_pct']:.1f}%  "
+            f"% óptimos (distancia): {global_metrics['global_optimal_pct_dist']:.1f}%")
+    for ruta in rutas:
+        log(f"  -> {ruta}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Análisis global de soluciones TDVRP por línea de comandos.")
+    parser.add_argument("instancias", help="directorio o .zip con las instancias (.json)")
+    parser.add_argument("soluciones", help="archivo solutions.json")
+    parser.add_argument("--salida", default="resultados_analisis", help="directorio de salida")
+    parser.add_argument("--epsilon", type=float, default=0.1, help="tolerancia para los intervalos de tiempo")
+    parser.add_argument("--muestras", type=int, default=10, help="muestras por intervalo (cant_muestras)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="procesos en paralelo")
+    parser.add_argument("--formato", choices=FORMATOS, default='parquet', help="formato de salida")
+    parser.add_argument("--corrida", help="directorio de la corrida con checkpoints; si ya existe, se reanuda")
+    parser.add_argument("--cache", help="directorio de la caché de resultados (ver cache_resultados.py; "
+                                        "por defecto, la variable de entorno TDVRP_CACHE_DIR)")
+    parser.add_argument("--silencioso", action="store_true", help="no mostrar el avance")
+    args = parser.parse_args(argv)
+
+    cache = CacheResultados(args.cache) if args.cache else cache_por_defecto()
+    errores = correr(args.instancias, args.soluciones, args.salida, args.epsilon, args.muestras,
+                     args.workers, args.formato, args.silencioso, args.corrida, cache)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
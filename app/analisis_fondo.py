@@ -0,0 +1,176 @@
+"""
+Análisis global en segundo plano, para la app de Streamlit.
+
+El análisis corre en un hilo de un GestorAnalisis (en la app, uno solo por proceso vía st.cache_resource),
+así sobrevive a los reruns del script: la página solo consulta el avance de la tarea (avance()) y puede
+cancelarla. Mientras tanto se puede seguir usando el resto de la app.
+No depende de Streamlit.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import pandas as pd
+
+import tdvrp_analyzer as core
+from cache_resultados import CacheResultados
+from corridas import CorridaAnalisis, combinar_resultados
+
+
+INTERVALO_PARCIALES = 1.0
+MAX_TAREAS_TERMINADAS = 8
+
+
+class TareaAnalisisGlobal:
+    '''
+    una corrida del análisis global enviada a un GestorAnalisis.
+    estado: "en_cola", "en_curso", "completa", "cancelada" o "error".
+    el resultado (con estado "completa") es (global_df, global_metrics, estado_global) como en
+    actualizar_analisis_general.
+    si se cancela, estado_parcial guarda lo ya calculado, para pasarlo como estado al próximo enviar.
+    '''
+
+    def __init__(self, parametros: Dict):
+        self.id = uuid.uuid4().hex
+        self.parametros = parametros
+        self.creada = time.time()
+        self.estado = 'en_cola'
+        self.resultado = None
+        self.estado_parcial = None
+        self.error = None
+        self._procesadas = 0
+        self._total = 0
+        self._instancia = None
+        self._deciles_parciales = pd.DataFrame()
+        self._ultimo_parcial = 0.0
+        self._inicio = None
+        self._fin = None
+        self._cancelar = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def terminada(self) -> bool:
+        return self.estado in ('completa', 'cancelada', 'error')
+
+    def cancelar(self) -> None:
+        '''pide la cancelación: la tarea se detiene al terminar la instancia en curso'''
+        self._cancelar.set()
+
+    def _registrar(self, paso: Dict) -> None:
+        # corre en el hilo de la tarea: los agregados parciales se calculan acá (a lo sumo uno por
+        # INTERVALO_PARCIALES) para que la página no lea el ResumenGlobal mientras se modifica
+        ahora = time.monotonic()
+        deciles = None
+        if ahora - self._ultimo_parcial >= INTERVALO_PARCIALES or paso['procesadas'] == paso['total']:
+            self._ultimo_parcial = ahora
+            deciles = paso['resumen'].datos_comparacion()['deciles_by_type']
+        with self._lock:
+            self._procesadas = paso['procesadas']
+            self._total = paso['total']
+            self._instancia = paso['instance_name']
+            if deciles is not None:
+                self._deciles_parciales = deciles
+
+    def avance(self) -> Dict:
+        '''estado, procesadas, total, instancia (la última terminada), segundos y deciles_parciales'''
+        with self._lock:
+            fin = self._fin if self._fin is not None else time.time()
+            return {
+                'estado': self.estado,
+                'procesadas': self._procesadas,
+                'total': self._total,
+                'instancia': self._instancia,
+                'segundos': fin - self._inicio if self._inicio is not None else 0.0,
+                'deciles_parciales': self._deciles_parciales,
+                'error': self.error,
+            }
+
+
+class GestorAnalisis:
+    '''ejecuta tareas de análisis global en hilos propios (max_tareas a la vez; el resto espera en cola)'''
+
+    def __init__(self, max_tareas: int = 1):
+        self._executor = ThreadPoolExecutor(max_workers=max_tareas, thread_name_prefix='analisis-global')
+        self._tareas: Dict[str, TareaAnalisisGlobal] = {}
+        self._lock = threading.Lock()
+
+    def enviar(self, paired_data: Dict, epsilon: float = 0.1, cant_muestras: int = 10, workers: int = 1,
+               estado: Dict = None, directorio_corrida: str = None, con_perfil: bool = False,
+               cache: Optional[CacheResultados] = None) -> TareaAnalisisGlobal:
+        '''
+        encola un análisis global y devuelve la tarea sin esperar a que termine.
+
+        recibe:
+            paired_data, epsilon, cant_muestras, workers: igual que en correr_analisis_general
+            estado: estado de una corrida anterior (análisis incremental, ver actualizar_analisis_general)
+            directorio_corrida: si se indica, la corrida se guarda con checkpoints ahí (ver corridas.py)
+            con_perfil: perfilar cada instancia (perfilado.py); es de la tarea, no del proceso
+            cache: caché de resultados por par (cache_resultados.py); también es de la tarea
+        '''
+        tarea = TareaAnalisisGlobal({'epsilon': epsilon, 'cant_muestras': cant_muestras, 'workers': workers,
+                                     'directorio_corrida': directorio_corrida, 'con_perfil': con_perfil,
+                                     'cache': cache})
+        with self._lock:
+            self._tareas[tarea.id] = tarea
+            self._descartar_viejas()
+        self._executor.submit(self._correr, tarea, paired_data, estado)
+        return tarea
+
+    def obtener(self, id_tarea: Optional[str]) -> Optional[TareaAnalisisGlobal]:
+        with self._lock:
+            return self._tareas.get(id_tarea)
+
+    def _descartar_viejas(self) -> None:
+        # las tareas terminadas guardan sus resultados: se conservan solo las más recientes
+        terminadas = sorted((t for t in self._tareas.values() if t.terminada), key=lambda t: t.creada)
+        for tarea in terminadas[:max(0, len(terminadas) - MAX_TAREAS_TERMINADAS)]:
+            del self._tareas[tarea.id]
+
+    def _correr(self, tarea: TareaAnalisisGlobal, paired_data: Dict, estado: Dict) -> None:
+        p = tarea.parametros
+        tarea.estado = 'en_curso'
+        tarea._inicio = time.time()
+        with tarea._lock:
+            tarea._total = len(paired_data)
+        try:
+            if p['directorio_corrida']:
+                corrida = CorridaAnalisis(p['directorio_corrida'], p['epsilon'], p['cant_muestras'])
+                recalculadas = []
+
+                def registrar(paso):
+                    recalculadas.append(paso['instance_name'])
+                    tarea._registrar(paso)
+
+                corrida.ejecutar(paired_data, p['workers'], detener=tarea._cancelar.is_set, al_avanzar=registrar,
+                                 con_perfil=p['con_perfil'], cache=p['cache'])
+                if corrida.estado == 'cancelada':
+                    raise core.AnalisisCancelado("Corrida cancelada; se puede reanudar desde el mismo directorio",
+                                                 estado=dict(corrida.estado_incremental(paired_data),
+                                                             recalculadas=recalculadas))
+                # el estado lleva los resultados de la corrida: una actualización posterior sin directorio
+                # re-analiza solo los pares que cambiaron
+                estado_corrida = corrida.estado_incremental(paired_data)
+                global_df, global_metrics = combinar_resultados(
+                    ((name, df, summary) for name, (_, df, summary) in estado_corrida['resultados'].items()),
+                    list(paired_data)
+                )
+                tarea.resultado = (global_df, global_metrics, dict(estado_corrida, recalculadas=recalculadas))
+            else:
+                tarea.resultado = core.actualizar_analisis_general(
+                    paired_data, estado, p['epsilon'], p['cant_muestras'], p['workers'],
+                    al_avanzar=tarea._registrar, detener=tarea._cancelar.is_set, con_perfil=p['con_perfil'],
+                    cache=p['cache']
+                )
+            tarea.estado = 'completa'
+        except core.AnalisisCancelado as e:
+            tarea.estado_parcial = e.estado
+            tarea.error = str(e)
+            tarea.estado = 'cancelada'
+        except Exception as e:
+            tarea.error = f"{type(e).__name__}: {e}"
+            tarea.estado = 'error'
+        finally:
+            tarea._fin = time.time()
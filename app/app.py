@@ -9,7 +9,14 @@ import folium
 from streamlit_folium import st_folium
 import pandas as pd
 import io
+import json
+import hashlib
 import tdvrp_analyzer as core
+import barrido_parametros as barrido
+import mapa_rutas
+import perfilado
+from analisis_fondo import GestorAnalisis
+from tabla_paginada import IndiceArcos, TAMANOS_PAGINA, cantidad_paginas
 
 # ============= CONFIGURACIÓN DE LA PÁGINA =============
 st.set_page_config(
@@ -44,6 +51,161 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# ============= CACHÉ =============
+# Streamlit re-ejecuta el script entero con cada interacción: lo costoso se cachea por contenido
+# (hash de los archivos subidos) y parámetros, con una cantidad acotada de entradas.
+
+def hash_archivo(archivo) -> str:
+    '''sha256 del contenido de un archivo subido (se calcula una vez por archivo, no en cada rerun)'''
+    hashes = st.session_state.setdefault('hashes_archivos', {})
+    id_archivo = (getattr(archivo, 'file_id', None) or archivo.name, archivo.size)
+    if id_archivo not in hashes:
+        hashes[id_archivo] = hashlib.sha256(archivo.getvalue()).hexdigest()
+    return hashes[id_archivo]
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def cargar_pares_cacheado(hash_instancias: str, hash_soluciones: str, _instances_bytes: bytes, _solutions_bytes: bytes):
+    # cache_resource: se comparte el mismo diccionario entre reruns (sin copiarlo); se usa solo para lectura
+    return core.process_files(_instances_bytes, _solutions_bytes)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def analisis_instancia_cacheado(hash_instancias: str, hash_soluciones: str, instance_name: str,
+                                epsilon: float, cant_muestras: int, con_perfil: bool,
+                                _instance_data: dict, _solution_data: dict):
+    # cache_data devuelve una copia, así que la tabla se puede modificar para mostrarla.
+    # con_perfil entra en la clave: al activar el perfilado se vuelve a correr para medir (perfil en attrs)
+    analysis_df = core.correr_analisis_instancia(
+        instance_name=instance_name,
+        instance_data=_instance_data,
+        solution_data=_solution_data,
+        epsilon=epsilon,
+        cant_muestras=cant_muestras,
+        con_perfil=con_perfil
+    )
+    return analysis_df, core.resumen_metricas(analysis_df)
+
+
+@st.cache_resource
+def gestor_analisis() -> GestorAnalisis:
+    # uno por proceso: las tareas de análisis global siguen corriendo entre reruns
+    return GestorAnalisis()
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def mapa_base_cacheado(hash_instancias: str, instance_name: str, _instance_data: dict):
+    # geometría de los nodos y mapa base: una vez por instancia
+    xy = core.coordenadas_nodos(_instance_data)
+    return xy, mapa_rutas.mapa_base(xy, _instance_data.get('start_depot', 0))
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def segmentos_mapa_cacheados(hash_instancias: str, hash_soluciones: str, instance_name: str, epsilon: float,
+                             cant_muestras: int, columna_decil: str, _analysis_df: pd.DataFrame, _xy):
+    return mapa_rutas.segmentos_arcos(_analysis_df, _xy, columna_decil)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def barrido_t0_cacheado(hash_instancias: str, hash_soluciones: str, instance_name: str, pasos: int,
+                        _instance_data: dict, _solution_data: dict) -> dict:
+    # no depende de epsilon ni de cant_muestras: se recalcula solo al cambiar el par o la grilla
+    return core.barrido_t0(_solution_data, _instance_data, pasos=pasos)
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def indice_arcos_cacheado(hash_instancias: str, hash_soluciones: str, instance_name: str, epsilon: float,
+                          cant_muestras: int, _analysis_df: pd.DataFrame) -> IndiceArcos:
+    return IndiceArcos(_analysis_df)
+
+
+def mostrar_tabla_paginada(indice: IndiceArcos, posiciones, clave: str, column_config: dict) -> None:
+    '''muestra solo una página de las filas filtradas (el filtrado se hace en el servidor) y sus conteos'''
+    conteos = indice.conteos(posiciones)
+    col_tabla1, col_tabla2, col_tabla3 = st.columns([2, 1, 1])
+    with col_tabla2:
+        tamano = st.selectbox("Filas por página", TAMANOS_PAGINA, index=1, key=f"{clave}_tamano")
+    paginas = cantidad_paginas(conteos['filas'], tamano)
+    # si los filtros achican la tabla, la página elegida puede quedar fuera de rango
+    if st.session_state.get(f"{clave}_pagina", 1) > paginas:
+        st.session_state[f"{clave}_pagina"] = paginas
+    with col_tabla3:
+        numero = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, key=f"{clave}_pagina")
+    with col_tabla1:
+        st.caption(f"{conteos['filas']:,} de {len(indice):,} arcos · "
+                   f"{conteos['optimos_pct']:.1f}% en deciles óptimos (0-2)")
+    st.dataframe(
+        indice.pagina(posiciones, numero - 1, tamano),
+        use_container_width=True,
+        height=400,
+        column_config=column_config
+    )
+
+
+NOMBRES_ETAPAS = {
+    'simulacion': "Simulación",
+    'clusters': "Arcos factibles",
+    'duraciones': "Duraciones",
+    'metricas': "Métricas y deciles",
+    'tabla': "Tabla de arcos",
+    'resumen': "Resumen",
+}
+
+
+def grafico_etapas(etapas: dict, titulo: str):
+    '''barras horizontales con los segundos por etapa del análisis (perfilado.py)'''
+    datos = pd.DataFrame({
+        'Etapa': [NOMBRES_ETAPAS[e] for e in perfilado.ETAPAS],
+        'Segundos': [etapas.get(e, 0.0) for e in perfilado.ETAPAS],
+    })
+    fig = px.bar(datos, x='Segundos', y='Etapa', orientation='h', title=titulo, text_auto='.3f')
+    fig.update_layout(height=300, yaxis={'categoryorder': 'array', 'categoryarray': datos['Etapa'][::-1].tolist()})
+    return fig
+
+
+def mostrar_perfil(perfil: dict) -> None:
+    '''tiempos por etapa, contadores y arcos factibles por intervalo del perfil de una instancia'''
+    col_p1, col_p2, col_p3, col_p4 = st.columns(4)
+    contadores = perfil['contadores']
+    arcos = perfil['arcos_factibles']
+    with col_p1:
+        st.metric("Tiempo Total", f"{perfil['segundos']:.3f} s")
+    with col_p2:
+        st.metric("Llamadas a pwl_f", f"{contadores.get('pwl_f', 0):,}")
+    with col_p3:
+        st.metric("Evaluaciones fwd_vec", f"{contadores.get('fwd_vec', 0):,}")
+    with col_p4:
+        st.metric("Arcos Factibles / Intervalo", f"{arcos['promedio']:.1f}",
+                  delta=f"mediana {arcos['mediana']:.0f} · máx. {arcos['maximo']}", delta_color="off")
+    if contadores.get('cache_aciertos'):
+        st.caption("Resultado leído de la caché de resultados: no se midieron las etapas del análisis")
+    else:
+        st.plotly_chart(grafico_etapas(perfil['etapas'], "Tiempo por Etapa"), use_container_width=True)
+
+
+def boton_exportacion(exportes: dict, clave: str, etiqueta: str, construir, file_name: str, mime: str) -> None:
+    '''
+    botón "Preparar" que arma el archivo (construir()) solo al pedirlo y lo guarda en exportes[clave];
+    desde ahí se muestra el botón de descarga sin volver a armarlo
+    '''
+    if clave not in exportes and st.button(f"⚙️ Preparar {etiqueta}", key=f"preparar_{clave}"):
+        with st.spinner(f"Preparando {etiqueta}..."):
+            exportes[clave] = construir()
+    if clave in exportes:
+        st.download_button(label=f"📥 Descargar {etiqueta}", data=exportes[clave], file_name=file_name,
+                           mime=mime, key=f"descargar_{clave}")
+
+
+COLUMNAS_TABLA_ARCOS = {
+    "arc_id": "Arco",
+    "departure_time": st.column_config.NumberColumn("Tiempo Salida", format="%.2f"),
+    "actual_travel_time": st.column_config.NumberColumn("Duración Real", format="%.3f"),
+    "fastest_feasible_time": st.column_config.NumberColumn("Mínimo Factible", format="%.3f"),
+    "decile_rank": st.column_config.NumberColumn("Decil", format="%d"),
+    "proximity_category": "Categoría"
+}
+
+
 # ============= HEADER =============
 st.markdown('<p class="main-header">🚛 TDVRP Analyzer</p>', unsafe_allow_html=True)
 st.markdown(
@@ -107,6 +269,13 @@ with st.sidebar:
         help="Muestras por intervalo para calcular duraciones"
     )
 
+    # Perfilado (perfilado.py): tiempos por etapa y contadores de cada análisis. Es de esta sesión: se
+    # pasa en cada llamada (TDVRP_PERFIL solo da el valor inicial)
+    medir_rendimiento = st.checkbox(
+        "Medir rendimiento", value=perfilado.perfilado_activo(), key="medir_rendimiento",
+        help="Registra el tiempo de cada etapa, las llamadas a pwl_f / fwd_vec y los arcos factibles por intervalo"
+    )
+
 
 # Estado: Sin archivos cargados
 if instances_file is None or solutions_file is None:
@@ -157,12 +326,11 @@ instancias.zip
 # ============= PROCESAMIENTO DE ARCHIVOS =============
 with st.spinner("🔄 Procesando archivos..."):
     try:
-        # Leer bytes de los archivos
-        instances_bytes = instances_file.read()
-        solutions_bytes = solutions_file.read()
-        
-        # Procesar con nuestro motor
-        paired_data = core.process_files(instances_bytes, solutions_bytes)
+        # Procesar con nuestro motor (solo si cambió el contenido de los archivos)
+        hash_instancias = hash_archivo(instances_file)
+        hash_soluciones = hash_archivo(solutions_file)
+        paired_data = cargar_pares_cacheado(hash_instancias, hash_soluciones,
+                                            instances_file.getvalue(), solutions_file.getvalue())
         
         if not paired_data:
             st.error("❌ No se encontraron pares válidos de Instancia-Solución")
@@ -233,16 +401,11 @@ if page == "Análisis Individual":
         # Ejecutar análisis
         with st.spinner("🔬 Ejecutando análisis completo..."):
             try:
-                analysis_df = core.correr_analisis_instancia(
-                    instance_name=selected_instance,
-                    instance_data=instance_data,
-                    solution_data=solution_data,
-                    epsilon=epsilon,
-                    cant_muestras=cant_muestras
+                analysis_df, summary_metrics = analisis_instancia_cacheado(
+                    hash_instancias, hash_soluciones, selected_instance, epsilon, cant_muestras,
+                    medir_rendimiento, instance_data, solution_data
                 )
                 
-                summary_metrics = core.resumen_metricas(analysis_df)
-                
                 st.success("✅ Análisis completado exitosamente")
                 
             except Exception as e:
@@ -418,18 +581,80 @@ if page == "Análisis Individual":
             st.error("❌ **Distancia - Hipótesis NO VALIDADA**: <40% en deciles óptimos")
 
         
+        st.divider()
+
+        # ============= MAPA DE LA SOLUCIÓN =============
+        st.subheader("🗺️ Mapa de la Solución")
+
+        col_mapa1, col_mapa2 = st.columns([1, 3])
+        with col_mapa1:
+            criterio_mapa = st.radio("Colorear arcos por decil de", ["Tiempo", "Distancia"], horizontal=True)
+            deciles_mapa = st.multiselect("Deciles visibles", options=list(range(10)), default=list(range(10)))
+
+        xy_nodos, mapa_instancia = mapa_base_cacheado(hash_instancias, selected_instance, instance_data)
+        segmentos_mapa = segmentos_mapa_cacheados(
+            hash_instancias, hash_soluciones, selected_instance, epsilon, cant_muestras,
+            'decile_rank' if criterio_mapa == "Tiempo" else 'decile_rank_distance', analysis_df, xy_nodos
+        )
+        with col_mapa1:
+            if len(segmentos_mapa) < len(analysis_df):
+                st.caption(f"{len(analysis_df)} arcos agregados en {len(segmentos_mapa)} segmentos "
+                           "(el grosor indica cuántos arcos representa cada uno)")
+        with col_mapa2:
+            # El mapa base queda fijo; al cambiar el filtro solo se reemplaza la capa de arcos
+            st_folium(
+                mapa_instancia,
+                feature_group_to_add=mapa_rutas.capa_arcos(segmentos_mapa, deciles_mapa),
+                key=f"mapa_{selected_instance}",
+                height=500,
+                use_container_width=True,
+                returned_objects=[]
+            )
+
         st.divider()
         
+        # ============= SECCIÓN 3: SENSIBILIDAD AL T0 =============
+        st.subheader("⏱️ Sensibilidad de la Duración al Horario de Salida")
+
+        with st.expander("Duración de cada ruta según su t0 en todo el horizonte"):
+            pasos_t0 = st.slider("Puntos de la grilla de t0", min_value=10, max_value=500, value=100, step=10)
+            barrido = barrido_t0_cacheado(hash_instancias, hash_soluciones, selected_instance, pasos_t0,
+                                          instance_data, solution_data)
+
+            fig_t0 = px.imshow(
+                barrido['duraciones'],
+                x=barrido['grilla'],
+                y=[f"Ruta {r}" for r in range(len(barrido['duraciones']))],
+                aspect='auto',
+                color_continuous_scale='RdYlGn_r',
+                labels={'x': 't0', 'y': 'Ruta', 'color': 'Duración'},
+                title="Duración por Ruta y Horario de Salida"
+            )
+            fig_t0.update_layout(height=max(300, 30 * len(barrido['duraciones'])))
+            st.plotly_chart(fig_t0, use_container_width=True)
+
+            st.dataframe(pd.DataFrame({
+                'Ruta': range(len(barrido['duraciones'])),
+                't0 Solución': [r['t0'] for r in solution_data['routes']],
+                'Duración Solución': [r['duration'] for r in solution_data['routes']],
+                't0 Óptimo (grilla)': barrido['t0_optimo'],
+                'Duración Óptima (grilla)': barrido['duracion_optima'],
+            }), use_container_width=True)
+
+        st.divider()
+
         # ============= SECCIÓN 4: TABLA DE DATOS DETALLADOS =============
         st.subheader("📋 Datos Detallados")
         
-        # Filtros
+        # Filtros (se aplican en el servidor sobre un índice precalculado; al navegador va solo una página)
+        indice_arcos = indice_arcos_cacheado(hash_instancias, hash_soluciones, selected_instance,
+                                             epsilon, cant_muestras, analysis_df)
         col_filter1, col_filter2 = st.columns(2)
         
         with col_filter1:
             filter_route = st.multiselect(
                 "Filtrar por Ruta",
-                options=sorted(analysis_df['route_idx'].unique()),
+                options=indice_arcos.rutas_disponibles(),
                 default=None
             )
         
@@ -441,63 +666,66 @@ if page == "Análisis Individual":
                 value=(0, 9)
             )
         
-        # Aplicar filtros
-        filtered_df = analysis_df.copy()
-        if filter_route:
-            filtered_df = filtered_df[filtered_df['route_idx'].isin(filter_route)]
-        filtered_df = filtered_df[
-            (filtered_df['decile_rank'] >= filter_decile[0]) & 
-            (filtered_df['decile_rank'] <= filter_decile[1])
-        ]
-        
-        st.dataframe(
-            filtered_df,
-            use_container_width=True,
-            height=400,
-            column_config={
-                "arc_id": "Arco",
-                "departure_time": st.column_config.NumberColumn("Tiempo Salida", format="%.2f"),
-                "actual_travel_time": st.column_config.NumberColumn("Duración Real", format="%.3f"),
-                "fastest_feasible_time": st.column_config.NumberColumn("Mínimo Factible", format="%.3f"),
-                "decile_rank": st.column_config.NumberColumn("Decil", format="%d"),
-                "proximity_category": "Categoría"
-            }
+        mostrar_tabla_paginada(
+            indice_arcos,
+            indice_arcos.filtrar(rutas=filter_route, deciles=filter_decile),
+            clave="tabla_instancia",
+            column_config=COLUMNAS_TABLA_ARCOS
         )
         
+        if 'perfil' in analysis_df.attrs:
+            with st.expander("⏱️ Rendimiento del Análisis"):
+                mostrar_perfil(analysis_df.attrs['perfil'])
+
         st.divider()
         
         # ============= SECCIÓN 5: EXPORTACIÓN =============
         st.subheader("💾 Exportar Resultados")
         
-        col_export1, col_export2 = st.columns(2)
-        
-        with col_export1:
-            # Exportar a Excel
+        # Como en el análisis global, los archivos se arman solo al pedirlos (una vez por análisis):
+        # analysis_df es una copia nueva en cada rerun, así que se identifica por los parámetros del análisis
+        clave_analisis = (hash_instancias, hash_soluciones, selected_instance, epsilon, cant_muestras)
+        if st.session_state.get('exportes_instancia') is None or st.session_state['exportes_instancia']['clave'] != clave_analisis:
+            st.session_state['exportes_instancia'] = {'clave': clave_analisis, 'datos': {}}
+        exportes = st.session_state['exportes_instancia']['datos']
+
+        def excel_instancia():
             buffer = io.BytesIO()
             with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
                 analysis_df.to_excel(writer, sheet_name='Detalle_Arcos', index=False)
                 pd.DataFrame([summary_metrics]).to_excel(writer, sheet_name='Resumen', index=False)
                 decile_data.to_excel(writer, sheet_name='Distribucion_Deciles_Tiempo', index=False)
                 decile_data_dist.to_excel(writer, sheet_name='Distribucion_Deciles_Distancia', index=False)
-            
-            st.download_button(
-                label="📥 Descargar Excel Completo",
-                data=buffer.getvalue(),
+            return buffer.getvalue()
+
+        def parquet_instancia():
+            # detalle por arco
+            parquet_buffer = io.BytesIO()
+            core.escribir_tabla_columnar(analysis_df, parquet_buffer, 'parquet')
+            return parquet_buffer.getvalue()
+
+        col_export1, col_export2, col_export3 = st.columns(3)
+        
+        with col_export1:
+            boton_exportacion(
+                exportes, 'excel_instancia', "Excel Completo", excel_instancia,
                 file_name=f"analisis_{selected_instance}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
         
         with col_export2:
-            # Exportar CSV
-            csv_buffer = io.StringIO()
-            analysis_df.to_csv(csv_buffer, index=False)
-            
-            st.download_button(
-                label="📥 Descargar CSV",
-                data=csv_buffer.getvalue(),
+            boton_exportacion(
+                exportes, 'csv_instancia', "CSV", lambda: analysis_df.to_csv(index=False),
                 file_name=f"analisis_{selected_instance}.csv",
                 mime="text/csv"
             )
+        
+        with col_export3:
+            boton_exportacion(
+                exportes, 'parquet_instancia', "Parquet", parquet_instancia,
+                file_name=f"analisis_{selected_instance}.parquet",
+                mime="application/vnd.apache.parquet"
+            )
     
     # ============= FOOTER =============
     st.divider()
@@ -525,29 +753,102 @@ elif page == "Análisis Global":
         - **Validación estadística** de la hipótesis a gran escala
         """)
 
-    # Botón para ejecutar análisis global
-    if st.button("🚀 Ejecutar Análisis Global", type="primary"):
-        with st.spinner("🔬 Procesando todas las instancias..."):
-            try:
-                # Ejecutar análisis global
-                global_df, global_metrics = core.correr_analisis_general(
-                    paired_data=st.session_state['paired_data'],
-                    epsilon=epsilon,
-                    cant_muestras=cant_muestras
+    incremental = st.checkbox(
+        "Incremental: re-analizar solo los pares instancia-solución que cambiaron desde la última corrida",
+        value=True
+    )
+    directorio_corrida = st.text_input(
+        "Directorio de la corrida (opcional)",
+        value="",
+        help="Guarda el resultado de cada instancia apenas termina. Si el análisis se cancela o se reinicia la "
+             "app, al volver a ejecutarlo con el mismo directorio se reanuda desde las instancias que faltaban."
+    ).strip()
+
+    # Botón para ejecutar análisis global: corre en segundo plano y sobrevive a los reruns
+    gestor = gestor_analisis()
+    tarea = gestor.obtener(st.session_state.get('tarea_global'))
+    en_curso = tarea is not None and not tarea.terminada
+
+    if st.button("🚀 Ejecutar Análisis Global", type="primary", disabled=en_curso):
+        try:
+            tarea = gestor.enviar(
+                paired_data=st.session_state['paired_data'],
+                epsilon=epsilon,
+                cant_muestras=cant_muestras,
+                # los pares sin cambios reutilizan el resultado anterior
+                estado=st.session_state.get('estado_global') if incremental else None,
+                directorio_corrida=directorio_corrida or None,
+                con_perfil=medir_rendimiento
+            )
+            st.session_state['tarea_global'] = tarea.id
+        except Exception as e:
+            st.error(f"❌ Error en análisis global: {str(e)}")
+            st.exception(e)
+
+    @st.fragment(run_every=1.0)
+    def seguimiento_analisis_global():
+        # Solo este bloque se re-ejecuta cada segundo: el resto de la página (y de la app) sigue usable
+        tarea = gestor.obtener(st.session_state.get('tarea_global'))
+        if tarea is None:
+            st.session_state.pop('tarea_global', None)
+            return
+        avance = tarea.avance()
+
+        if not tarea.terminada:
+            total = max(avance['total'], 1)
+            texto = f"{avance['procesadas']}/{avance['total']} instancias"
+            if avance['instancia']:
+                texto += f" (última: {avance['instancia']})"
+            st.progress(avance['procesadas'] / total, text=f"🔬 {texto} - {avance['segundos']:.0f}s")
+            if st.button("⏹️ Cancelar análisis"):
+                tarea.cancelar()
+                st.info("Cancelando: se detiene al terminar la instancia en curso...")
+
+            deciles_parciales = avance['deciles_parciales']
+            if not deciles_parciales.empty:
+                fig_parcial = px.bar(
+                    deciles_parciales,
+                    x='decile_rank',
+                    y='percentage',
+                    color='instance_type',
+                    barmode='group',
+                    title=f"Distribución parcial de deciles (Tiempo) - {avance['procesadas']}/{avance['total']} instancias",
+                    labels={'decile_rank': 'Decil', 'percentage': 'Porcentaje (%)', 'instance_type': 'Tipo'},
+                    color_discrete_map={'C': '#1f77b4', 'R': '#ff7f0e', 'RC': '#2ca02c'}
                 )
-                
-                comparison_data = core.datos_comparacion_general(global_df)
-                
-                # Guardar en session state
-                st.session_state['global_df'] = global_df
-                st.session_state['global_metrics'] = global_metrics
-                st.session_state['comparison_data'] = comparison_data
-                
-                st.success(f"✅ Análisis global completado: {global_metrics['total_instances']} instancias, {global_metrics['total_arcs']} arcos")
-                
-            except Exception as e:
-                st.error(f"❌ Error en análisis global: {str(e)}")
-                st.exception(e)
+                fig_parcial.update_layout(height=350)
+                st.plotly_chart(fig_parcial, use_container_width=True)
+            return
+
+        # La tarea terminó: se toman sus resultados una sola vez
+        del st.session_state['tarea_global']
+        if tarea.estado == 'completa':
+            global_df, global_metrics, estado_global = tarea.resultado
+            st.session_state['global_df'] = global_df
+            st.session_state['global_metrics'] = global_metrics
+            st.session_state['comparison_data'] = core.datos_comparacion_general(
+                global_df, agregados=global_metrics.get('agregados'))
+            st.session_state['estado_global'] = estado_global
+            st.session_state['mensaje_global'] = (
+                'success',
+                f"✅ Análisis global completado en {avance['segundos']:.0f}s: {global_metrics['total_instances']} instancias, "
+                f"{global_metrics['total_arcs']} arcos ({len(estado_global['recalculadas'])} re-analizadas)"
+            )
+        elif tarea.estado == 'cancelada':
+            if tarea.estado_parcial is not None:
+                # la próxima ejecución incremental no repite las instancias ya terminadas
+                st.session_state['estado_global'] = tarea.estado_parcial
+            st.session_state['mensaje_global'] = ('warning', f"⏹️ {tarea.error}")
+        else:
+            st.session_state['mensaje_global'] = ('error', f"❌ Error en análisis global: {tarea.error}")
+        st.rerun()
+
+    if 'tarea_global' in st.session_state:
+        seguimiento_analisis_global()
+
+    if 'mensaje_global' in st.session_state:
+        tipo_mensaje, mensaje = st.session_state.pop('mensaje_global')
+        getattr(st, tipo_mensaje)(mensaje)
 
     # Si ya se ejecutó el análisis global, mostrar resultados
     if 'global_df' in st.session_state and not st.session_state['global_df'].empty:
@@ -580,6 +881,21 @@ elif page == "Análisis Global":
                 f"{global_metrics['global_optimal_pct_dist']:.1f}%",
                 delta="Deciles 0-2"
             )
+
+        with col_g5:
+            if 'memory_report' in global_metrics:
+                reporte = global_metrics['memory_report']
+                st.metric(
+                    "Memoria Tabla de Arcos",
+                    f"{reporte['total_bytes'] / 1024 ** 2:.1f} MB",
+                    delta=f"{reporte['bytes_por_arco']:.0f} B/arco",
+                    delta_color="off"
+                )
+                with st.expander("Memoria por columna"):
+                    st.dataframe(pd.DataFrame(
+                        [(c, dtype, b) for c, (dtype, b) in reporte['por_columna'].items()],
+                        columns=['Columna', 'Tipo', 'Bytes']
+                    ), use_container_width=True)
             
         # ============= VALIDACIÓN DE HIPÓTESIS GLOBAL =============
         st.subheader("🎯 Validación de Hipótesis - Nivel Global")
@@ -649,7 +965,53 @@ elif page == "Análisis Global":
         ])
         
         st.dataframe(type_summary_df, use_container_width=True)
-        
+
+        # ============= TABLA DE ARCOS (PAGINADA) =============
+        st.subheader("📋 Arcos de Todas las Instancias")
+
+        # El índice se arma una vez por resultado global
+        if st.session_state.get('indice_global') is None or st.session_state['indice_global'].df is not global_df:
+            st.session_state['indice_global'] = IndiceArcos(global_df)
+        indice_global = st.session_state['indice_global']
+
+        col_gfilter1, col_gfilter2, col_gfilter3 = st.columns(3)
+        with col_gfilter1:
+            filter_instances_global = st.multiselect("Filtrar por Instancia", options=indice_global.instancias)
+        with col_gfilter2:
+            filter_route_global = st.multiselect("Filtrar por Ruta", options=indice_global.rutas_disponibles(),
+                                                 key="filtro_ruta_global")
+        with col_gfilter3:
+            filter_decile_global = st.slider("Filtrar por Rango de Decil", min_value=0, max_value=9, value=(0, 9),
+                                             key="filtro_decil_global")
+
+        mostrar_tabla_paginada(
+            indice_global,
+            indice_global.filtrar(rutas=filter_route_global, deciles=filter_decile_global,
+                                  instancias=filter_instances_global),
+            clave="tabla_global",
+            column_config=COLUMNAS_TABLA_ARCOS
+        )
+
+        # ============= RENDIMIENTO (PERFILADO) =============
+        if 'rendimiento' in global_metrics:
+            rendimiento = global_metrics['rendimiento']
+            st.subheader("⏱️ Rendimiento")
+
+            col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+            with col_r1:
+                st.metric("Tiempo de Análisis (suma)", f"{rendimiento['por_instancia']['segundos'].sum():.1f} s")
+            with col_r2:
+                st.metric("Llamadas a pwl_f", f"{rendimiento['contadores']['pwl_f']:,}")
+            with col_r3:
+                st.metric("Evaluaciones fwd_vec", f"{rendimiento['contadores']['fwd_vec']:,}")
+            with col_r4:
+                tasa = rendimiento['tasa_aciertos_cache']
+                st.metric("Aciertos de Caché", "—" if pd.isna(tasa) else f"{tasa * 100:.0f}%")
+
+            st.plotly_chart(grafico_etapas(rendimiento['etapas'], "Tiempo por Etapa (todas las instancias)"),
+                            use_container_width=True)
+            st.caption("Instancias de la más lenta a la más rápida (segundos por etapa y contadores)")
+            st.dataframe(rendimiento['por_instancia'], use_container_width=True, height=300)
             
         # ============= EXPORTACIÓN GLOBAL =============
         st.subheader("💾 Exportar Análisis Global")
@@ -657,33 +1019,46 @@ elif page == "Análisis Global":
         col_exp1, col_exp2 = st.columns(2)
         
         with col_exp1:
-            # Excel completo
-            buffer_global = io.BytesIO()
-            core.export_general_analysis_excel(global_df, global_metrics, comparison_data, "temp.xlsx")
-            
-            # Recrear el buffer para descarga
-            with pd.ExcelWriter(buffer_global, engine='openpyxl') as writer:
-                global_df.to_excel(writer, sheet_name='Todos_los_Arcos', index=False)
-                
-                global_summary_df = pd.DataFrame([{
-                    'Total_Instancias': global_metrics['total_instances'],
-                    'Total_Arcos': global_metrics['total_arcs'],
-                    'Pct_Optimos_Tiempo': global_metrics['global_optimal_pct'],
-                    'Pct_Optimos_Distancia': global_metrics['global_optimal_pct_dist'],
-                    'Decil_Promedio_Tiempo': global_metrics['global_avg_decile'],
-                    'Decil_Promedio_Distancia': global_metrics['global_avg_decile_dist']
-                }])
-                global_summary_df.to_excel(writer, sheet_name='Resumen_Global', index=False)
-                
-                type_summary_df.to_excel(writer, sheet_name='Resumen_por_Tipo', index=False)
-                comparison_data['instance_summary'].to_excel(writer, sheet_name='Por_Instancia', index=False)
-            
-            st.download_button(
-                label="📥 Descargar Excel Global Completo",
-                data=buffer_global.getvalue(),
+            # Los archivos se arman solo al pedirlos (una vez por resultado global): serializar todos los
+            # arcos en cada rerun haría pagar las tres exportaciones a cada click de la página
+            if st.session_state.get('exportes_global') is None or st.session_state['exportes_global']['df'] is not global_df:
+                st.session_state['exportes_global'] = {'df': global_df, 'datos': {}}
+            exportes = st.session_state['exportes_global']['datos']
+
+            def tablas_globales():
+                if 'tablas' not in exportes:
+                    exportes['tablas'] = core.tablas_analisis_general(global_df, global_metrics, comparison_data)
+                return exportes['tablas']
+
+            def excel_global(con_arcos):
+                buffer_global = io.BytesIO()
+                core.export_general_analysis_excel(global_df, global_metrics, comparison_data, buffer_global,
+                                                   solo_resumen=not con_arcos, streaming=con_arcos)
+                return buffer_global.getvalue()
+
+            # Excel: por defecto solo los resúmenes (la tabla de arcos va en Parquet/Arrow)
+            excel_con_arcos = st.checkbox("Incluir todos los arcos en el Excel (lento para muchas instancias)", value=False)
+            boton_exportacion(
+                exportes, 'excel_completo' if excel_con_arcos else 'excel_resumen',
+                "Excel Global" + (" Completo" if excel_con_arcos else " (Resúmenes)"),
+                lambda: excel_global(excel_con_arcos),
                 file_name=f"analisis_global_epsilon_{epsilon}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
+
+            # Todas las tablas (incluida la de arcos) en formato columnar
+            boton_exportacion(
+                exportes, 'parquet', "Tablas (Parquet, .zip)",
+                lambda: core.tablas_columnar_zip(tablas_globales(), 'parquet'),
+                file_name=f"analisis_global_epsilon_{epsilon}_parquet.zip",
+                mime="application/zip"
+            )
+            boton_exportacion(
+                exportes, 'arrow', "Tablas (Arrow IPC, .zip)",
+                lambda: core.tablas_columnar_zip(tablas_globales(), 'arrow'),
+                file_name=f"analisis_global_epsilon_{epsilon}_arrow.zip",
+                mime="application/zip"
+            )
         
         with col_exp2:
             # Resumen ejecutivo CSV
@@ -700,6 +1075,52 @@ elif page == "Análisis Global":
     else:
         st.info("👆 Haz clic en **'Ejecutar Análisis Global'** para procesar todas las instancias")
 
+    # ============= BARRIDO DE PARÁMETROS =============
+    with st.expander("🔧 Barrido de parámetros (epsilon / cantidad de muestras)", expanded=False):
+        st.markdown("""
+        Evalúa varias combinaciones de **epsilon** y **cantidad de muestras** sobre todas las instancias.
+        La simulación y los arcos factibles se calculan una sola vez por instancia.
+        """)
+        col_b1, col_b2 = st.columns(2)
+        with col_b1:
+            # misma escala que el epsilon de la barra lateral: una década a cada lado del valor actual
+            opciones_epsilon = barrido.grilla_epsilons(epsilon)
+            epsilons_barrido = st.multiselect("Valores de epsilon", opciones_epsilon, default=opciones_epsilon)
+        with col_b2:
+            muestras_barrido = st.multiselect("Cantidad de muestras", [2, 5, 10, 20, 50], default=[5, 10, 20])
+
+        if st.button("Ejecutar barrido", disabled=not (epsilons_barrido and muestras_barrido)):
+            with st.spinner("Evaluando combinaciones..."):
+                st.session_state['barrido_parametros'] = barrido.correr_barrido_general(
+                    st.session_state['paired_data'], sorted(epsilons_barrido), sorted(muestras_barrido)
+                )
+
+        if 'barrido_parametros' in st.session_state and not st.session_state['barrido_parametros'].empty:
+            resumen_b = barrido.resumen_barrido(st.session_state['barrido_parametros'])
+            fig_barrido = px.line(
+                resumen_b,
+                x='epsilon',
+                y='value',
+                color='cant_muestras',
+                facet_col='metric',
+                facet_col_wrap=3,
+                markers=True,
+                title="Métricas promedio por combinación de parámetros",
+                labels={'epsilon': 'Epsilon', 'value': 'Valor', 'cant_muestras': 'Muestras'}
+            )
+            fig_barrido.update_yaxes(matches=None)
+            fig_barrido.update_layout(height=600)
+            st.plotly_chart(fig_barrido, use_container_width=True)
+
+            csv_barrido = io.StringIO()
+            st.session_state['barrido_parametros'].to_csv(csv_barrido, index=False)
+            st.download_button(
+                label="📥 Barrido de parámetros (CSV)",
+                data=csv_barrido.getvalue(),
+                file_name="barrido_parametros.csv",
+                mime="text/csv"
+            )
+
     st.divider()
     # ============= FOOTER =============
     st.divider()
@@ -0,0 +1,272 @@
+"""
+Barrido de parámetros del análisis (epsilon y cant_muestras).
+
+La simulación de la solución y los arcos factibles por intervalo (clusters_arcos_ruta) no dependen de
+epsilon ni de cant_muestras, así que se calculan una sola vez por instancia (preparar_barrido). Después
+se evalúan todas las combinaciones juntas: las duraciones muestreadas de todos los arcos factibles, para
+todas las combinaciones, se calculan en un mismo lote con fwd_vec y las métricas salen de una única
+llamada a metricas_ruta. El resultado es una tabla larga con una fila por (instancia, epsilon,
+cant_muestras, métrica).
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from build_pwl_arc import fwd_vec
+from simulacion import contexto_instancia, simulacion_lote, tramos_por_ruta
+from metricas_arcos import clusters_arcos_ruta, metricas_ruta, ETIQUETAS_PROXIMIDAD
+
+
+# epsilon es el semiancho (en unidades de tiempo) de la ventana de muestreo, con el mismo rango que en la app
+EPSILON_MINIMO, EPSILON_MAXIMO = 1, 5000
+FACTORES_EPSILON = [0.1, 0.2, 0.5, 1, 2, 5, 10]  # grilla logarítmica de una década a cada lado
+
+
+def grilla_epsilons(epsilon: float) -> List[float]:
+    '''
+    valores de epsilon para el barrido: de epsilon/10 a epsilon*10 (1-2-5 por década),
+    dentro de [EPSILON_MINIMO, EPSILON_MAXIMO] y sin repetidos.
+    '''
+    valores = {float(min(max(float(f'{epsilon * f:.3g}'), EPSILON_MINIMO), EPSILON_MAXIMO)) for f in FACTORES_EPSILON}
+    return sorted(valores)
+
+
+EPSILONS_POR_DEFECTO = grilla_epsilons(100)
+MUESTRAS_POR_DEFECTO = [5, 10, 20]
+METRICAS_BARRIDO = ['avg_decile', 'optimal_arcs_pct', 'near_minimum_pct', 'avg_ratio_to_min', 'avg_ratio_to_max']
+MAX_ELEMENTOS = 2_000_000  # arcos x muestras por llamada a fwd_vec (acota la memoria)
+
+
+def preparar_barrido(instance_data: dict, solution_data: dict, ctx: dict = None) -> Dict:
+    '''
+    parte del análisis que no depende de epsilon ni de cant_muestras: simulación de la solución y
+    arcos factibles de cada intervalo, con todas las rutas seguidas (un segmento por intervalo,
+    igual que en correr_analisis_instancia).
+
+    devuelve un diccionario con:
+        - "i", "j": extremos de cada arco factible; "offsets": segmentos por intervalo
+        - "t_salida": instante de salida de cada intervalo (centro de la ventana de muestreo)
+        - "dur_usadas", "dist_usadas": duración y distancia del arco usado en cada intervalo
+        - "dist": distancia de cada arco factible
+    '''
+    ctx = contexto_instancia(instance_data) if ctx is None else ctx
+    routes = solution_data.get("routes", [])
+    if not routes:
+        raise ValueError("La solución no contiene rutas")
+
+    tabla_sim, _ = simulacion_lote(solution_data, instance_data, ctx=ctx)
+    time_departures = tramos_por_ruta(tabla_sim, len(routes))
+
+    arcos, largos, t_salida, dur_usadas, usados = [], [], [], [], []
+    for idx_ruta, route in enumerate(routes):
+        path = route["path"]
+        td_ruta = time_departures[idx_ruta]
+        intervalos_ruta = list(zip(td_ruta['departure'][:-1].tolist(), td_ruta['departure'][1:].tolist()))
+        arcos_utilizados = [(path[i], path[i+1]) for i in range(len(path) - 1)]
+        arcos_factibles = clusters_arcos_ruta(instance_data, intervalos_ruta, arcos_utilizados)
+
+        # como en duracion_arcos: el k-ésimo grupo de arcos factibles se muestrea alrededor del k-ésimo intervalo
+        n_int = len(arcos_factibles)
+        for lista in arcos_factibles.values():
+            arcos.extend(lista)
+            largos.append(len(lista))
+        t_salida.extend(intervalo[0] for intervalo in intervalos_ruta[:n_int])
+        dur_usadas.append(td_ruta['travel_time'][:n_int])
+        usados.extend(arcos_utilizados[:n_int])
+
+    offsets = np.zeros(len(largos) + 1, dtype=np.int64)
+    np.cumsum(largos, out=offsets[1:])
+    ij = np.array(arcos, dtype=np.int64).reshape(len(arcos), 2)
+    usados = np.array(usados, dtype=np.int64).reshape(len(usados), 2)
+    return {
+        "i": ij[:, 0],
+        "j": ij[:, 1],
+        "offsets": offsets,
+        "t_salida": np.array(t_salida, dtype=float),
+        "dur_usadas": np.concatenate(dur_usadas) if dur_usadas else np.zeros(0),
+        "dist_usadas": ctx["D"][usados[:, 0], usados[:, 1]],
+        "dist": ctx["D"][ij[:, 0], ij[:, 1]],
+    }
+
+
+def _estadisticas_duraciones(prep: Dict, ctx: dict, horizonte: float, combinaciones: List[tuple]) -> np.ndarray:
+    '''
+    estadísticas (start, mean, minimo, maximo, end) de las duraciones muestreadas de cada arco factible,
+    para cada combinación (epsilon, cant_muestras): array (len(combinaciones), n_arcos, 5).
+    las muestras y la media se calculan igual que en duracion_arcos.
+    '''
+    n = len(prep["i"])
+    seg = np.repeat(np.arange(len(prep["offsets"]) - 1), np.diff(prep["offsets"]))
+    t = prep["t_salida"][seg]
+    D = ctx["D"][prep["i"], prep["j"]]
+    VZ = ctx["speeds"][ctx["clusters"][prep["i"], prep["j"]]]
+
+    stats = np.zeros((len(combinaciones), n, 5))
+    if n == 0:
+        return stats
+
+    # se agrupan combinaciones hasta MAX_ELEMENTOS muestras por llamada a fwd_vec
+    pendientes = list(range(len(combinaciones)))
+    while pendientes:
+        lote, elementos = [], 0
+        while pendientes and (not lote or elementos + n * combinaciones[pendientes[0]][1] <= MAX_ELEMENTOS):
+            lote.append(pendientes.pop(0))
+            elementos += n * combinaciones[lote[-1]][1]
+
+        salidas = []
+        for c in lote:
+            epsilon, cant_muestras = combinaciones[c]
+            lo = np.maximum(t - epsilon, 0.0)
+            hi = np.minimum(t + epsilon, horizonte)
+            k = np.arange(cant_muestras, dtype=float)
+            salidas.append((lo[:, None] + k[None, :] * (hi - lo)[:, None] / (cant_muestras - 1)).ravel())
+        repeticiones = np.concatenate([np.full(n, combinaciones[c][1]) for c in lote])
+        idx = np.repeat(np.tile(np.arange(n), len(lote)), repeticiones)
+        dur = fwd_vec(D[idx], np.concatenate(salidas), VZ[idx], ctx["Zs"], ctx["per"])
+
+        pos = 0
+        for c in lote:
+            cant_muestras = combinaciones[c][1]
+            d = dur[pos:pos + n * cant_muestras].reshape(n, cant_muestras)
+            pos += n * cant_muestras
+            suma = np.zeros(n)
+            for m in range(cant_muestras):  # suma en orden, como sum(d) en duracion_arcos
+                suma += d[:, m]
+            stats[c] = np.column_stack((d[:, 0], suma / cant_muestras, d.min(axis=1), d.max(axis=1), d[:, -1]))
+    return stats
+
+
+def evaluar_barrido(prep: Dict, instance_data: dict, combinaciones: List[tuple], ctx: dict = None) -> pd.DataFrame:
+    '''
+    evalúa todas las combinaciones (epsilon, cant_muestras) sobre una instancia ya preparada.
+
+    devuelve un DataFrame largo con columnas epsilon, cant_muestras, metric, value
+    (las métricas de METRICAS_BARRIDO, con la misma definición que en resumen_metricas)
+    '''
+    for epsilon, cant_muestras in combinaciones:
+        if cant_muestras < 2:
+            raise ValueError(f"cant_muestras debe ser al menos 2 (se pidió {cant_muestras})")
+    ctx = contexto_instancia(instance_data) if ctx is None else ctx
+    C = len(combinaciones)
+    n = len(prep["i"])
+    offsets = prep["offsets"]
+    n_int = len(offsets) - 1
+
+    stats = _estadisticas_duraciones(prep, ctx, instance_data["horizon"][1], combinaciones)
+
+    # todas las combinaciones como segmentos consecutivos de una sola llamada al kernel de métricas
+    arrays = {
+        "offsets": np.concatenate([offsets[:-1] + c * n for c in range(C)] + [[C * n]]),
+        "stats": stats.reshape(C * n, 5),
+        "dist": np.tile(prep["dist"], C),
+    }
+    m = metricas_ruta(arrays, np.tile(prep["dur_usadas"], C), np.tile(prep["dist_usadas"], C))
+
+    filas = []
+    for c, (epsilon, cant_muestras) in enumerate(combinaciones):
+        tramo = slice(c * n_int, (c + 1) * n_int)
+        decil = m["decil"][tramo]
+        valores = {
+            'avg_decile': decil.mean() if n_int else np.nan,
+            'optimal_arcs_pct': (decil <= 2).mean() * 100 if n_int else 0,
+            'near_minimum_pct': (m["proximidad"][tramo] == ETIQUETAS_PROXIMIDAD[0]).mean() * 100 if n_int else 0,
+            'avg_ratio_to_min': _promedio(m["ratio_min"][tramo]),
+            'avg_ratio_to_max': _promedio(m["ratio_max"][tramo]),
+        }
+        filas.extend({'epsilon': epsilon, 'cant_muestras': cant_muestras, 'metric': metrica, 'value': valores[metrica]}
+                     for metrica in METRICAS_BARRIDO)
+    return pd.DataFrame(filas, columns=['epsilon', 'cant_muestras', 'metric', 'value'])
+
+
+def _promedio(valores: np.ndarray) -> float:
+    '''promedio sin NaN (como Series.mean)'''
+    validos = valores[~np.isnan(valores)]
+    return float(validos.mean()) if validos.size else np.nan
+
+
+def barrido_instancia(instance_name: str, instance_data: dict, solution_data: dict,
+                      epsilons: List[float] = None, muestras: List[int] = None) -> pd.DataFrame:
+    '''
+    barrido completo sobre un par instancia-solución: prepara una vez y evalúa la grilla epsilons x muestras.
+    '''
+    from tdvrp_analyzer import _tipo_instancia
+
+    combinaciones = list(product(epsilons or EPSILONS_POR_DEFECTO, muestras or MUESTRAS_POR_DEFECTO))
+    ctx = contexto_instancia(instance_data)
+    prep = preparar_barrido(instance_data, solution_data, ctx)
+    tabla = evaluar_barrido(prep, instance_data, combinaciones, ctx)
+    tabla.insert(0, 'instance_name', instance_name)
+    tabla.insert(1, 'instance_type', _tipo_instancia(instance_name))
+    return tabla
+
+
+def _barrido_par(instance_name: str, data: Dict, epsilons: List[float], muestras: List[int]) -> pd.DataFrame:
+    return barrido_instancia(instance_name, data['instance'], data['solution'], epsilons, muestras)
+
+
+def correr_barrido_general(paired_data: Dict, epsilons: List[float] = None, muestras: List[int] = None,
+                           workers: int = 1) -> pd.DataFrame:
+    '''
+    corre barrido_instancia sobre todas las instancias (en paralelo si workers > 1).
+    devuelve la tabla larga de todas las instancias, en el orden de paired_data.
+    '''
+    resultados = {}
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = {
+                executor.submit(_barrido_par, nombre, data, epsilons, muestras): nombre
+                for nombre, data in paired_data.items()
+            }
+            for futuro in as_completed(futuros):
+                nombre = futuros[futuro]
+                try:
+                    resultados[nombre] = futuro.result()
+                except Exception as e:
+                    print(f"Error procesando {nombre}: {str(e)}")
+    else:
+        for nombre, data in paired_data.items():
+            try:
+                resultados[nombre] = _barrido_par(nombre, data, epsilons, muestras)
+            except Exception as e:
+                print(f"Error procesando {nombre}: {str(e)}")
+
+    frames = [resultados[nombre] for nombre in paired_data if nombre in resultados]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def resumen_barrido(tabla: pd.DataFrame, por_tipo: bool = False) -> pd.DataFrame:
+    '''
+    promedio de cada métrica sobre las instancias, por combinación (y por tipo de instancia si por_tipo).
+    '''
+    claves = (['instance_type'] if por_tipo else []) + ['epsilon', 'cant_muestras', 'metric']
+    return tabla.groupby(claves, sort=True)['value'].mean().reset_index()
+
+
+if __name__ == "__main__":
+    from tdvrp_analyzer import cargar_pares
+
+    parser = argparse.ArgumentParser(description="Barrido de epsilon y cant_muestras sobre todas las instancias.")
+    parser.add_argument("instancias", help="directorio o .zip con las instancias")
+    parser.add_argument("soluciones", help="archivo solutions.json")
+    parser.add_argument("--epsilon", type=float, nargs="+", default=EPSILONS_POR_DEFECTO,
+                        help=f"valores de epsilon (por defecto {EPSILONS_POR_DEFECTO}, alrededor de 100)")
+    parser.add_argument("--muestras", type=int, nargs="+", default=MUESTRAS_POR_DEFECTO)
+    parser.add_argument("--workers", type=int, default=1, help="procesos en paralelo")
+    parser.add_argument("--salida", default="barrido_parametros.csv", help="CSV con la tabla larga")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    paired_data = cargar_pares(args.instancias, args.soluciones)
+    tabla = correr_barrido_general(paired_data, args.epsilon, args.muestras, args.workers)
+    tabla.to_csv(args.salida, index=False)
+    print(f"{len(paired_data)} instancias x {len(args.epsilon) * len(args.muestras)} combinaciones "
+          f"en {time.perf_counter() - inicio:.1f}s -> {args.salida}")
+    if not tabla.empty:
+        print(resumen_barrido(tabla).pivot_table(index=['epsilon', 'cant_muestras'], columns='metric', values='value')
+              .round(3).to_string())
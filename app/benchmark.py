@@ -0,0 +1,247 @@
+"""
+Benchmark por etapas del análisis, sobre las instancias de Dabia et al. (2013).
+
+Corre el _analisis_instancia real con el perfilado activo (perfilado.py) y toma de su Perfil el tiempo
+de cada etapa; después mide la exportación:
+    simulacion   simulacion_lote + tramos_por_ruta
+    clusters     clusters_arcos_ruta (arcos factibles por intervalo)
+    duraciones   duracion_arcos (fwd muestreado)
+    metricas     arrays_arcos_factibles + metricas_ruta (métricas y deciles de cada arco)
+    tabla        armado del DataFrame de arcos
+    resumen      resumen_metricas (distribución de deciles y resumen de la instancia)
+    exportacion  tablas de resultados a Parquet/Arrow/Excel
+Cada etapa se repite y se toma el mínimo. Los resultados se agrupan por tamaño (25/50/100) y familia
+(C/R/RC) y se guardan en JSON; con --comparar se marcan las regresiones respecto de un benchmark anterior.
+
+Uso:
+    python benchmark.py --salida bench.json
+    python benchmark.py --tamanos 25 50 --por-grupo 3 --comparar bench_base.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import perfilado
+import tdvrp_analyzer as core
+from cache_resultados import VERSION_CODIGO
+
+
+ETAPAS = perfilado.ETAPAS + ['exportacion']
+_DIR_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+INSTANCIAS_POR_DEFECTO = os.path.join(_DIR_DATOS, 'instancias-dabia_et_al_2013')
+SOLUCIONES_POR_DEFECTO = os.path.join(_DIR_DATOS, 'solutions.json')
+UMBRAL_REGRESION = 0.10
+PISO_SEGUNDOS = 0.005  # diferencias menores se consideran ruido
+
+
+def _tamano(instance_name: str) -> int:
+    return int(instance_name.rsplit('_', 1)[1])
+
+
+def _medir_una_vez(instance_name: str, instance_data: dict, solution_data: dict, epsilon: float,
+                   cant_muestras: int, formato: str, directorio: str) -> Tuple[Dict[str, float], pd.DataFrame]:
+    # el análisis es el de la app y los CLI: los tiempos por etapa salen de su instrumentación
+    with perfilado.perfilar(True) as perfil:
+        analysis_df = core._analisis_instancia(instance_name, instance_data, solution_data, epsilon, cant_muestras)
+        with perfilado.etapa('resumen'):
+            summary = core.resumen_metricas(analysis_df)
+    tiempos = {etapa: perfil.etapas.get(etapa, 0.0) for etapa in perfilado.ETAPAS}
+
+    t = time.perf_counter()
+    if formato == 'xlsx':
+        core.export_results_to_excel(analysis_df, summary, os.path.join(directorio, 'bench.xlsx'))
+    else:
+        core.export_tablas_columnar(core.tablas_resultados(analysis_df, summary), directorio, formato)
+    tiempos['exportacion'] = time.perf_counter() - t
+    return tiempos, analysis_df
+
+
+def medir_instancia(instance_name: str, instance_data: dict, solution_data: dict, epsilon: float = 0.1,
+                    cant_muestras: int = 10, repeticiones: int = 3, formato: str = 'parquet') -> Dict:
+    '''
+    tiempos por etapa de una instancia (mínimo de repeticiones corridas).
+
+    devuelve:
+        diccionario con instance_name, familia, tamano, arcos, una clave por etapa (segundos) y total
+    '''
+    mejores = dict.fromkeys(ETAPAS, np.inf)
+    with tempfile.TemporaryDirectory() as directorio:
+        for _ in range(repeticiones):
+            tiempos, analysis_df = _medir_una_vez(instance_name, instance_data, solution_data, epsilon,
+                                                  cant_muestras, formato, directorio)
+            for etapa in ETAPAS:
+                mejores[etapa] = min(mejores[etapa], tiempos[etapa])
+    return {
+        'instance_name': instance_name,
+        'familia': core._tipo_instancia(instance_name),
+        'tamano': _tamano(instance_name),
+        'arcos': len(analysis_df),
+        **mejores,
+        'total': sum(mejores.values()),
+    }
+
+
+def resumen_grupos(tabla: pd.DataFrame) -> pd.DataFrame:
+    '''suma de los tiempos por (tamano, familia), más una fila "todas" por tamaño y una del total'''
+    # un benchmark guardado con otra versión puede no tener todas las etapas actuales
+    columnas = ['arcos'] + [etapa for etapa in ETAPAS if etapa in tabla.columns] + ['total']
+
+    def sumar(claves):
+        return tabla.groupby(claves)[columnas].sum().assign(instancias=tabla.groupby(claves).size()).reset_index()
+
+    total = tabla[columnas].sum().to_frame().T.assign(instancias=len(tabla), tamano='todos', familia='todas')
+    grupos = pd.concat([sumar(['tamano', 'familia']), sumar(['tamano']).assign(familia='todas'), total], ignore_index=True)
+    grupos['tamano'] = grupos['tamano'].astype(str)
+    grupos[['instancias', 'arcos']] = grupos[['instancias', 'arcos']].astype(np.int64)
+    return grupos[['tamano', 'familia', 'instancias'] + columnas]
+
+
+def correr_benchmark(instancias: str = INSTANCIAS_POR_DEFECTO, soluciones: str = SOLUCIONES_POR_DEFECTO,
+                     tamanos: List[int] = None, familias: List[str] = None, por_grupo: int = None,
+                     epsilon: float = 0.1, cant_muestras: int = 10, repeticiones: int = 3,
+                     formato: str = 'parquet', al_avanzar=None) -> Dict:
+    '''
+    corre el benchmark sobre las instancias pedidas.
+
+    recibe:
+        instancias, soluciones: como en cargar_pares
+        tamanos, familias: filtros (None: todos)
+        por_grupo: como máximo esta cantidad de instancias por (tamano, familia), en orden de nombre
+        epsilon, cant_muestras: parámetros del análisis
+        repeticiones: corridas por instancia (se toma el mínimo de cada etapa)
+        formato: formato de la etapa de exportación (parquet, arrow o xlsx)
+        al_avanzar: función opcional que recibe el resultado de cada instancia
+
+    devuelve:
+        {'meta': ..., 'instancias': [...], 'grupos': [...]} (serializable a JSON)
+    '''
+    paired_data = core.cargar_pares(instancias, soluciones)
+    elegidas, cuenta = [], {}
+    for name in sorted(paired_data):
+        grupo = (_tamano(name), core._tipo_instancia(name))
+        if (tamanos and grupo[0] not in tamanos) or (familias and grupo[1] not in familias):
+            continue
+        if por_grupo is not None and cuenta.get(grupo, 0) >= por_grupo:
+            continue
+        cuenta[grupo] = cuenta.get(grupo, 0) + 1
+        elegidas.append(name)
+
+    filas = []
+    inicio = time.perf_counter()
+    for name in elegidas:
+        fila = medir_instancia(name, paired_data[name]['instance'], paired_data[name]['solution'],
+                               epsilon, cant_muestras, repeticiones, formato)
+        filas.append(fila)
+        if al_avanzar is not None:
+            al_avanzar(fila)
+
+    tabla = pd.DataFrame(filas)
+    return {
+        'meta': {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'version_codigo': VERSION_CODIGO,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+            'procesador': platform.processor() or platform.machine(),
+            'epsilon': epsilon,
+            'cant_muestras': cant_muestras,
+            'repeticiones': repeticiones,
+            'formato': formato,
+            'etapas': ETAPAS,
+            'segundos': time.perf_counter() - inicio,
+        },
+        'instancias': filas,
+        'grupos': resumen_grupos(tabla).to_dict('records') if filas else [],
+    }
+
+
+def comparar(actual: Dict, base: Dict, umbral: float = UMBRAL_REGRESION, piso: float = PISO_SEGUNDOS) -> pd.DataFrame:
+    '''
+    compara los tiempos por grupo y etapa contra un benchmark anterior (solo las instancias medidas en ambos).
+
+    devuelve:
+        DataFrame con tamano, familia, etapa, base, actual, cambio_pct y regresion
+        (actual más lento que base en más de umbral, y por más de piso segundos)
+    '''
+    tabla_actual = pd.DataFrame(actual['instancias'])
+    tabla_base = pd.DataFrame(base['instancias'])
+    comunes = sorted(set(tabla_actual['instance_name']) & set(tabla_base['instance_name']))
+    if not comunes:
+        return pd.DataFrame(columns=['tamano', 'familia', 'etapa', 'base', 'actual', 'cambio_pct', 'regresion'])
+
+    grupos = {}
+    for nombre, tabla in (('actual', tabla_actual), ('base', tabla_base)):
+        grupos[nombre] = resumen_grupos(tabla[tabla['instance_name'].isin(comunes)]).set_index(['tamano', 'familia'])
+    filas = []
+    for (tamano, familia) in grupos['actual'].index:
+        for etapa in [e for e in ETAPAS + ['total'] if e in grupos['base'].columns]:
+            t_base = float(grupos['base'].loc[(tamano, familia), etapa])
+            t_actual = float(grupos['actual'].loc[(tamano, familia), etapa])
+            filas.append({
+                'tamano': tamano, 'familia': familia, 'etapa': etapa, 'base': t_base, 'actual': t_actual,
+                'cambio_pct': (t_actual / t_base - 1) * 100 if t_base > 0 else np.nan,
+                'regresion': t_actual > t_base * (1 + umbral) and t_actual - t_base > piso,
+            })
+    return pd.DataFrame(filas)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark por etapas del análisis TDVRP.")
+    parser.add_argument("--instancias", default=INSTANCIAS_POR_DEFECTO, help="directorio o .zip con las instancias")
+    parser.add_argument("--soluciones", default=SOLUCIONES_POR_DEFECTO, help="archivo solutions.json")
+    parser.add_argument("--tamanos", type=int, nargs="+", choices=[25, 50, 100], help="tamaños a medir (por defecto todos)")
+    parser.add_argument("--familias", nargs="+", choices=core.TIPOS_INSTANCIA, help="familias a medir (por defecto todas)")
+    parser.add_argument("--por-grupo", type=int, help="máximo de instancias por (tamaño, familia)")
+    parser.add_argument("--epsilon", type=float, default=0.1)
+    parser.add_argument("--muestras", type=int, default=10)
+    parser.add_argument("--repeticiones", type=int, default=3, help="corridas por instancia (se toma el mínimo)")
+    parser.add_argument("--formato", choices=['parquet', 'arrow', 'xlsx'], default='parquet', help="formato de la etapa de exportación")
+    parser.add_argument("--salida", default="benchmark.json", help="archivo JSON con los resultados")
+    parser.add_argument("--comparar", help="benchmark anterior (JSON) contra el cual marcar regresiones")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION, help="aumento relativo que cuenta como regresión")
+    parser.add_argument("--piso", type=float, default=PISO_SEGUNDOS, help="diferencia mínima en segundos que cuenta como regresión")
+    args = parser.parse_args(argv)
+
+    resultado = correr_benchmark(
+        args.instancias, args.soluciones, args.tamanos, args.familias, args.por_grupo, args.epsilon,
+        args.muestras, args.repeticiones, args.formato,
+        al_avanzar=lambda f: print(f"{f['instance_name']}: {f['total']:.3f}s ({f['arcos']} arcos)", file=sys.stderr, flush=True)
+    )
+    with open(args.salida, 'w') as f:
+        json.dump(resultado, f, indent=1, default=float)
+
+    pd.set_option('display.width', 200)
+    grupos = pd.DataFrame(resultado['grupos'])
+    if not grupos.empty:
+        print(grupos[['tamano', 'familia', 'instancias', 'arcos'] + ETAPAS + ['total']].round(3).to_string(index=False))
+    print(f"-> {args.salida}", file=sys.stderr)
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)
+        comparacion = comparar(resultado, base, args.umbral, args.piso)
+        regresiones = comparacion[comparacion['regresion']]
+        print(f"\nComparación con {args.comparar} (umbral {args.umbral:.0%}):")
+        print(comparacion.pivot_table(index=['tamano', 'familia'], columns='etapa', values='cambio_pct', sort=False)
+              .reindex(columns=ETAPAS + ['total']).round(1).to_string())
+        if not regresiones.empty:
+            print(f"\n{len(regresiones)} regresiones:")
+            print(regresiones.round(4).to_string(index=False))
+            return 1
+        print("\nSin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
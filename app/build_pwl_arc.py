@@ -1,4 +1,5 @@
 import json, math, argparse, csv
+import numpy as np
 
 def Z(I):
     # zonas de velocidad como tuplas de floats
@@ -40,6 +41,49 @@ def fwd(D, x, VZ, Zs, per):  # tiempo exacto recorriendo zonas
     return math.inf
 
 
+def fwd_vec(D, x, VZ, Zs, per, ciclico=True):  # fwd sobre arrays: un elemento por arco/salida
+    '''
+    versión vectorizada de fwd: mismo recorrido por zonas, pero avanzando todos los elementos a la vez.
+    D: distancias (n,), x: instantes de salida (n,), VZ: velocidades por zona de cada elemento (n, len(Zs)).
+    ciclico=False no da la vuelta al horizonte: si el viaje pasa el final de la última zona, es inf
+    (como travel_time del checker).
+    devuelve un array (n,) con los tiempos de viaje (inf si no se puede recorrer la distancia)
+    '''
+    D = np.asarray(D, dtype=float)
+    t = np.array(np.broadcast_to(np.asarray(x, dtype=float), D.shape))
+    VZ = np.asarray(VZ, dtype=float)
+    ini = np.array([a for a, _ in Zs], dtype=float)
+    fin = np.array([b for _, b in Zs], dtype=float)
+    ultima = len(Zs) - 1
+
+    res = np.full(D.shape, math.inf)
+    res[D <= 0] = 0.0
+    tot = np.zeros(D.shape)
+    rem = D.copy()
+    act = np.flatnonzero(D > 0)
+    for _ in range(len(Zs)*4 + 10): # para evitar bucles infinitos
+        if not act.size: break
+        ta = t[act]
+        # zona de cada t (igual que zid: la que contiene a t, o la última si no hay ninguna)
+        i = np.searchsorted(ini, ta, side='right') - 1
+        i = np.where((i < 0) | (ta >= fin[np.maximum(i, 0)]), ultima, i)
+        v = VZ[act, i]
+
+        # zona con velocidad 0 o negativa: queda en inf
+        ok = v > 0
+        act, ta, i, v = act[ok], ta[ok], i[ok], v[ok]
+
+        cap = v * (fin[i] - ta)
+        termina = rem[act] <= cap + 1e-12
+        res[act[termina]] = tot[act[termina]] + rem[act[termina]] / v[termina]
+
+        sigue = ~termina
+        if not ciclico: sigue &= i != ultima
+        act, ta, i, cap = act[sigue], ta[sigue], i[sigue], cap[sigue]
+        tot[act] += fin[i] - ta; rem[act] -= cap; t[act] = fin[i] % per
+    return res
+
+
 
 
 
@@ -0,0 +1,171 @@
+"""
+Caché en disco de los resultados del análisis por instancia, direccionada por contenido.
+
+La clave es el hash de (instancia, solución, epsilon, cant_muestras, versión del código): si ninguno cambió,
+el DataFrame de la instancia y su resumen se leen del disco en lugar de recalcularse. Los DataFrames se
+guardan en Parquet (o pickle si pyarrow no está instalado) y la caché se acota en tamaño desalojando
+las entradas usadas hace más tiempo.
+
+La caché se pasa explícitamente (cache=CacheResultados(directorio)) a correr_analisis_instancia,
+correr_analisis_general y sus variantes; cada llamada decide si la usa. La variable de entorno
+TDVRP_CACHE_DIR es solo el valor por defecto de los CLI (ver cache_por_defecto).
+"""
+
+import hashlib
+import importlib.util
+import json
+import math
+import os
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+
+_DIR_CODIGO = os.path.dirname(os.path.abspath(__file__))
+# módulos cuyo código define el resultado del análisis
+_MODULOS_ANALISIS = ['build_pwl_arc.py', 'simulacion.py', 'metricas_arcos.py', 'tdvrp_analyzer.py']
+
+FORMATO = 'parquet' if importlib.util.find_spec('pyarrow') is not None else 'pickle'
+MAX_BYTES_POR_DEFECTO = 2 * 1024 ** 3
+
+
+def _version_codigo() -> str:
+    h = hashlib.sha256()
+    for nombre in _MODULOS_ANALISIS:
+        with open(os.path.join(_DIR_CODIGO, nombre), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+VERSION_CODIGO = _version_codigo()
+
+
+def hash_json(obj) -> str:
+    '''hash estable de un objeto JSON (independiente del orden de las claves)'''
+    texto = json.dumps(obj, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def clave_analisis(instance_data: dict, solution_data: dict, epsilon: float, cant_muestras: int) -> str:
+    '''clave de caché de un par instancia-solución analizado con esos parámetros'''
+    partes = [hash_json(instance_data), hash_json(solution_data), repr(float(epsilon)), str(int(cant_muestras)), VERSION_CODIGO]
+    return hashlib.sha256('|'.join(partes).encode('utf-8')).hexdigest()
+
+
+def escribir_atomico(ruta: str, escribir) -> None:
+    '''
+    escribe un archivo de forma atómica: escribir(f) llena un temporal en el mismo directorio que
+    después reemplaza a ruta, así nunca queda un archivo a medio escribir (ni aunque se corte el proceso).
+    '''
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(ruta)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            escribir(f)
+        os.replace(tmp, ruta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _a_json(valor):
+    # escalares de numpy/pandas -> tipos de Python
+    return valor.item() if hasattr(valor, 'item') else str(valor)
+
+
+class CacheResultados:
+    '''
+    caché de (DataFrame, resumen) por clave en un directorio, con tamaño máximo en bytes
+    (max_bytes=None: sin límite, no se desaloja nada).
+    las escrituras son atómicas, así que varios procesos pueden compartir el directorio.
+    '''
+
+    def __init__(self, directorio: str, max_bytes: Optional[int] = MAX_BYTES_POR_DEFECTO):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directorio, exist_ok=True)
+
+    def _rutas(self, clave: str) -> Tuple[str, str]:
+        ext = 'parquet' if FORMATO == 'parquet' else 'pkl'
+        base = os.path.join(self.directorio, clave)
+        return f"{base}.{ext}", f"{base}.json"
+
+    def obtener(self, clave: str) -> Optional[Tuple[pd.DataFrame, Dict]]:
+        '''devuelve (DataFrame, resumen) si la clave está en la caché, o None'''
+        ruta_df, ruta_resumen = self._rutas(clave)
+        try:
+            with open(ruta_resumen, 'r') as f:
+                resumen = json.load(f)
+            df = pd.read_parquet(ruta_df) if FORMATO == 'parquet' else pd.read_pickle(ruta_df)
+        except (FileNotFoundError, ValueError, OSError):
+            self.misses += 1
+            return None
+        # marcar como usada recientemente (para el desalojo)
+        ahora = time.time()
+        for ruta in (ruta_df, ruta_resumen):
+            try:
+                os.utime(ruta, (ahora, ahora))
+            except FileNotFoundError:
+                pass
+        self.hits += 1
+        return df, resumen
+
+    def guardar(self, clave: str, df: pd.DataFrame, resumen: Dict) -> None:
+        '''guarda el resultado de una clave y desaloja entradas viejas si se supera max_bytes'''
+        ruta_df, ruta_resumen = self._rutas(clave)
+        escribir_atomico(ruta_df, lambda f: df.to_parquet(f, index=False) if FORMATO == 'parquet' else df.to_pickle(f))
+        escribir_atomico(ruta_resumen, lambda f: f.write(json.dumps(resumen, default=_a_json).encode('utf-8')))
+        if self.max_bytes is not None:
+            self._desalojar()
+
+    def _desalojar(self) -> None:
+        entradas = {}
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith('.tmp'):
+                continue
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                st = os.stat(ruta)
+            except FileNotFoundError:
+                continue
+            clave = nombre.split('.', 1)[0]
+            tam, usado = entradas.get(clave, (0, 0.0))
+            entradas[clave] = (tam + st.st_size, max(usado, st.st_mtime))
+
+        total = sum(tam for tam, _ in entradas.values())
+        for clave, (tam, _) in sorted(entradas.items(), key=lambda e: e[1][1]):
+            if total <= self.max_bytes:
+                break
+            for ruta in self._rutas(clave):
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+            total -= tam
+
+    def tasa_aciertos(self) -> float:
+        consultas = self.hits + self.misses
+        return self.hits / consultas if consultas else math.nan
+
+    def limpiar(self) -> None:
+        '''borra todas las entradas'''
+        for nombre in os.listdir(self.directorio):
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except FileNotFoundError:
+                pass
+
+
+def cache_por_defecto() -> Optional[CacheResultados]:
+    '''
+    la caché de las variables de entorno TDVRP_CACHE_DIR y TDVRP_CACHE_MAX_BYTES, o None si no hay
+    ninguna configurada (el valor por defecto de los CLI)
+    '''
+    directorio = os.environ.get('TDVRP_CACHE_DIR')
+    if not directorio:
+        return None
+    return CacheResultados(directorio, int(os.environ.get('TDVRP_CACHE_MAX_BYTES', MAX_BYTES_POR_DEFECTO)))
@@ -0,0 +1,389 @@
+"""
+Cola de trabajo en un directorio compartido para repartir el análisis global entre varias máquinas.
+
+No hace falta ningún servicio: los nodos solo comparten un directorio (NFS, SMB, etc.).
+    <cola>/cola.json        parámetros, versión del código y clave de cada par
+    <cola>/pares/           un .json por par instancia-solución (los nodos no necesitan los archivos originales)
+    <cola>/leases/          <par>.lock mientras un nodo lo está analizando
+    <cola>/hechos/          <par>.json cuando terminó (completo o con error)
+    <cola>/resultados/      DataFrame + resumen de cada par, por clave (como cache_resultados.py)
+
+Un nodo toma un par creando su lease con O_CREAT | O_EXCL (atómico: lo logra uno solo) y la renueva
+(mtime) mientras trabaja. Si un nodo muere, su lease deja de renovarse y, pasada la duración de la lease,
+otro nodo la reclama: la aparta con un rename y, si lo apartado resulta vigente (otro nodo la reclamó y
+creó una nueva entre medio), la devuelve. En el peor caso (un nodo muy lento al que le roban la lease) un
+par se analiza dos veces; como el resultado depende solo del contenido y las escrituras son atómicas, no
+se corrompe nada.
+
+Uso:
+    python cola_trabajo.py crear <cola> <instancias dir|zip> <solutions.json> --epsilon 0.1 --muestras 10
+    python cola_trabajo.py trabajar <cola> --procesos 4        (en cada nodo)
+    python cola_trabajo.py estado <cola>
+    python cola_trabajo.py combinar <cola> --salida resultados/ --formato parquet
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+import tdvrp_analyzer as core
+from cache_resultados import VERSION_CODIGO, CacheResultados, clave_analisis, escribir_atomico
+from corridas import combinar_resultados
+
+
+DURACION_LEASE = 600.0
+ESPERA_SIN_TRABAJO = 5.0
+
+
+def _ruta(directorio: str, *partes: str) -> str:
+    return os.path.join(directorio, *partes)
+
+
+def _escribir_json(ruta: str, obj) -> None:
+    texto = json.dumps(obj, indent=1, ensure_ascii=False)
+    escribir_atomico(ruta, lambda f: f.write(texto.encode('utf-8')))
+
+
+def _leer_json(ruta: str) -> Optional[Dict]:
+    try:
+        with open(ruta, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def leer_cola(directorio: str) -> Dict:
+    cola = _leer_json(_ruta(directorio, 'cola.json'))
+    if cola is None:
+        raise ValueError(f"{directorio} no es una cola de trabajo (falta cola.json)")
+    return cola
+
+
+def crear_cola(directorio: str, paired_data: Dict, epsilon: float = 0.1, cant_muestras: int = 10) -> Dict:
+    '''
+    crea la cola con los pares de paired_data, o le agrega pares si ya existe (con los mismos parámetros).
+    los pares cuyo contenido cambió vuelven a quedar pendientes.
+
+    devuelve:
+        el contenido de cola.json
+    '''
+    for sub in ('pares', 'leases', 'hechos', 'resultados'):
+        os.makedirs(_ruta(directorio, sub), exist_ok=True)
+
+    cola = _leer_json(_ruta(directorio, 'cola.json'))
+    if cola is None:
+        cola = {
+            'creada': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'parametros': {'epsilon': float(epsilon), 'cant_muestras': int(cant_muestras)},
+            'version_codigo': VERSION_CODIGO,
+            'pares': {},
+        }
+    elif (cola['parametros']['epsilon'], cola['parametros']['cant_muestras']) != (float(epsilon), int(cant_muestras)):
+        raise ValueError(f"La cola en {directorio} usa otros parámetros: {cola['parametros']}")
+    elif cola['version_codigo'] != VERSION_CODIGO:
+        raise ValueError(f"La cola en {directorio} se creó con otra versión del código ({cola['version_codigo']})")
+
+    for name, data in paired_data.items():
+        clave = clave_analisis(data['instance'], data['solution'], epsilon, cant_muestras)
+        if cola['pares'].get(name) == clave:
+            continue
+        _escribir_json(_ruta(directorio, 'pares', f"{name}.json"), data)
+        hecho = _ruta(directorio, 'hechos', f"{name}.json")
+        if os.path.exists(hecho):
+            os.remove(hecho)
+        cola['pares'][name] = clave
+    _escribir_json(_ruta(directorio, 'cola.json'), cola)
+    return cola
+
+
+# ============= LEASES =============
+
+def _tomar_lease(ruta: str, trabajador: str, duracion: float) -> bool:
+    '''
+    intenta tomar la lease en ruta; devuelve True si la tomó este trabajador.
+    una lease cuyo mtime tiene más de duracion segundos se considera de un nodo muerto y se reclama.
+    '''
+    for _ in range(2):
+        try:
+            fd = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not _vencida(ruta, duracion):
+                return False
+            # lease vencida: la aparta el único que logre renombrarla
+            apartada = f"{ruta}.vencida.{trabajador}"
+            try:
+                os.rename(ruta, apartada)
+            except FileNotFoundError:
+                return False
+            # entre el stat y el rename otro nodo pudo reclamarla y crear una lease nueva: si lo que se
+            # apartó está vigente, es de ese nodo y se devuelve a su lugar
+            if not _vencida(apartada, duracion):
+                _restaurar_lease(apartada, ruta)
+                return False
+            os.remove(apartada)
+            continue
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'trabajador': trabajador, 'host': socket.gethostname(), 'pid': os.getpid(),
+                       'tomada': time.strftime('%Y-%m-%dT%H:%M:%S')}, f)
+        return True
+    return False
+
+
+def _vencida(ruta: str, duracion: float) -> bool:
+    # una lease que ya no existe no está vencida (se liberó o la apartó otro nodo)
+    try:
+        return time.time() - os.stat(ruta).st_mtime >= duracion
+    except FileNotFoundError:
+        return False
+
+
+def _restaurar_lease(apartada: str, ruta: str) -> None:
+    # link en lugar de rename: no pisa una lease que otro nodo haya creado en ruta mientras tanto.
+    # si eso pasó, el dueño de la apartada la pierde (su _RenovadorLease lo detecta) y, en el peor caso,
+    # el par se analiza dos veces
+    try:
+        os.link(apartada, ruta)
+    except FileExistsError:
+        pass
+    os.remove(apartada)
+
+
+def _duenio_lease(ruta: str) -> Optional[str]:
+    lease = _leer_json(ruta)
+    return None if lease is None else lease.get('trabajador')
+
+
+def _liberar_lease(ruta: str, trabajador: str) -> None:
+    # solo si sigue siendo nuestra (si la reclamó otro nodo, es de él)
+    if _duenio_lease(ruta) == trabajador:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+
+class _RenovadorLease(threading.Thread):
+    '''
+    actualiza el mtime de la lease cada duracion / 3 segundos mientras se analiza el par.
+    si la lease dejó de ser de este trabajador, no la toca (sería renovar la de otro nodo) y marca perdida.
+    '''
+
+    def __init__(self, ruta: str, trabajador: str, duracion: float):
+        super().__init__(daemon=True)
+        self.ruta = ruta
+        self.trabajador = trabajador
+        self.intervalo = duracion / 3
+        self.perdida = False
+        self._fin = threading.Event()
+
+    def run(self) -> None:
+        while not self._fin.wait(self.intervalo):
+            if _duenio_lease(self.ruta) != self.trabajador:
+                self.perdida = True
+                return
+            try:
+                os.utime(self.ruta)
+            except FileNotFoundError:
+                self.perdida = True
+                return
+
+    def detener(self) -> None:
+        self._fin.set()
+        self.join()
+
+
+# ============= TRABAJADORES =============
+
+def _completo(directorio: str, name: str, clave: str) -> bool:
+    hecho = _leer_json(_ruta(directorio, 'hechos', f"{name}.json"))
+    return hecho is not None and hecho.get('clave') == clave
+
+
+def trabajar(directorio: str, trabajador: str = None, duracion_lease: float = DURACION_LEASE,
+             esperar: bool = True, max_pares: int = None, al_avanzar: Callable[[Dict], None] = None) -> Dict[str, int]:
+    '''
+    toma pares de la cola y los analiza hasta que no quedan pendientes.
+
+    recibe:
+        directorio: la cola (ver crear_cola)
+        trabajador: identificador del nodo (por defecto host-pid)
+        duracion_lease: segundos sin renovar tras los cuales una lease se considera abandonada
+        esperar: si quedan pares tomados por otros nodos, esperar por si sus leases vencen (en lugar de terminar)
+        max_pares: cortar después de analizar esa cantidad de pares
+        al_avanzar: función opcional que recibe {'instance_name', 'estado', 'arcos', 'error', 'segundos'} por par
+
+    devuelve:
+        {'completas': ..., 'errores': ...} de este trabajador
+    '''
+    cola = leer_cola(directorio)
+    if cola['version_codigo'] != VERSION_CODIGO:
+        raise ValueError(f"La cola en {directorio} se creó con otra versión del código ({cola['version_codigo']}); "
+                         f"este nodo tiene {VERSION_CODIGO}")
+    trabajador = trabajador or f"{socket.gethostname()}-{os.getpid()}"
+    epsilon, cant_muestras = cola['parametros']['epsilon'], cola['parametros']['cant_muestras']
+    resultados = CacheResultados(_ruta(directorio, 'resultados'), max_bytes=None)
+    conteo = {'completas': 0, 'errores': 0}
+
+    while max_pares is None or sum(conteo.values()) < max_pares:
+        pendientes = [name for name, clave in cola['pares'].items() if not _completo(directorio, name, clave)]
+        if not pendientes:
+            break
+        # cada nodo recorre los pares desde un punto distinto, para no competir siempre por el mismo
+        inicio = random.randrange(len(pendientes))
+        tomado = False
+        for name in pendientes[inicio:] + pendientes[:inicio]:
+            clave = cola['pares'][name]
+            ruta_lease = _ruta(directorio, 'leases', f"{name}.lock")
+            if not _tomar_lease(ruta_lease, trabajador, duracion_lease):
+                continue
+            renovador = _RenovadorLease(ruta_lease, trabajador, duracion_lease)
+            renovador.start()
+            try:
+                if _completo(directorio, name, clave):  # lo terminó otro nodo entre medio
+                    continue
+                tomado = True
+                comienzo = time.perf_counter()
+                data = _leer_json(_ruta(directorio, 'pares', f"{name}.json"))
+                _, instance_df, instance_summary, error = core._analizar_par_aislado(name, data, epsilon, cant_muestras)
+                hecho = {'clave': clave, 'trabajador': trabajador, 'terminado': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                         'segundos': round(time.perf_counter() - comienzo, 3)}
+                if error is None:
+                    # primero el resultado y después la marca de terminado
+                    resultados.guardar(clave, instance_df, instance_summary)
+                    hecho.update(estado='completa', arcos=len(instance_df))
+                    conteo['completas'] += 1
+                else:
+                    hecho.update(estado='error', error=error)
+                    conteo['errores'] += 1
+                _escribir_json(_ruta(directorio, 'hechos', f"{name}.json"), hecho)
+            finally:
+                renovador.detener()
+                _liberar_lease(ruta_lease, trabajador)
+            if al_avanzar is not None:
+                al_avanzar(dict(hecho, instance_name=name, arcos=hecho.get('arcos', 0), error=hecho.get('error')))
+            break
+
+        if not tomado:
+            if not esperar:
+                break
+            time.sleep(ESPERA_SIN_TRABAJO)
+    return conteo
+
+
+def trabajar_local(directorio: str, procesos: int, duracion_lease: float = DURACION_LEASE,
+                   esperar: bool = True) -> Dict[str, int]:
+    '''
+    corre procesos trabajadores en esta máquina (cada uno como un nodo independiente): sirve para usar
+    todos los núcleos de un nodo y para simular varios nodos en una sola máquina.
+    '''
+    host = socket.gethostname()
+    total = {'completas': 0, 'errores': 0}
+    with ProcessPoolExecutor(max_workers=procesos) as executor:
+        futuros = [executor.submit(trabajar, directorio, f"{host}-{os.getpid()}-{i}", duracion_lease, esperar)
+                   for i in range(procesos)]
+        for futuro in futuros:
+            for k, v in futuro.result().items():
+                total[k] += v
+    return total
+
+
+# ============= ESTADO Y COMBINACIÓN =============
+
+def estado_cola(directorio: str) -> Dict:
+    '''cantidad de pares por estado (completa, error, en_curso, pendiente) y pares completos por trabajador'''
+    cola = leer_cola(directorio)
+    estado = {'total': len(cola['pares']), 'completa': 0, 'error': 0, 'en_curso': 0, 'pendiente': 0, 'por_trabajador': {}}
+    for name, clave in cola['pares'].items():
+        hecho = _leer_json(_ruta(directorio, 'hechos', f"{name}.json"))
+        if hecho is not None and hecho.get('clave') == clave:
+            estado[hecho['estado']] += 1
+            por_trabajador = estado['por_trabajador']
+            por_trabajador[hecho['trabajador']] = por_trabajador.get(hecho['trabajador'], 0) + 1
+        elif os.path.exists(_ruta(directorio, 'leases', f"{name}.lock")):
+            estado['en_curso'] += 1
+        else:
+            estado['pendiente'] += 1
+    return estado
+
+
+def iterar_resultados_cola(directorio: str) -> Iterator[Tuple[str, pd.DataFrame, Dict]]:
+    '''genera (instance_name, instance_df, instance_summary) de los pares completos, en el orden de la cola'''
+    cola = leer_cola(directorio)
+    resultados = CacheResultados(_ruta(directorio, 'resultados'), max_bytes=None)
+    for name, clave in cola['pares'].items():
+        hecho = _leer_json(_ruta(directorio, 'hechos', f"{name}.json"))
+        if hecho is None or hecho.get('clave') != clave or hecho['estado'] != 'completa':
+            continue
+        guardado = resultados.obtener(clave)
+        if guardado is not None:
+            yield name, guardado[0], guardado[1]
+
+
+def combinar_cola(directorio: str) -> Tuple[pd.DataFrame, Dict]:
+    '''global_df y global_metrics (como correr_analisis_general) con los resultados de todos los nodos'''
+    return combinar_resultados(iterar_resultados_cola(directorio), list(leer_cola(directorio)['pares']))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Cola de trabajo en un directorio compartido para el análisis global.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_crear = sub.add_parser("crear", help="crear la cola (o agregarle pares)")
+    p_crear.add_argument("cola")
+    p_crear.add_argument("instancias", help="directorio o .zip con las instancias (.json)")
+    p_crear.add_argument("soluciones", help="archivo solutions.json")
+    p_crear.add_argument("--epsilon", type=float, default=0.1)
+    p_crear.add_argument("--muestras", type=int, default=10)
+
+    p_trabajar = sub.add_parser("trabajar", help="analizar pares de la cola hasta que no queden")
+    p_trabajar.add_argument("cola")
+    p_trabajar.add_argument("--trabajador", help="identificador de este nodo (por defecto host-pid)")
+    p_trabajar.add_argument("--procesos", type=int, default=1, help="trabajadores en paralelo en este nodo")
+    p_trabajar.add_argument("--lease", type=float, default=DURACION_LEASE, help="segundos de validez de una lease sin renovar")
+    p_trabajar.add_argument("--no-esperar", action="store_true", help="terminar si los pares restantes están tomados por otros nodos")
+
+    p_estado = sub.add_parser("estado", help="mostrar el avance de la cola")
+    p_estado.add_argument("cola")
+
+    p_combinar = sub.add_parser("combinar", help="exportar los resultados de todos los nodos")
+    p_combinar.add_argument("cola")
+    p_combinar.add_argument("--salida", default="resultados_analisis")
+    p_combinar.add_argument("--formato", choices=['parquet', 'arrow', 'csv', 'xlsx'], default='parquet')
+    args = parser.parse_args(argv)
+
+    if args.comando == "crear":
+        cola = crear_cola(args.cola, core.cargar_pares(args.instancias, args.soluciones), args.epsilon, args.muestras)
+        print(f"Cola en {args.cola}: {len(cola['pares'])} pares", file=sys.stderr)
+    elif args.comando == "trabajar":
+        if args.procesos > 1:
+            conteo = trabajar_local(args.cola, args.procesos, args.lease, not args.no_esperar)
+        else:
+            conteo = trabajar(args.cola, args.trabajador, args.lease, not args.no_esperar,
+                              al_avanzar=lambda h: print(f"{h['instance_name']}: {h['estado']} ({h['segundos']}s)",
+                                                         file=sys.stderr, flush=True))
+        print(f"{conteo['completas']} pares analizados, {conteo['errores']} con error", file=sys.stderr)
+    elif args.comando == "estado":
+        print(json.dumps(estado_cola(args.cola), indent=1, ensure_ascii=False))
+    else:
+        import analisis_batch
+
+        exportadas, filas, global_metrics, rutas = analisis_batch.exportar(
+            analisis_batch.pasos_guardados(iterar_resultados_cola(args.cola)), args.salida, args.formato)
+        estado = estado_cola(args.cola)
+        print(f"{exportadas} de {estado['total']} pares combinados, {filas} arcos", file=sys.stderr)
+        analisis_batch.log_resultados(lambda m: print(m, file=sys.stderr), global_metrics, rutas)
+        return 0 if exportadas == estado['total'] else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Corridas del análisis global con checkpoints en disco, que se pueden reanudar.
+
+Una corrida vive en un directorio:
+    <directorio>/manifest.json     parámetros, estado de la corrida y estado de cada instancia
+    <directorio>/instancias/       resultado de cada instancia (DataFrame + resumen), por hash de contenido
+
+El resultado de cada instancia se guarda apenas se calcula y recién después se marca como completa en el
+manifiesto; las dos escrituras son atómicas. Si la corrida se corta (error, Ctrl+C, Stop en la app o
+cancelación con detener), el manifiesto siempre describe lo que hay en disco, y al volver a ejecutarla
+se saltean los pares ya completos cuyo contenido no cambió.
+"""
+
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from cache_resultados import CacheResultados, clave_analisis, escribir_atomico
+import tdvrp_analyzer as core
+
+
+VERSION_MANIFIESTO = 1
+
+
+class CorridaAnalisis:
+    '''
+    corrida del análisis global en un directorio (se crea si no existe, o se abre para reanudarla).
+    los parámetros tienen que coincidir con los de la corrida guardada.
+    '''
+
+    def __init__(self, directorio: str, epsilon: float = 0.1, cant_muestras: int = 10):
+        self.directorio = directorio
+        self.ruta_manifiesto = os.path.join(directorio, 'manifest.json')
+        self.resultados = CacheResultados(os.path.join(directorio, 'instancias'), max_bytes=None)
+
+        if os.path.exists(self.ruta_manifiesto):
+            with open(self.ruta_manifiesto, 'r') as f:
+                self.manifiesto = json.load(f)
+            guardados = self.manifiesto['parametros']
+            if (guardados['epsilon'], guardados['cant_muestras']) != (float(epsilon), int(cant_muestras)):
+                raise ValueError(
+                    f"La corrida en {directorio} usa epsilon={guardados['epsilon']}, "
+                    f"cant_muestras={guardados['cant_muestras']}; no se puede reanudar con otros parámetros"
+                )
+        else:
+            self.manifiesto = {
+                'version': VERSION_MANIFIESTO,
+                'creada': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'parametros': {'epsilon': float(epsilon), 'cant_muestras': int(cant_muestras)},
+                'estado': 'nueva',
+                'instancias': {},
+            }
+            self._guardar_manifiesto()
+
+    @property
+    def epsilon(self) -> float:
+        return self.manifiesto['parametros']['epsilon']
+
+    @property
+    def cant_muestras(self) -> int:
+        return self.manifiesto['parametros']['cant_muestras']
+
+    @property
+    def estado(self) -> str:
+        '''"nueva", "en_curso", "cancelada", "con_errores" o "completa"'''
+        return self.manifiesto['estado']
+
+    def _guardar_manifiesto(self) -> None:
+        self.manifiesto['actualizada'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        texto = json.dumps(self.manifiesto, indent=1, ensure_ascii=False)
+        escribir_atomico(self.ruta_manifiesto, lambda f: f.write(texto.encode('utf-8')))
+
+    def _claves(self, paired_data: Dict) -> Dict[str, str]:
+        return {
+            name: clave_analisis(data['instance'], data['solution'], self.epsilon, self.cant_muestras)
+            for name, data in paired_data.items()
+        }
+
+    def completas(self, paired_data: Dict, claves: Dict[str, str] = None) -> set:
+        '''nombres de los pares de paired_data que ya están completos en esta corrida (con el mismo contenido)'''
+        claves = self._claves(paired_data) if claves is None else claves
+        instancias = self.manifiesto['instancias']
+        return {
+            name for name in paired_data
+            if instancias.get(name, {}).get('estado') == 'completa'
+            and instancias[name].get('clave') == claves[name]
+            and all(os.path.exists(ruta) for ruta in self.resultados._rutas(claves[name]))
+        }
+
+    def ejecutar(self, paired_data: Dict, workers: int = 1, detener: Callable[[], bool] = None,
+                 al_avanzar: Callable[[Dict], None] = None, con_perfil: Optional[bool] = None,
+                 cache: Optional[CacheResultados] = None) -> bool:
+        '''
+        analiza los pares de paired_data que no están completos y guarda cada resultado apenas termina.
+
+        recibe:
+            paired_data: salida de process_files
+            workers: procesos en paralelo (como en correr_analisis_general)
+            detener: función opcional; si devuelve True entre dos instancias, la corrida se cancela
+            al_avanzar: función opcional que recibe cada paso de iterar_analisis_general
+            con_perfil: perfilar cada instancia (ver correr_analisis_general)
+            cache: caché compartida de resultados (ver correr_analisis_general), aparte de la de la corrida
+
+        devuelve:
+            True si quedaron todos los pares completos, False si se canceló o alguno dio error
+            (el motivo queda en estado)
+        '''
+        claves = self._claves(paired_data)
+        listas = self.completas(paired_data, claves)
+        pendientes = {name: data for name, data in paired_data.items() if name not in listas}
+
+        self.manifiesto['estado'] = 'en_curso'
+        self.manifiesto['total'] = len(paired_data)
+        self._guardar_manifiesto()
+
+        cancelada = False
+        errores = 0
+        try:
+            for paso in core.iterar_analisis_general(pendientes, self.epsilon, self.cant_muestras, workers,
+                                                      con_perfil=con_perfil, cache=cache):
+                name = paso['instance_name']
+                if paso['error'] is not None:
+                    errores += 1
+                    self.manifiesto['instancias'][name] = {'estado': 'error', 'clave': claves[name], 'error': paso['error']}
+                else:
+                    # primero el resultado y después el manifiesto: lo marcado como completo siempre está en disco
+                    self.resultados.guardar(claves[name], paso['instance_df'], paso['instance_summary'])
+                    self.manifiesto['instancias'][name] = {
+                        'estado': 'completa', 'clave': claves[name], 'arcos': len(paso['instance_df']),
+                        'terminada': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    }
+                self._guardar_manifiesto()
+                if al_avanzar is not None:
+                    al_avanzar(paso)
+                if detener is not None and detener():
+                    cancelada = True
+                    break
+        except BaseException:  # Ctrl+C, Stop de Streamlit o error: queda registrada como cancelada
+            self.manifiesto['estado'] = 'cancelada'
+            self._guardar_manifiesto()
+            raise
+
+        self.manifiesto['estado'] = 'cancelada' if cancelada else 'con_errores' if errores else 'completa'
+        self._guardar_manifiesto()
+        return self.manifiesto['estado'] == 'completa'
+
+    def iterar_resultados(self, paired_data: Dict, claves: Dict[str, str] = None) -> Iterator[Tuple[str, pd.DataFrame, Dict]]:
+        '''
+        genera (instance_name, instance_df, instance_summary) de los pares completos, en el orden de
+        paired_data, leyéndolos de disco de a uno.
+        '''
+        claves = self._claves(paired_data) if claves is None else claves
+        for name in paired_data:
+            if name not in self.completas({name: paired_data[name]}, claves):
+                continue
+            guardado = self.resultados.obtener(claves[name])
+            if guardado is not None:
+                yield name, guardado[0], guardado[1]
+
+    def combinar(self, paired_data: Dict) -> Tuple[pd.DataFrame, Dict]:
+        '''global_df y global_metrics (como en correr_analisis_general) con los pares completos'''
+        return combinar_resultados(self.iterar_resultados(paired_data), list(paired_data))
+
+    def estado_incremental(self, paired_data: Dict) -> Dict:
+        '''
+        los pares completos en el formato del estado de actualizar_analisis_general ('resultados' por
+        nombre: (clave, instance_df, instance_summary)), para seguir de forma incremental sin la corrida.
+        '''
+        claves = self._claves(paired_data)
+        return {'resultados': {name: (claves[name], instance_df, instance_summary)
+                               for name, instance_df, instance_summary in self.iterar_resultados(paired_data, claves)}}
+
+
+def combinar_resultados(resultados: Iterable[Tuple[str, pd.DataFrame, Dict]], instance_names: List[str]) -> Tuple[pd.DataFrame, Dict]:
+    '''
+    arma global_df y global_metrics (como correr_analisis_general) a partir de resultados por instancia
+    ya calculados, (instance_name, instance_df, instance_summary).
+    '''
+    frames, summaries = [], []
+    for _, instance_df, instance_summary in resultados:
+        frames.append(instance_df)
+        summaries.append(instance_summary)
+    global_df = core._concatenar_arcos(frames, instance_names)
+    global_metrics = core._calcular_metricas_generales(global_df, summaries)
+    if global_metrics:
+        global_metrics['memory_report'] = core.reporte_memoria(global_df)
+    return global_df, global_metrics
+
+
+def correr_analisis_reanudable(paired_data: Dict, directorio: str, epsilon: float = 0.1, cant_muestras: int = 10,
+                               workers: int = 1, detener: Callable[[], bool] = None,
+                               al_avanzar: Callable[[Dict], None] = None) -> Optional[Tuple[pd.DataFrame, Dict]]:
+    '''
+    correr_analisis_general con checkpoints en directorio: si ya hay una corrida ahí, se reanuda.
+    devuelve (global_df, global_metrics), o None si se canceló con detener.
+    '''
+    corrida = CorridaAnalisis(directorio, epsilon, cant_muestras)
+    corrida.ejecutar(paired_data, workers, detener, al_avanzar)
+    if corrida.estado == 'cancelada':
+        return None
+    return corrida.combinar(paired_data)
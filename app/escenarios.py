@@ -0,0 +1,151 @@
+"""
+Escenarios Monte Carlo de velocidades.
+
+Se muestrean K perfiles de velocidad perturbados (a partir de cluster_speeds) con un modelo de ruido
+con semilla, y se re-simulan todas las rutas de la solución bajo los K escenarios en un único lote
+(rutas x escenarios carriles en avanzar_rutas). Se reporta la distribución de la duración de cada ruta
+y las violaciones de ventanas de tiempo.
+"""
+
+import argparse
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from simulacion import contexto_instancia, avanzar_rutas, EPS
+
+
+CUANTILES_DURACION = [0.05, 0.5, 0.95]
+MAX_CARRILES = 200_000  # rutas x escenarios por llamada a avanzar_rutas (acota la memoria)
+
+
+def muestrear_velocidades(cluster_speeds, K: int, sigma: float = 0.1, sigma_comun: float = 0.0,
+                          semilla=0) -> np.ndarray:
+    '''
+    K perfiles de velocidad perturbados, con ruido multiplicativo lognormal de media 1:
+        v_k[c, z] = v[c, z] * exp(e_comun[k, z] + e[k, c, z])
+    e_comun es un shock por escenario y zona, compartido por todos los clusters (congestión general),
+    e es un shock propio de cada cluster.
+
+    devuelve np.ndarray (K, C, Z)
+    '''
+    v = np.asarray(cluster_speeds, dtype=float)
+    C, Zn = v.shape
+    rng = np.random.default_rng(semilla)
+    comun = rng.normal(-sigma_comun ** 2 / 2, sigma_comun, size=(K, 1, Zn)) if sigma_comun > 0 else np.zeros((K, 1, Zn))
+    propio = rng.normal(-sigma ** 2 / 2, sigma, size=(K, C, Zn)) if sigma > 0 else np.zeros((K, C, Zn))
+    return v[None, :, :] * np.exp(comun + propio)
+
+
+def simular_escenarios(solution: dict, instance: dict, K: int = 1000, sigma: float = 0.1,
+                       sigma_comun: float = 0.0, semilla=0, ctx: dict = None) -> Dict:
+    '''
+    re-simula todas las rutas de la solución bajo K escenarios de velocidad.
+
+    devuelve un diccionario con:
+        - "duraciones": np.ndarray (R, K) duración de cada ruta en cada escenario
+        - "violaciones": np.ndarray[int] (R, K) cantidad de nodos a los que se llega después del cierre de su ventana
+        - "resumen": DataFrame por ruta con la duración de la solución y la distribución en los escenarios
+    '''
+    ctx = contexto_instancia(instance) if ctx is None else ctx
+    speeds = muestrear_velocidades(ctx["speeds"], K, sigma, sigma_comun, semilla)
+    routes = solution["routes"]
+    R = len(routes)
+
+    duraciones = np.empty((R, K))
+    violaciones = np.empty((R, K), dtype=np.int64)
+    por_lote = max(1, MAX_CARRILES // max(R, 1))
+    for k0 in range(0, K, por_lote):
+        k1 = min(K, k0 + por_lote)
+        n = k1 - k0
+        # carril r * n + k: ruta r en el escenario k0 + k
+        paths = [route["path"] for route in routes for _ in range(n)]
+        t0 = np.repeat([route["t0"] for route in routes], n)
+        sim = avanzar_rutas(ctx, paths, t0, speeds=np.tile(speeds[k0:k1], (R, 1, 1)))
+
+        M = sim["paths"]
+        cierre = np.where(M[:, 1:] >= 0, ctx["tw"][M[:, 1:], 1], np.inf)
+        duraciones[:, k0:k1] = (sim["fin"] - t0).reshape(R, n)
+        violaciones[:, k0:k1] = (sim["arrival"] > cierre + EPS).sum(axis=1).reshape(R, n)
+
+    q = np.quantile(duraciones, CUANTILES_DURACION, axis=1) if K else np.full((len(CUANTILES_DURACION), R), np.nan)
+    resumen = pd.DataFrame({
+        'route_idx': np.arange(R),
+        'duration': [route["duration"] for route in routes],
+        'mean_duration': duraciones.mean(axis=1),
+        'std_duration': duraciones.std(axis=1),
+        **{f'p{int(c * 100)}_duration': q[i] for i, c in enumerate(CUANTILES_DURACION)},
+        'violation_prob': (violaciones > 0).mean(axis=1),
+        'mean_violations': violaciones.mean(axis=1),
+    })
+    return {"duraciones": duraciones, "violaciones": violaciones, "resumen": resumen}
+
+
+def _semilla_instancia(semilla: int, instance_name: str) -> list:
+    '''semilla propia de cada instancia: no depende del orden ni de qué proceso la corre'''
+    return [semilla, zlib.crc32(instance_name.encode('utf-8'))]
+
+
+def _escenarios_par(instance_name: str, data: Dict, K: int, sigma: float, sigma_comun: float,
+                    semilla: int) -> pd.DataFrame:
+    res = simular_escenarios(data['solution'], data['instance'], K, sigma, sigma_comun,
+                             _semilla_instancia(semilla, instance_name))
+    resumen = res["resumen"]
+    resumen.insert(0, 'instance_name', instance_name)
+    return resumen
+
+
+def correr_escenarios_general(paired_data: Dict, K: int = 1000, sigma: float = 0.1, sigma_comun: float = 0.0,
+                              semilla: int = 0, workers: int = 1) -> pd.DataFrame:
+    '''
+    corre simular_escenarios sobre todas las instancias (en paralelo si workers > 1).
+    devuelve el resumen por ruta de todas las instancias, en el orden de paired_data.
+    '''
+    resultados = {}
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = {
+                executor.submit(_escenarios_par, nombre, data, K, sigma, sigma_comun, semilla): nombre
+                for nombre, data in paired_data.items()
+            }
+            for futuro in as_completed(futuros):
+                nombre = futuros[futuro]
+                try:
+                    resultados[nombre] = futuro.result()
+                except Exception as e:
+                    print(f"Error procesando {nombre}: {str(e)}")
+    else:
+        for nombre, data in paired_data.items():
+            try:
+                resultados[nombre] = _escenarios_par(nombre, data, K, sigma, sigma_comun, semilla)
+            except Exception as e:
+                print(f"Error procesando {nombre}: {str(e)}")
+
+    frames = [resultados[nombre] for nombre in paired_data if nombre in resultados]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    from tdvrp_analyzer import cargar_pares
+
+    parser = argparse.ArgumentParser(description="Escenarios Monte Carlo de velocidades sobre todas las instancias.")
+    parser.add_argument("instancias", help="directorio o .zip con las instancias")
+    parser.add_argument("soluciones", help="archivo solutions.json")
+    parser.add_argument("-K", type=int, default=1000, help="escenarios por instancia")
+    parser.add_argument("--sigma", type=float, default=0.1, help="desvío del ruido lognormal por cluster y zona")
+    parser.add_argument("--sigma-comun", type=float, default=0.0, help="desvío del shock común por zona")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="procesos en paralelo")
+    parser.add_argument("--salida", default="escenarios.csv", help="CSV con el resumen por ruta")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    paired_data = cargar_pares(args.instancias, args.soluciones)
+    resumen = correr_escenarios_general(paired_data, args.K, args.sigma, args.sigma_comun, args.semilla, args.workers)
+    resumen.to_csv(args.salida, index=False)
+    print(f"{len(paired_data)} instancias, {len(resumen)} rutas x {args.K} escenarios "
+          f"en {time.perf_counter() - inicio:.1f}s -> {args.salida}")
@@ -0,0 +1,240 @@
+"""
+Evaluación incremental de rutas editadas (insertar, eliminar o mover clientes).
+
+Para cada ruta se cachean, por posición, la llegada, el inicio de servicio, la salida, la carga acumulada
+y las violaciones de ventana acumuladas. Al evaluar una edición solo se re-simula desde la primera
+posición que cambió, y se corta apenas el inicio de servicio vuelve a coincidir con el cacheado en el
+tramo final común (la espera en una ventana de tiempo absorbió el cambio): a partir de ahí la ruta
+es idéntica a la cacheada.
+"""
+
+from typing import Dict, List
+
+from build_pwl_arc import Z, P, fwd
+from simulacion import EPS
+
+
+class EvaluadorIncremental:
+    '''
+    evaluador de ediciones sobre las rutas de una solución.
+
+    uso:
+        ev = EvaluadorIncremental(solution, instance)
+        ev.evaluar_insercion(idx_ruta=2, cliente=17, posicion=3)   # no modifica nada
+        ev.aplicar(2, nuevo_path)                                   # confirma la edición y actualiza la caché
+    '''
+
+    def __init__(self, solution: dict, instance: dict):
+        I = instance
+        n = len(I["distances"])
+        T = I["horizon"][1]
+        self.D = I["distances"]
+        self.clusters = I["clusters"]
+        self.speeds = I["cluster_speeds"]
+        self.Zs = Z(I)
+        self.per = P(I)
+        tw = I.get("time_windows", [[0, T]] * n)
+        self.a = [w[0] for w in tw]
+        self.b = [w[1] for w in tw]
+        self.s = I.get("service_times", [0] * n)
+        self.q = I.get("demands", [0] * n)
+        self.Q = I.get("capacity", 1)
+
+        self.rutas: List[Dict] = [self._cachear(list(r["path"]), r["t0"]) for r in solution["routes"]]
+
+    # ------------------------------------------------------------------ simulación
+    def _tiempo_viaje(self, i: int, j: int, t: float) -> float:
+        return fwd(self.D[i][j], t, self.speeds[self.clusters[i][j]], self.Zs, self.per)
+
+    def _cachear(self, path: list, t0: float) -> Dict:
+        '''simula la ruta completa y guarda los valores por posición'''
+        cache = {"path": path, "t0": t0, "llegada": [], "inicio": [], "salida": [], "carga": [], "viol": []}
+        llegada, carga, viol = t0, 0, 0
+        for p, nodo in enumerate(path):
+            if p > 0:
+                llegada = cache["salida"][-1] + self._tiempo_viaje(path[p - 1], nodo, cache["salida"][-1])
+            inicio = max(llegada, self.a[nodo])
+            carga += self.q[nodo]
+            viol += llegada > self.b[nodo] + EPS
+            cache["llegada"].append(llegada)
+            cache["inicio"].append(inicio)
+            cache["salida"].append(inicio + self.s[nodo])
+            cache["carga"].append(carga)
+            cache["viol"].append(viol)
+        return cache
+
+    def _resimular(self, idx_ruta: int, path: list, t0: float = None) -> Dict:
+        '''
+        re-simula solo lo necesario de la ruta idx_ruta si pasara a ser path (y a salir en t0).
+        devuelve el resultado junto con los tramos nuevos necesarios para actualizar la caché.
+        '''
+        old = self.rutas[idx_ruta]
+        old_path = old["path"]
+        t0 = old["t0"] if t0 is None else t0
+
+        # primera posición que cambia (k) y largo del tramo final común (m)
+        k = 0
+        if t0 == old["t0"]:
+            limite = min(len(path), len(old_path))
+            while k < limite and path[k] == old_path[k]:
+                k += 1
+        m = 0
+        while m < min(len(path), len(old_path)) - k and path[-1 - m] == old_path[-1 - m]:
+            m += 1
+        desplazamiento = len(old_path) - len(path)
+
+        if k == len(path) == len(old_path):
+            return {"resultado": self._resultado(old, 0), "k": k, "corte": None, "nuevos": None}
+
+        nuevos = {"llegada": [], "inicio": [], "salida": [], "viol": []}
+        viol = old["viol"][k - 1] if k > 0 else 0
+        corte = None
+        for p in range(k, len(path)):
+            nodo = path[p]
+            if p == 0:
+                llegada = t0
+            else:
+                salida_ant = nuevos["salida"][-1] if nuevos["salida"] else old["salida"][p - 1]
+                llegada = salida_ant + self._tiempo_viaje(path[p - 1], nodo, salida_ant)
+            inicio = max(llegada, self.a[nodo])
+            viol += llegada > self.b[nodo] + EPS
+            nuevos["llegada"].append(llegada)
+            nuevos["inicio"].append(inicio)
+            nuevos["salida"].append(inicio + self.s[nodo])
+            nuevos["viol"].append(viol)
+
+            # en el tramo común, si el inicio de servicio coincide, el resto de la ruta es el cacheado
+            p_old = p + desplazamiento
+            if p >= len(path) - m and abs(inicio - old["inicio"][p_old]) < EPS:
+                corte = p
+                break
+
+        # carga total: prefijo cacheado + nodos nuevos + tramo común cacheado
+        fin_nuevos = len(path) - m
+        carga = (old["carga"][k - 1] if k > 0 else 0) + sum(self.q[v] for v in path[k:fin_nuevos])
+        if m:
+            carga += old["carga"][-1] - (old["carga"][len(old_path) - m - 1] if len(old_path) > m else 0)
+
+        if corte is None:
+            fin = nuevos["llegada"][-1] if nuevos["llegada"] else (old["llegada"][k - 1] if k else t0)
+            violaciones = viol
+        else:
+            p_old = corte + desplazamiento
+            fin = old["llegada"][-1]
+            violaciones = viol + old["viol"][-1] - old["viol"][p_old]
+
+        resultado = {
+            "duration": fin - t0,
+            "fin": fin,
+            "carga": carga,
+            "violaciones": violaciones,
+            "factible": violaciones == 0 and carga <= self.Q + EPS and len(path) == len(set(path)),
+            "posiciones_simuladas": len(nuevos["llegada"]),
+        }
+        return {"resultado": resultado, "k": k, "corte": corte, "nuevos": nuevos, "t0": t0}
+
+    def _resultado(self, cache: Dict, posiciones: int) -> Dict:
+        path = cache["path"]
+        fin = cache["llegada"][-1] if path else cache["t0"]
+        violaciones = cache["viol"][-1] if path else 0
+        carga = cache["carga"][-1] if path else 0
+        return {
+            "duration": fin - cache["t0"],
+            "fin": fin,
+            "carga": carga,
+            "violaciones": violaciones,
+            "factible": violaciones == 0 and carga <= self.Q + EPS and len(path) == len(set(path)),
+            "posiciones_simuladas": posiciones,
+        }
+
+    # ------------------------------------------------------------------ API
+    def evaluar(self, idx_ruta: int, path: list, t0: float = None) -> Dict:
+        '''
+        evalúa la ruta idx_ruta reemplazada por path (sin modificar la caché).
+
+        devuelve un diccionario con:
+            duration, fin, carga, violaciones (ventanas de tiempo incumplidas), factible
+            y posiciones_simuladas (cuántas posiciones hubo que re-simular)
+        '''
+        return self._resimular(idx_ruta, list(path), t0)["resultado"]
+
+    def evaluar_insercion(self, idx_ruta: int, cliente: int, posicion: int) -> Dict:
+        '''evalúa insertar cliente en la posición dada (entre los depósitos) de la ruta idx_ruta'''
+        path = self.rutas[idx_ruta]["path"]
+        return self.evaluar(idx_ruta, path[:posicion] + [cliente] + path[posicion:])
+
+    def evaluar_eliminacion(self, idx_ruta: int, posicion: int) -> Dict:
+        '''evalúa quitar el nodo en la posición dada de la ruta idx_ruta'''
+        path = self.rutas[idx_ruta]["path"]
+        return self.evaluar(idx_ruta, path[:posicion] + path[posicion + 1:])
+
+    def evaluar_movimiento(self, ruta_origen: int, pos_origen: int, ruta_destino: int, pos_destino: int) -> Dict:
+        '''
+        evalúa mover el cliente en (ruta_origen, pos_origen) a la posición pos_destino de ruta_destino
+        (pos_destino se interpreta sobre la ruta destino ya sin el cliente si es la misma ruta).
+
+        devuelve {"delta_duration", "factible", "rutas": {idx: resultado}}
+        '''
+        origen = self.rutas[ruta_origen]["path"]
+        cliente = origen[pos_origen]
+        sin_cliente = origen[:pos_origen] + origen[pos_origen + 1:]
+        if ruta_origen == ruta_destino:
+            nuevo = sin_cliente[:pos_destino] + [cliente] + sin_cliente[pos_destino:]
+            rutas = {ruta_origen: self.evaluar(ruta_origen, nuevo)}
+        else:
+            destino = self.rutas[ruta_destino]["path"]
+            rutas = {
+                ruta_origen: self.evaluar(ruta_origen, sin_cliente),
+                ruta_destino: self.evaluar(ruta_destino, destino[:pos_destino] + [cliente] + destino[pos_destino:]),
+            }
+        delta = sum(r["duration"] - self.duracion(idx) for idx, r in rutas.items())
+        return {"delta_duration": delta, "factible": all(r["factible"] for r in rutas.values()), "rutas": rutas}
+
+    def mejores_inserciones(self, cliente: int, solo_factibles: bool = True) -> List[Dict]:
+        '''
+        evalúa insertar cliente en todas las posiciones de todas las rutas (sin tocar los depósitos)
+        y devuelve los candidatos ordenados por aumento de duración.
+        '''
+        candidatos = []
+        for idx_ruta, cache in enumerate(self.rutas):
+            for pos in range(1, len(cache["path"])):
+                r = self.evaluar_insercion(idx_ruta, cliente, pos)
+                if r["factible"] or not solo_factibles:
+                    candidatos.append({"route": idx_ruta, "position": pos,
+                                       "delta_duration": r["duration"] - self.duracion(idx_ruta), **r})
+        return sorted(candidatos, key=lambda c: c["delta_duration"])
+
+    def duracion(self, idx_ruta: int) -> float:
+        '''duración cacheada de la ruta idx_ruta'''
+        return self._resultado(self.rutas[idx_ruta], 0)["duration"]
+
+    def aplicar(self, idx_ruta: int, path: list, t0: float = None) -> Dict:
+        '''
+        confirma la edición: la ruta idx_ruta pasa a ser path y la caché se actualiza reutilizando
+        el prefijo y el tramo final que no cambiaron.
+        '''
+        path = list(path)
+        res = self._resimular(idx_ruta, path, t0)
+        if res["nuevos"] is None:
+            return res["resultado"]
+
+        old = self.rutas[idx_ruta]
+        k, corte, nuevos = res["k"], res["corte"], res["nuevos"]
+        cache = {"path": path, "t0": res["t0"]}
+        for campo in ("llegada", "inicio", "salida"):
+            cache[campo] = old[campo][:k] + nuevos[campo]
+        cache["viol"] = old["viol"][:k] + nuevos["viol"]
+        if corte is not None:
+            p_old = corte + len(old["path"]) - len(path)
+            for campo in ("llegada", "inicio", "salida"):
+                cache[campo] += old[campo][p_old + 1:]
+            delta_viol = nuevos["viol"][-1] - old["viol"][p_old]
+            cache["viol"] += [v + delta_viol for v in old["viol"][p_old + 1:]]
+
+        carga, cache["carga"] = 0, []
+        for nodo in path:
+            carga += self.q[nodo]
+            cache["carga"].append(carga)
+
+        self.rutas[idx_ruta] = cache
+        return res["resultado"]
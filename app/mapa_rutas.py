@@ -0,0 +1,144 @@
+"""
+Mapa de las rutas de una solución, coloreadas por decil.
+
+La geometría se arma con arrays a partir de las coordenadas de los nodos (coordenadas_nodos), una sola
+vez por instancia; las rutas se dibujan como a lo sumo una polilínea por (decil, grosor), no una por
+arco. Cuando una solución tiene demasiados arcos, se agregan los que unen los mismos nodos y, si no
+alcanza, se simplifican llevando los extremos a una grilla.
+
+En la app, el mapa base (nodos y depósito) se cachea y los arcos se pasan como capa aparte
+(feature_group_to_add de st_folium), así filtrar deciles no regenera el documento de Folium.
+Solo la parte de dibujo necesita folium, que se importa al usarla.
+"""
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+MAX_SEGMENTOS = 2000
+# verde (decil 0, cerca del mínimo) a rojo (decil 9)
+COLORES_DECILES = ['#1a9850', '#66bd63', '#a6d96a', '#d9ef8b', '#ffffbf',
+                   '#fee08b', '#fdae61', '#f46d43', '#d73027', '#a50026']
+GROSOR_MAXIMO = 6
+
+
+def _agrupar(x0, y0, x1, y1, decil, arcos, claves) -> pd.DataFrame:
+    '''suma arcos por clave (filas de claves iguales) y se queda con la primera geometría de cada grupo'''
+    _, primero, grupo = np.unique(claves, axis=0, return_index=True, return_inverse=True)
+    return pd.DataFrame({
+        'x0': x0[primero], 'y0': y0[primero], 'x1': x1[primero], 'y1': y1[primero],
+        'decil': decil[primero],
+        'arcos': np.bincount(grupo.ravel(), weights=arcos).astype(np.int64),
+    })
+
+
+def segmentos_arcos(analysis_df: pd.DataFrame, xy: np.ndarray, columna_decil: str = 'decile_rank',
+                    max_segmentos: int = MAX_SEGMENTOS) -> pd.DataFrame:
+    '''
+    segmentos a dibujar para los arcos de la solución.
+
+    recibe:
+        analysis_df: salida de correr_analisis_instancia
+        xy: coordenadas de los nodos (coordenadas_nodos)
+        columna_decil: decile_rank (tiempo) o decile_rank_distance
+        max_segmentos: por encima de esta cantidad se agregan / simplifican los arcos
+
+    devuelve:
+        DataFrame con x0, y0, x1, y1, decil y arcos (cuántos arcos representa cada segmento)
+    '''
+    desde = analysis_df['node_from'].to_numpy(np.int64)
+    hasta = analysis_df['node_to'].to_numpy(np.int64)
+    decil = analysis_df[columna_decil].to_numpy(np.int64)
+    x0, y0 = xy[desde, 0], xy[desde, 1]
+    x1, y1 = xy[hasta, 0], xy[hasta, 1]
+    arcos = np.ones(len(desde))
+    if len(desde) <= max_segmentos:
+        return pd.DataFrame({'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1, 'decil': decil, 'arcos': arcos.astype(np.int64)})
+
+    # 1) un segmento por par de nodos (sin importar el sentido) y decil
+    segmentos = _agrupar(x0, y0, x1, y1, decil, arcos,
+                         np.column_stack([np.minimum(desde, hasta), np.maximum(desde, hasta), decil]))
+
+    # 2) si no alcanza, extremos a una grilla cada vez más gruesa (se descartan los segmentos dentro de una celda)
+    minimo = xy.min(axis=0)
+    extension = np.maximum(xy.max(axis=0) - minimo, 1e-9)
+    celdas = 256
+    while len(segmentos) > max_segmentos and celdas >= 2:
+        lado = extension / celdas
+        s = segmentos
+        c0 = np.floor((s[['x0', 'y0']].to_numpy() - minimo) / lado).clip(0, celdas - 1)
+        c1 = np.floor((s[['x1', 'y1']].to_numpy() - minimo) / lado).clip(0, celdas - 1)
+        distintas = (c0 != c1).any(axis=1)
+        c0, c1, s = c0[distintas], c1[distintas], s[distintas]
+        centro0 = minimo + (c0 + 0.5) * lado
+        centro1 = minimo + (c1 + 0.5) * lado
+        # misma celda de origen y destino, sin importar el sentido
+        id0 = c0[:, 0] * celdas + c0[:, 1]
+        id1 = c1[:, 0] * celdas + c1[:, 1]
+        segmentos = _agrupar(centro0[:, 0], centro0[:, 1], centro1[:, 0], centro1[:, 1],
+                             s['decil'].to_numpy(), s['arcos'].to_numpy(),
+                             np.column_stack([np.minimum(id0, id1), np.maximum(id0, id1), s['decil'].to_numpy()]))
+        celdas //= 2
+    return segmentos
+
+
+def _ubicaciones(x, y) -> np.ndarray:
+    # CRS simple de Leaflet: [lat, lon] = [y, x]
+    return np.column_stack([y, x])
+
+
+def mapa_base(xy: np.ndarray, deposito: int = 0):
+    '''folium.Map con los nodos de la instancia (plano, sin teselas) y el depósito marcado'''
+    import folium
+
+    mapa = folium.Map(crs='Simple', tiles=None, control_scale=False, zoom_start=1)
+    nodos = {
+        'type': 'FeatureCollection',
+        'features': [{'type': 'Feature', 'properties': {'nodo': int(i)},
+                      'geometry': {'type': 'Point', 'coordinates': [float(x), float(y)]}}
+                     for i, (x, y) in enumerate(xy) if i != deposito],
+    }
+    folium.GeoJson(
+        nodos,
+        name='Nodos',
+        marker=folium.CircleMarker(radius=3, color='#555555', fill=True, fill_opacity=0.8, weight=1),
+        tooltip=folium.GeoJsonTooltip(fields=['nodo'], aliases=['Nodo']),
+    ).add_to(mapa)
+    folium.Marker(
+        _ubicaciones(xy[deposito:deposito + 1, 0], xy[deposito:deposito + 1, 1])[0].tolist(),
+        tooltip=f"Depósito ({deposito})",
+        icon=folium.Icon(color='black', icon='home'),
+    ).add_to(mapa)
+    mapa.fit_bounds([[float(xy[:, 1].min()), float(xy[:, 0].min())], [float(xy[:, 1].max()), float(xy[:, 0].max())]])
+    return mapa
+
+
+def capa_arcos(segmentos: pd.DataFrame, deciles: Iterable[int] = range(10)):
+    '''
+    folium.FeatureGroup con los segmentos de los deciles pedidos: una polilínea múltiple por
+    (decil, grosor), con el grosor según cuántos arcos agrupa el segmento.
+    '''
+    import folium
+
+    capa = folium.FeatureGroup(name='Arcos')
+    visibles = segmentos[segmentos['decil'].isin(list(deciles))]
+    if visibles.empty:
+        return capa
+    grosor = np.minimum(2 + np.floor(np.log2(visibles['arcos'].to_numpy())), GROSOR_MAXIMO).astype(int)
+    origen = _ubicaciones(visibles['x0'].to_numpy(), visibles['y0'].to_numpy())
+    destino = _ubicaciones(visibles['x1'].to_numpy(), visibles['y1'].to_numpy())
+    lineas = np.stack([origen, destino], axis=1)
+    deciles_visibles = visibles['decil'].to_numpy()
+    for decil in np.unique(deciles_visibles):
+        for g in np.unique(grosor[deciles_visibles == decil]):
+            seleccion = (deciles_visibles == decil) & (grosor == g)
+            folium.PolyLine(
+                lineas[seleccion].tolist(),
+                color=COLORES_DECILES[int(decil)],
+                weight=int(g),
+                opacity=0.85,
+                tooltip=f"Decil {int(decil)}",
+            ).add_to(capa)
+    return capa
@@ -2,7 +2,9 @@ import json, math, argparse, csv
 from build_pwl_arc import *
 from simulacion import *
 from typing import List, Tuple
+import numpy as np
 import pandas as pd
+import perfilado
 
 def clusters_arcos_ruta(instance_data: dict, intervalos_ruta: list[Tuple], arcos_utilizados) -> dict[tuple, list[tuple]]: 
     '''
@@ -20,12 +22,14 @@ def clusters_arcos_ruta(instance_data: dict, intervalos_ruta: list[Tuple], arcos
     ST = I["service_times"]
     clientes = len(TW) - 2 # saco los depositos (0 y n-1)
     clusters_de_arcos = {} # key, value = (intervalo de tiempo, lista de arcos que se podrían haber usado partiendo de ese intervalo de tiempo)
+    llamadas_pwl = 0 # para perfilado.py: se cuentan por nodo i, no dentro del bucle de j
     
     for inter in range(len(intervalos_ruta)):
         intervalo = intervalos_ruta[inter]
         clusters_de_arcos[intervalo] = []
         for i in range(len(TW)):
             if TW[i][0] <= intervalo[0] and TW[i][1] > intervalo[0]: # veo que la ventana de tiempo del cliente i este dentro del intervalo que queremos analizar
+                llamadas_pwl += len(TW)
                 for j in range(len(TW)):
                     # [r_k + s_k + pwl_f] < tw[j][1] ---> limite de factibilidad por ventana de tiempo
                     t_cur = TW[i][0] + ST[i]
@@ -33,6 +37,7 @@ def clusters_arcos_ruta(instance_data: dict, intervalos_ruta: list[Tuple], arcos
                         if TW[j][0] <= intervalo[0] and TW[j][1] > intervalo[0]: # hago lo mismo con j
                             if i != j: # chequeas que sea un arco optimo
                                 clusters_de_arcos[intervalo].append((i, j)) # se podría usar este arco ij =>lo guardo como una tupla
+    perfilado.contar('pwl_f', llamadas_pwl)
     return clusters_de_arcos
 
 
@@ -98,6 +103,8 @@ def duracion_arcos(clusters_arcos: dict[tuple, list[tuple]], intervalos_ruta: li
         
         int_idx += 1
 
+    if perfilado.perfil_actual() is not None:
+        perfilado.contar('pwl_f', cant_muestras * sum(len(arcos) for arcos in clusters_arcos.values()))
     return res_dict
 
 
@@ -201,3 +208,188 @@ def metrica_distancia(arcos_factibles: dict, distancias, path):
             rels.append(rel)
     return res, res_str, rels
 
+
+
+
+######################################################################
+# Kernel fusionado: métricas de tiempo y distancia de una ruta sobre arrays planos
+######################################################################
+
+CUANTILES_DECILES = np.arange(10, 101, 10, dtype=float)
+
+# etiquetas posibles de metricas_ruta (categorías de las columnas de etiquetas en el análisis)
+ETIQUETAS_PROXIMIDAD = ["mas cerca del min", "mas cerca del max", "todas las duraciones son iguales o nulas"]
+ETIQUETAS_LONGITUD = ["arco corto", "arco largo", "todas las distancias son iguales o nulas"]
+
+
+def arrays_arcos_factibles(arcos_factibles: dict, duraciones: dict, distancias) -> dict:
+    '''
+    aplana los arcos factibles de una ruta en arrays contiguos, un segmento por intervalo.
+
+    recibe:
+        arcos_factibles: dict intervalo -> lista de arcos (salida de clusters_arcos_ruta)
+        duraciones: dict intervalo -> lista de {"arc", "durations"} (salida de duracion_arcos)
+        distancias: matriz de distancias de la instancia
+
+    devuelve un diccionario con:
+        - "i", "j": np.ndarray[int32] con los extremos de cada arco factible
+        - "offsets": np.ndarray[int64] de largo n_intervalos + 1; el segmento k es offsets[k]:offsets[k+1]
+        - "stats": np.ndarray[float64] (n_arcos, 5) con start, mean, minimo, maximo, end
+        - "dist": np.ndarray[float64] con la distancia de cada arco factible
+    '''
+    claves = ("start", "mean", "minimo", "maximo", "end")
+    largos = [len(arcos) for arcos in arcos_factibles.values()]
+    offsets = np.zeros(len(largos) + 1, dtype=np.int64)
+    np.cumsum(largos, out=offsets[1:])
+
+    n = int(offsets[-1])
+    ij = np.array([arco for arcos in arcos_factibles.values() for arco in arcos], dtype=np.int32).reshape(n, 2)
+    stats = np.zeros((n, len(claves)), dtype=float)
+    pos = 0
+    for intervalo in arcos_factibles:
+        for entry in duraciones.get(intervalo, []):
+            durs = entry.get("durations", {})
+            stats[pos] = [durs.get(c, 0.0) for c in claves]
+            pos += 1
+
+    D = np.asarray(distancias, dtype=float)
+    return {
+        "i": ij[:, 0],
+        "j": ij[:, 1],
+        "offsets": offsets,
+        "stats": stats,
+        "dist": D[ij[:, 0], ij[:, 1]] if n else np.zeros(0),
+    }
+
+
+def _reducir_segmentos(ufunc, valores: np.ndarray, offsets: np.ndarray, identidad: float) -> np.ndarray:
+    '''
+    aplica ufunc.reduceat por segmento; los segmentos vacíos quedan con la identidad.
+    '''
+    res = np.full(len(offsets) - 1, identidad, dtype=float)
+    no_vacios = offsets[:-1] < offsets[1:]
+    if valores.size and no_vacios.any():
+        res[no_vacios] = ufunc.reduceat(valores, offsets[:-1][no_vacios])
+    return res
+
+
+def _deciles_segmentos(valores: np.ndarray, offsets: np.ndarray, validos: np.ndarray,
+                       objetivo: np.ndarray) -> np.ndarray:
+    '''
+    decil (0-9) de objetivo[k] dentro de los valores válidos del segmento k,
+    con la misma interpolación lineal que np.percentile. Segmento sin valores -> 5.
+    '''
+    n_seg = len(offsets) - 1
+    seg = np.repeat(np.arange(n_seg), np.diff(offsets))[validos]
+    v = valores[validos]
+    orden = np.lexsort((v, seg))
+    v, seg = v[orden], seg[orden]
+
+    cuenta = np.bincount(seg, minlength=n_seg)
+    inicio = np.concatenate(([0], np.cumsum(cuenta)[:-1]))
+    deciles = np.full(n_seg, 5, dtype=np.int8)
+    hay = cuenta > 0
+    if not hay.any():
+        return deciles
+
+    # percentiles 10, 20, ..., 100 de cada segmento (índice virtual (n-1)*q)
+    pos = (cuenta[hay, None] - 1) * (CUANTILES_DECILES[None, :] / 100)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, cuenta[hay, None] - 1)
+    t = pos - lo
+    a = v[inicio[hay, None] + lo]
+    b = v[inicio[hay, None] + hi]
+    dif = b - a
+    percentiles = np.where(t >= 0.5, b - dif * (1 - t), a + dif * t)
+
+    # primer decil d con objetivo <= percentil[d]; si no hay ninguno, 9
+    deciles[hay] = np.minimum((percentiles < objetivo[hay, None]).sum(axis=1), 9)
+    return deciles
+
+
+def metricas_ruta(arrays: dict, dur_usadas, dist_usadas) -> dict:
+    '''
+    kernel fusionado de métricas de una ruta: reemplaza a metricas + metrica_distancia + el decil por intervalo
+    con reducciones por segmento sobre los arrays de arcos factibles (ver arrays_arcos_factibles).
+
+    recibe:
+        arrays: salida de arrays_arcos_factibles
+        dur_usadas: duración del arco usado en cada intervalo
+        dist_usadas: distancia del arco usado en cada intervalo
+
+    devuelve un diccionario de np.ndarray, uno por intervalo:
+        - "min_dur", "max_dur": extremos de las duraciones medias (> 0) factibles; si no hay, la duración usada
+        - "min_dist", "max_dist": extremos de las distancias (> 0) factibles; si no hay, la distancia usada
+        - "ratio_min", "ratio_max", "ratio_min_dist", "ratio_max_dist": ratios usado / extremo (NaN si el extremo es 0)
+        - "rel", "rel_dist": posición relativa (0-1) entre min y max (NaN si min == max)
+        - "proximidad", "longitud": etiquetas "mas cerca del min"/"mas cerca del max" y "arco corto"/"arco largo"
+        - "decil", "decil_dist": decil del arco usado dentro de la distribución factible
+        - "num_arcos": cantidad de arcos factibles
+    '''
+    offsets = arrays["offsets"]
+    stats = arrays["stats"]
+    dist = arrays["dist"]
+    dur_usadas = np.asarray(dur_usadas, dtype=float)
+    dist_usadas = np.asarray(dist_usadas, dtype=float)
+    num_arcos = np.diff(offsets)
+
+    # --- tiempo: extremos sobre las 5 estadísticas (> 0) para la posición relativa
+    validos5 = stats > 0
+    min5 = _reducir_segmentos(np.minimum, np.where(validos5, stats, np.inf).min(axis=1), offsets, np.inf)
+    max5 = _reducir_segmentos(np.maximum, np.where(validos5, stats, -np.inf).max(axis=1), offsets, -np.inf)
+    min5[np.isinf(min5)] = 0.0
+    max5[np.isinf(max5)] = 0.0
+
+    # --- tiempo: extremos sobre las duraciones medias (> 0) para ratios y deciles
+    medias = stats[:, 1]
+    validos_media = medias > 0
+    min_dur = _reducir_segmentos(np.minimum, np.where(validos_media, medias, np.inf), offsets, np.inf)
+    max_dur = _reducir_segmentos(np.maximum, np.where(validos_media, medias, -np.inf), offsets, -np.inf)
+    sin_dur = np.isinf(min_dur)
+    min_dur[sin_dur] = dur_usadas[sin_dur]
+    max_dur[sin_dur] = dur_usadas[sin_dur]
+
+    # --- distancia: extremos sobre distancias (> 0)
+    validos_dist = dist > 0
+    min_dist = _reducir_segmentos(np.minimum, np.where(validos_dist, dist, np.inf), offsets, np.inf)
+    max_dist = _reducir_segmentos(np.maximum, np.where(validos_dist, dist, -np.inf), offsets, -np.inf)
+    sin_dist = np.isinf(min_dist)
+    min_dist[sin_dist] = dist_usadas[sin_dist]
+    max_dist[sin_dist] = dist_usadas[sin_dist]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio_min = np.where(min_dur > 0, dur_usadas / min_dur, np.nan)
+        ratio_max = np.where(max_dur > 0, dur_usadas / max_dur, np.nan)
+        ratio_min_dist = np.where(min_dist > 0, dist_usadas / min_dist, np.nan)
+        ratio_max_dist = np.where(max_dist > 0, dist_usadas / max_dist, np.nan)
+        rel = np.where(max5 != min5, np.clip((dur_usadas - min5) / (max5 - min5), 0, 1), np.nan)
+        rel_dist = np.where(max_dist != min_dist,
+                            np.clip((dist_usadas - min_dist) / (max_dist - min_dist), 0, 1), np.nan)
+
+    proximidad = np.where(np.isnan(rel), ETIQUETAS_PROXIMIDAD[2],
+                          np.where(rel < 0.5, ETIQUETAS_PROXIMIDAD[0], ETIQUETAS_PROXIMIDAD[1]))
+    longitud = np.where(np.isnan(rel_dist), ETIQUETAS_LONGITUD[2],
+                        np.where(rel_dist < 0.5, ETIQUETAS_LONGITUD[0], ETIQUETAS_LONGITUD[1]))
+
+    # deciles: la distribución de distancias sin valores válidos cae en la distancia usada (si es > 0)
+    decil = _deciles_segmentos(medias, offsets, validos_media, dur_usadas)
+    decil_dist = _deciles_segmentos(dist, offsets, validos_dist, dist_usadas)
+    decil_dist[sin_dist & (dist_usadas > 0)] = 0
+
+    return {
+        "min_dur": min_dur,
+        "max_dur": max_dur,
+        "min_dist": min_dist,
+        "max_dist": max_dist,
+        "ratio_min": ratio_min,
+        "ratio_max": ratio_max,
+        "ratio_min_dist": ratio_min_dist,
+        "ratio_max_dist": ratio_max_dist,
+        "rel": rel,
+        "rel_dist": rel_dist,
+        "proximidad": proximidad,
+        "longitud": longitud,
+        "decil": decil,
+        "decil_dist": decil_dist,
+        "num_arcos": num_arcos,
+    }
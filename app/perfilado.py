@@ -0,0 +1,159 @@
+"""
+Instrumentación opcional del análisis: tiempo por etapa, contadores y arcos factibles por intervalo.
+
+Se pide por llamada con con_perfil=True (correr_analisis_instancia, correr_analisis_general y las
+variantes incremental y generadora); con_perfil=None usa el valor por defecto del proceso, la variable de
+entorno TDVRP_PERFIL=1 (o activar_perfilado()), pensada para los CLI. Con el perfilado activo, cada
+instancia analizada lleva su perfil: en instance_summary['perfil'] (análisis global, resumido en
+global_metrics['rendimiento']) o en analysis_df.attrs['perfil'] (correr_analisis_instancia).
+
+Etapas: simulacion, clusters, duraciones, metricas, tabla y resumen (segundos de reloj).
+Contadores:
+    pwl_f          llamadas a pwl_f (cada una es una llamada a fwd)
+    fwd_vec        elementos evaluados por fwd_vec (simulación por lotes)
+    cache_aciertos / cache_fallos   consultas a la caché de resultados (cache_resultados.py)
+
+Desactivado, cada punto de medición es una consulta a una variable del hilo: etapa() devuelve un
+contexto nulo compartido y contar() no hace nada, y los contadores se suman en bloque (una vez por
+llamada a clusters_arcos_ruta / duracion_arcos / paso de simulación), nunca dentro de los bucles internos.
+"""
+
+import contextlib
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+ETAPAS = ['simulacion', 'clusters', 'duraciones', 'metricas', 'tabla', 'resumen']
+CONTADORES = ['pwl_f', 'fwd_vec', 'cache_aciertos', 'cache_fallos']
+
+_local = threading.local()
+_NULO = contextlib.nullcontext()
+
+
+class Perfil:
+    '''tiempos y contadores de un análisis (normalmente, de una instancia)'''
+
+    def __init__(self):
+        self.etapas: Dict[str, float] = defaultdict(float)
+        self.contadores: Dict[str, int] = defaultdict(int)
+        self.arcos_factibles: List[int] = []  # cantidad por intervalo, en el orden de las rutas
+        self._inicio = time.perf_counter()
+
+    @contextlib.contextmanager
+    def etapa(self, nombre: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nombre] += time.perf_counter() - inicio
+
+    def a_dict(self) -> Dict:
+        '''perfil como diccionario serializable a JSON'''
+        arcos = np.asarray(self.arcos_factibles, dtype=float)
+        return {
+            'segundos': time.perf_counter() - self._inicio,
+            'etapas': {nombre: self.etapas[nombre] for nombre in self.etapas},
+            'contadores': {nombre: int(self.contadores[nombre]) for nombre in self.contadores},
+            'arcos_factibles': {
+                'intervalos': int(arcos.size),
+                'total': int(arcos.sum()),
+                'promedio': float(arcos.mean()) if arcos.size else 0.0,
+                'mediana': float(np.median(arcos)) if arcos.size else 0.0,
+                'maximo': int(arcos.max()) if arcos.size else 0,
+            },
+        }
+
+
+def perfilado_activo() -> bool:
+    return os.environ.get('TDVRP_PERFIL') == '1'
+
+
+def activar_perfilado() -> None:
+    os.environ['TDVRP_PERFIL'] = '1'
+
+
+def desactivar_perfilado() -> None:
+    os.environ.pop('TDVRP_PERFIL', None)
+
+
+def perfil_actual() -> Optional[Perfil]:
+    return getattr(_local, 'perfil', None)
+
+
+@contextlib.contextmanager
+def perfilar(activo: Optional[bool] = None):
+    '''
+    abre un Perfil para lo que corre adentro (en este hilo) si activo es True
+    (None: según TDVRP_PERFIL, el valor por defecto de los CLI).
+    produce el Perfil, o None si el perfilado está desactivado.
+    '''
+    if not (perfilado_activo() if activo is None else activo):
+        yield None
+        return
+    anterior = perfil_actual()
+    _local.perfil = Perfil()
+    try:
+        yield _local.perfil
+    finally:
+        _local.perfil = anterior
+
+
+def etapa(nombre: str):
+    '''contexto que suma el tiempo transcurrido a la etapa nombre del perfil actual (si hay uno)'''
+    perfil = getattr(_local, 'perfil', None)
+    return _NULO if perfil is None else perfil.etapa(nombre)
+
+
+def contar(nombre: str, n: int = 1) -> None:
+    perfil = getattr(_local, 'perfil', None)
+    if perfil is not None:
+        perfil.contadores[nombre] += n
+
+
+def registrar_arcos_factibles(cantidades: Iterable[int]) -> None:
+    perfil = getattr(_local, 'perfil', None)
+    if perfil is not None:
+        perfil.arcos_factibles.extend(cantidades)
+
+
+def resumen_rendimiento(instance_summaries: List[Dict]) -> Optional[Dict]:
+    '''
+    combina los perfiles de las instancias (instance_summary['perfil']).
+
+    devuelve:
+        None si ninguna instancia tiene perfil; si no, un diccionario con:
+            - "por_instancia": DataFrame con una fila por instancia (segundos por etapa, contadores y
+              arcos factibles por intervalo), de la más lenta a la más rápida
+            - "etapas", "contadores": totales
+            - "tasa_aciertos_cache": aciertos / consultas a la caché de resultados (NaN si no se consultó)
+    '''
+    filas = []
+    for summary in instance_summaries:
+        perfil = summary.get('perfil')
+        if perfil is None:
+            continue
+        fila = {'instance_name': summary.get('instance_name'), 'instance_type': summary.get('instance_type'),
+                'segundos': perfil['segundos']}
+        fila.update({f"seg_{nombre}": perfil['etapas'].get(nombre, 0.0) for nombre in ETAPAS})
+        fila.update({nombre: perfil['contadores'].get(nombre, 0) for nombre in CONTADORES})
+        fila.update({f"arcos_factibles_{k}": v for k, v in perfil['arcos_factibles'].items()})
+        filas.append(fila)
+    if not filas:
+        return None
+
+    por_instancia = pd.DataFrame(filas).sort_values('segundos', ascending=False, ignore_index=True)
+    contadores = {nombre: int(por_instancia[nombre].sum()) for nombre in CONTADORES}
+    consultas = contadores['cache_aciertos'] + contadores['cache_fallos']
+    return {
+        'por_instancia': por_instancia,
+        'etapas': {nombre: float(por_instancia[f"seg_{nombre}"].sum()) for nombre in ETAPAS},
+        'contadores': contadores,
+        'tasa_aciertos_cache': contadores['cache_aciertos'] / consultas if consultas else math.nan,
+    }
@@ -0,0 +1,265 @@
+"""
+Resúmenes mergeables para el análisis global.
+
+Permiten agregar instancia por instancia (y combinar resultados parciales) las métricas globales
+sin guardar la tabla completa de arcos: histogramas de deciles, momentos acumulados y un sketch
+de cuantiles para los ratios.
+"""
+
+import math
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+import perfilado
+
+
+COLUMNAS_RATIOS = ['ratio_to_min', 'ratio_to_max', 'ratio_to_min_dist', 'ratio_to_max_dist']
+COLUMNAS_MOMENTOS = COLUMNAS_RATIOS + ['num_feasible_arcs']
+CUANTILES_RATIOS = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+class Momentos:
+    '''
+    cantidad, media y suma de cuadrados de desvíos (Welford/Chan), combinables entre sí.
+    los NaN se ignoran, igual que en pandas.
+    '''
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+
+    def agregar(self, valores) -> None:
+        v = np.asarray(valores, dtype=float)
+        v = v[~np.isnan(v)]
+        if v.size:
+            otro = Momentos()
+            otro.n = int(v.size)
+            otro.media = float(v.mean())
+            otro.m2 = float(((v - otro.media) ** 2).sum())
+            self.combinar(otro)
+
+    def combinar(self, otro: "Momentos") -> None:
+        if otro.n == 0:
+            return
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        self.media += delta * otro.n / n
+        self.m2 += otro.m2 + delta * delta * self.n * otro.n / n
+        self.n = n
+
+    def promedio(self) -> float:
+        return self.media if self.n else math.nan
+
+    def desvio(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+
+
+class SketchCuantiles:
+    '''
+    sketch de cuantiles con error relativo acotado (buckets logarítmicos, estilo DDSketch).
+    dos sketches con el mismo error_relativo se combinan sumando los contadores de cada bucket.
+    los valores <= 0 se cuentan aparte y se reportan como 0.
+    '''
+
+    def __init__(self, error_relativo: float = 0.01):
+        self.error_relativo = error_relativo
+        self.gamma = (1 + error_relativo) / (1 - error_relativo)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.ceros = 0
+        self.n = 0
+
+    def agregar(self, valores) -> None:
+        v = np.asarray(valores, dtype=float)
+        v = v[~np.isnan(v)]
+        if not v.size:
+            return
+        positivos = v[v > 0]
+        self.ceros += int(v.size - positivos.size)
+        self.n += int(v.size)
+        claves, cuentas = np.unique(np.ceil(np.log(positivos) / self._log_gamma).astype(np.int64), return_counts=True)
+        for k, c in zip(claves.tolist(), cuentas.tolist()):
+            self.buckets[k] = self.buckets.get(k, 0) + c
+
+    def combinar(self, otro: "SketchCuantiles") -> None:
+        if otro.error_relativo != self.error_relativo:
+            raise ValueError("Solo se pueden combinar sketches con el mismo error relativo")
+        self.ceros += otro.ceros
+        self.n += otro.n
+        for k, c in otro.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + c
+
+    def cuantil(self, q: float) -> float:
+        if self.n == 0:
+            return math.nan
+        rango = q * (self.n - 1)
+        acumulado = self.ceros
+        if rango < acumulado:
+            return 0.0
+        for k in sorted(self.buckets):
+            acumulado += self.buckets[k]
+            if rango < acumulado:
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class _ResumenTipo:
+    '''acumuladores de un tipo de instancia (C, R, RC)'''
+
+    def __init__(self, error_relativo: float):
+        self.total_arcs = 0
+        self.deciles = np.zeros(10, dtype=np.int64)
+        self.deciles_dist = np.zeros(10, dtype=np.int64)
+        self.momentos = {c: Momentos() for c in COLUMNAS_MOMENTOS}
+        self.sketches = {c: SketchCuantiles(error_relativo) for c in COLUMNAS_RATIOS}
+
+    def combinar(self, otro: "_ResumenTipo") -> None:
+        self.total_arcs += otro.total_arcs
+        self.deciles += otro.deciles
+        self.deciles_dist += otro.deciles_dist
+        for c in COLUMNAS_MOMENTOS:
+            self.momentos[c].combinar(otro.momentos[c])
+        for c in COLUMNAS_RATIOS:
+            self.sketches[c].combinar(otro.sketches[c])
+
+
+class ResumenGlobal:
+    '''
+    agregado mergeable del análisis global. Cada instancia se incorpora con actualizar() apenas termina
+    y las métricas globales salen de los acumuladores, sin necesitar la tabla completa de arcos.
+
+    metricas_generales() y datos_comparacion() devuelven lo mismo que _calcular_metricas_generales y
+    datos_comparacion_general de tdvrp_analyzer (más los cuantiles de ratios por tipo).
+    '''
+
+    def __init__(self, error_relativo: float = 0.01):
+        self.error_relativo = error_relativo
+        self.por_tipo: Dict[str, _ResumenTipo] = {}
+        self.instancias: List[dict] = []
+        self.instance_summaries: List[dict] = []
+        self.route_idx = set()
+
+    def actualizar(self, instance_name: str, tipo: str, instance_df: pd.DataFrame, instance_summary: dict) -> None:
+        '''
+        incorpora el resultado de una instancia.
+        '''
+        self.instance_summaries.append(instance_summary)
+        if instance_df.empty:
+            return
+
+        resumen = self.por_tipo.setdefault(tipo, _ResumenTipo(self.error_relativo))
+        resumen.total_arcs += len(instance_df)
+        resumen.deciles += np.bincount(instance_df['decile_rank'].astype(np.int64), minlength=10)[:10]
+        resumen.deciles_dist += np.bincount(instance_df['decile_rank_distance'].astype(np.int64), minlength=10)[:10]
+        for c in COLUMNAS_MOMENTOS:
+            resumen.momentos[c].agregar(instance_df[c])
+        for c in COLUMNAS_RATIOS:
+            resumen.sketches[c].agregar(instance_df[c])
+
+        self.route_idx.update(instance_df['route_idx'].unique().tolist())
+        self.instancias.append({
+            'instance_name': instance_name,
+            'avg_decile_time': instance_df['decile_rank'].mean(),
+            'std_decile_time': instance_df['decile_rank'].std(),
+            'avg_decile_dist': instance_df['decile_rank_distance'].mean(),
+            'std_decile_dist': instance_df['decile_rank_distance'].std(),
+            'near_min_pct': (instance_df['proximity_category'] == 'mas cerca del min').sum() / len(instance_df) * 100,
+            'short_arcs_pct': (instance_df['longitud arco'] == 'arco corto').sum() / len(instance_df) * 100,
+            'num_routes': instance_df['route_idx'].nunique(),
+            'total_time': instance_df['actual_travel_time'].sum(),
+        })
+
+    def combinar(self, otro: "ResumenGlobal") -> None:
+        '''
+        suma en este resumen los acumuladores de otro (por ejemplo, de otro proceso o de otra corrida parcial).
+        '''
+        for tipo, resumen in otro.por_tipo.items():
+            if tipo in self.por_tipo:
+                self.por_tipo[tipo].combinar(resumen)
+            else:
+                propio = _ResumenTipo(self.error_relativo)
+                propio.combinar(resumen)
+                self.por_tipo[tipo] = propio
+        self.instancias.extend(otro.instancias)
+        self.instance_summaries.extend(otro.instance_summaries)
+        self.route_idx.update(otro.route_idx)
+
+    def metricas_generales(self) -> Dict:
+        '''equivalente a _calcular_metricas_generales(global_df, instance_summaries)'''
+        total_arcs = sum(r.total_arcs for r in self.por_tipo.values())
+        if total_arcs == 0:
+            return {}
+
+        deciles = sum(r.deciles for r in self.por_tipo.values())
+        deciles_dist = sum(r.deciles_dist for r in self.por_tipo.values())
+        by_type = {
+            tipo: {
+                'total_arcs': r.total_arcs,
+                'optimal_arcs_pct': r.deciles[:3].sum() / r.total_arcs * 100,
+                'optimal_arcs_pct_dist': r.deciles_dist[:3].sum() / r.total_arcs * 100,
+                'avg_decile': _media_histograma(r.deciles),
+                'avg_decile_dist': _media_histograma(r.deciles_dist),
+            }
+            for tipo, r in self.por_tipo.items()
+        }
+
+        global_metrics = {
+            'total_instances': len({i['instance_name'] for i in self.instancias}),
+            'total_arcs': total_arcs,
+            'total_routes': len(self.route_idx),
+            'global_optimal_pct': deciles[:3].sum() / total_arcs * 100,
+            'global_optimal_pct_dist': deciles_dist[:3].sum() / total_arcs * 100,
+            'global_avg_decile': _media_histograma(deciles),
+            'global_avg_decile_dist': _media_histograma(deciles_dist),
+            'by_instance_type': by_type,
+            'instance_summaries': self.instance_summaries
+        }
+        rendimiento = perfilado.resumen_rendimiento(self.instance_summaries)
+        if rendimiento is not None:
+            global_metrics['rendimiento'] = rendimiento
+        return global_metrics
+
+    def datos_comparacion(self) -> Dict[str, pd.DataFrame]:
+        '''equivalente a datos_comparacion_general(global_df), más 'ratio_quantiles_by_type' '''
+        tipos = sorted(self.por_tipo)
+
+        def _deciles_por_tipo(atributo: str, columna: str) -> pd.DataFrame:
+            filas = []
+            for tipo in tipos:
+                hist = getattr(self.por_tipo[tipo], atributo)
+                for decil in np.flatnonzero(hist):
+                    filas.append({'instance_type': tipo, columna: int(decil), 'count': int(hist[decil]),
+                                  'percentage': hist[decil] / hist.sum() * 100})
+            return pd.DataFrame(filas, columns=['instance_type', columna, 'count', 'percentage'])
+
+        columnas_instancia = ['instance_name', 'avg_decile_time', 'std_decile_time', 'avg_decile_dist',
+                              'std_decile_dist', 'near_min_pct', 'short_arcs_pct', 'num_routes', 'total_time']
+        instance_summary = (pd.DataFrame(self.instancias, columns=columnas_instancia)
+                            .sort_values('instance_name').reset_index(drop=True))
+        instance_summary[columnas_instancia[1:]] = instance_summary[columnas_instancia[1:]].round(2)
+
+        ratios_by_type = pd.DataFrame([
+            {'instance_type': tipo, **{c: self.por_tipo[tipo].momentos[c].promedio() for c in COLUMNAS_MOMENTOS}}
+            for tipo in tipos
+        ], columns=['instance_type'] + COLUMNAS_MOMENTOS).round(3)
+
+        ratio_quantiles_by_type = pd.DataFrame([
+            {'instance_type': tipo, 'ratio': c, 'quantile': q, 'value': self.por_tipo[tipo].sketches[c].cuantil(q)}
+            for tipo in tipos for c in COLUMNAS_RATIOS for q in CUANTILES_RATIOS
+        ], columns=['instance_type', 'ratio', 'quantile', 'value'])
+
+        return {
+            'deciles_by_type': _deciles_por_tipo('deciles', 'decile_rank'),
+            'deciles_dist_by_type': _deciles_por_tipo('deciles_dist', 'decile_rank_distance'),
+            'instance_summary': instance_summary,
+            'ratios_by_type': ratios_by_type,
+            'ratio_quantiles_by_type': ratio_quantiles_by_type
+        }
+
+
+def _media_histograma(hist: np.ndarray) -> float:
+    total = hist.sum()
+    return float((hist * np.arange(len(hist))).sum() / total) if total else math.nan
@@ -1,5 +1,7 @@
 import json, math, argparse, csv
+import numpy as np
 from build_pwl_arc import *
+import perfilado
 
 def pwl_f(t: float, i: int, j: int, instance: dict) -> float:
     '''
@@ -68,7 +70,219 @@ def simulacion(solution, instance):
          error=1
     return res, error
 
+######################################################################
+# Motor de simulación por lotes: todas las rutas (de una o varias soluciones) avanzan a la vez
+######################################################################
+
+# una fila por arco recorrido; wait es la espera en node_from antes del servicio y arrival la llegada a node_to
+TD_DTYPE = np.dtype([
+    ('solution', np.int32), ('route', np.int32), ('position', np.int32),
+    ('node_from', np.int32), ('node_to', np.int32),
+    ('departure', np.float64), ('travel_time', np.float64), ('wait', np.float64), ('arrival', np.float64),
+])
+
+REPORTE_DTYPE = np.dtype([
+    ('solution', np.int32), ('route', np.int32),
+    ('duration', np.float64), ('simulated_duration', np.float64), ('difference', np.float64), ('ok', np.bool_),
+])
+
+
+def contexto_instancia(instance: dict) -> dict:
+    '''
+    arrays precalculados de una instancia para las simulaciones vectorizadas.
+    se arma una vez por instancia y se reutiliza en todas las rutas/soluciones.
+    '''
+    I = instance
+    D = np.asarray(I["distances"], dtype=float)
+    n = len(D)
+    T = I["horizon"][1]
+    return {
+        "D": D,
+        "clusters": np.asarray(I["clusters"], dtype=np.int64),
+        "speeds": np.asarray(I["cluster_speeds"], dtype=float),
+        "Zs": Z(I),
+        "per": P(I),
+        "tw": np.asarray(I.get("time_windows", [[0, T]] * n), dtype=float),
+        "st": np.asarray(I.get("service_times", [0] * n), dtype=float),
+        "q": np.asarray(I.get("demands", [0] * n), dtype=float),
+        "Q": I.get("capacity", 1),
+    }
+
+
+def matriz_rutas(paths: list) -> tuple:
+    '''
+    rellena las rutas con -1 en una matriz (R, L) y devuelve también el largo de cada una
+    '''
+    largos = np.array([len(p) for p in paths], dtype=np.int64)
+    M = np.full((len(paths), max(largos.max(initial=0), 1)), -1, dtype=np.int64)
+    for r, p in enumerate(paths):
+        M[r, :len(p)] = p
+    return M, largos
+
+
+def avanzar_rutas(ctx: dict, paths: list, t0, speeds=None, ciclico: bool = True) -> dict:
+    '''
+    simula en paralelo (lockstep) un conjunto de rutas: en el paso k se evalúa el arco k de todas las
+    rutas que todavía no terminaron, con una única llamada a fwd_vec.
+
+    recibe:
+        ctx: salida de contexto_instancia
+        paths: lista de rutas (listas de nodos)
+        t0: instante de salida de cada ruta (R,)
+        speeds: velocidades por cluster y zona; (C, Z) compartidas o (R, C, Z) una tabla por ruta.
+                por defecto ctx["speeds"]
+        ciclico: ver fwd_vec
+
+    devuelve un diccionario de arrays (R, L-1) indexados por [ruta, posición] (NaN fuera de la ruta):
+        "departure", "travel_time", "wait", "arrival", y además "fin" (R,) con el instante final de cada ruta
+    '''
+    M, largos = matriz_rutas(paths)
+    R, L = M.shape
+    speeds = ctx["speeds"] if speeds is None else np.asarray(speeds, dtype=float)
+    a, s = ctx["tw"][:, 0], ctx["st"]
+
+    salida = np.full((R, L - 1), np.nan)
+    viaje = np.full((R, L - 1), np.nan)
+    espera = np.full((R, L - 1), np.nan)
+    t = np.array(np.broadcast_to(np.asarray(t0, dtype=float), (R,)))
+
+    for k in range(L - 1):
+        act = np.flatnonzero(largos - 1 > k)
+        if not act.size: break
+        i, j = M[act, k], M[act, k + 1]
+        # si llego antes de la ventana, espero hasta que abra + el tiempo de servicio
+        espera[act, k] = np.maximum(a[i] - t[act], 0.0)
+        t_i = np.maximum(t[act], a[i]) + s[i]
+        cid = ctx["clusters"][i, j]
+        VZ = speeds[cid] if speeds.ndim == 2 else speeds[act, cid]
+        dur = fwd_vec(ctx["D"][i, j], t_i, VZ, ctx["Zs"], ctx["per"], ciclico)
+        perfilado.contar('fwd_vec', act.size)
+        salida[act, k] = t_i
+        viaje[act, k] = dur
+        t[act] = t_i + dur
+
+    return {"departure": salida, "travel_time": viaje, "wait": espera, "arrival": salida + viaje,
+            "fin": t, "paths": M, "largos": largos}
+
+
+def simulacion_lote(soluciones, instance: dict, ctx: dict = None, diferencia_de_simulacion: float = 0.1):
+    '''
+    versión por lotes de simulacion: simula todas las rutas de una solución (o de una lista de
+    soluciones de la misma instancia) a la vez.
+
+    devuelve:
+        - tabla: np.ndarray estructurado (TD_DTYPE) con una fila por arco, ordenado por (solution, route, position)
+        - reporte: np.ndarray estructurado (REPORTE_DTYPE) con la duración de la solución vs. la simulada por ruta
+    '''
+    if isinstance(soluciones, dict):
+        soluciones = [soluciones]
+    ctx = contexto_instancia(instance) if ctx is None else ctx
+
+    ids = [(s, r) for s, sol in enumerate(soluciones) for r in range(len(sol["routes"]))]
+    rutas = [route for sol in soluciones for route in sol["routes"]]
+    sim = avanzar_rutas(ctx, [route["path"] for route in rutas], [route["t0"] for route in rutas])
+
+    filas, cols = np.nonzero(~np.isnan(sim["departure"]))
+    tabla = np.zeros(len(filas), dtype=TD_DTYPE)
+    tabla['solution'] = [ids[f][0] for f in filas]
+    tabla['route'] = [ids[f][1] for f in filas]
+    tabla['position'] = cols
+    tabla['node_from'] = sim["paths"][filas, cols]
+    tabla['node_to'] = sim["paths"][filas, cols + 1]
+    for campo in ('departure', 'travel_time', 'wait', 'arrival'):
+        tabla[campo] = sim[campo][filas, cols]
+
+    reporte = np.zeros(len(rutas), dtype=REPORTE_DTYPE)
+    reporte['solution'] = [s for s, _ in ids]
+    reporte['route'] = [r for _, r in ids]
+    reporte['duration'] = [route["duration"] for route in rutas]
+    reporte['simulated_duration'] = sim["fin"] - np.array([route["t0"] for route in rutas], dtype=float)
+    reporte['difference'] = reporte['simulated_duration'] - reporte['duration']
+    reporte['ok'] = np.abs(reporte['difference']) < diferencia_de_simulacion
+    return tabla, reporte
+
+
+def tramos_por_ruta(tabla: np.ndarray, n_rutas: int, solucion: int = 0) -> list:
+    '''
+    separa la tabla de simulacion_lote en n_rutas vistas, una por ruta, para una solución
+    '''
+    tabla = tabla[tabla['solution'] == solucion]
+    cortes = np.searchsorted(tabla['route'], np.arange(1, n_rutas))
+    return np.split(tabla, cortes)
+
+
+def barrido_t0(solution: dict, instance: dict, grilla=None, pasos: int = 50, ctx: dict = None) -> dict:
+    '''
+    sensibilidad de la duración de cada ruta a su t0: simula todas las rutas saliendo en cada punto
+    de la grilla en un único lote (rutas x grilla carriles en avanzar_rutas).
+
+    recibe:
+        solution, instance: como en simulacion
+        grilla: instantes de salida a evaluar; por defecto `pasos` puntos equiespaciados en el horizonte
+
+    devuelve un diccionario con:
+        - "grilla": np.ndarray (G,)
+        - "duraciones": np.ndarray (R, G) con la duración de la ruta r saliendo en grilla[g]
+        - "factible": np.ndarray[bool] (R, G), True si se llega a cada nodo antes del cierre de su ventana
+        - "t0_optimo", "duracion_optima": np.ndarray (R,) con el t0 factible de menor duración y esa
+          duración (NaN si la ruta no tiene ningún t0 factible en la grilla)
+    '''
+    ctx = contexto_instancia(instance) if ctx is None else ctx
+    if grilla is None:
+        grilla = np.linspace(instance["horizon"][0], instance["horizon"][1], pasos)
+    grilla = np.asarray(grilla, dtype=float)
+
+    paths = [route["path"] for route in solution["routes"]]
+    R, G = len(paths), len(grilla)
+    sim = avanzar_rutas(ctx, [p for p in paths for _ in range(G)], np.tile(grilla, R))
+
+    duraciones = (sim["fin"] - np.tile(grilla, R)).reshape(R, G)
+    M = sim["paths"]
+    cierre = np.where(M[:, 1:] >= 0, ctx["tw"][M[:, 1:], 1], np.inf)
+    factible = (~(sim["arrival"] > cierre + EPS).any(axis=1)).reshape(R, G)
+
+    # el óptimo se busca solo entre los t0 factibles; una ruta sin t0 factible queda en NaN
+    candidatas = np.where(factible & ~np.isnan(duraciones), duraciones, np.inf)
+    t0_optimo, duracion_optima = np.full(R, np.nan), np.full(R, np.nan)
+    if G:
+        mejor = np.argmin(candidatas, axis=1)
+        hay = np.isfinite(candidatas[np.arange(R), mejor])
+        t0_optimo[hay] = grilla[mejor[hay]]
+        duracion_optima[hay] = duraciones[np.arange(R), mejor][hay]
+    return {
+        "grilla": grilla,
+        "duraciones": duraciones,
+        "factible": factible,
+        "t0_optimo": t0_optimo,
+        "duracion_optima": duracion_optima,
+    }
+
+
 if __name__ == "__main__":
-    
-    path_s = f"data/nuevos/solutions.json"
-    solutions = json.load(open(path_s))
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Barrido de la duración de cada ruta sobre una grilla de t0.")
+    parser.add_argument("instancia", help="archivo JSON de la instancia")
+    parser.add_argument("soluciones", help="archivo JSON con la lista de soluciones (solutions.json)")
+    parser.add_argument("--pasos", type=int, default=50, help="cantidad de puntos de la grilla")
+    parser.add_argument("--desde", type=float, default=None, help="primer t0 de la grilla (por defecto, inicio del horizonte)")
+    parser.add_argument("--hasta", type=float, default=None, help="último t0 de la grilla (por defecto, fin del horizonte)")
+    parser.add_argument("--salida", default=None, help="CSV donde guardar la matriz rutas x grilla")
+    args = parser.parse_args()
+
+    instance = json.load(open(args.instancia))
+    solutions = {s["instance_name"]: s for s in json.load(open(args.soluciones))}
+    solution = solutions[instance["instance_name"]]
+
+    desde = instance["horizon"][0] if args.desde is None else args.desde
+    hasta = instance["horizon"][1] if args.hasta is None else args.hasta
+    res = barrido_t0(solution, instance, grilla=np.linspace(desde, hasta, args.pasos))
+
+    print(f"{'ruta':>4} {'t0':>10} {'duracion':>10} {'t0_optimo':>10} {'dur_optima':>10}")
+    for r, route in enumerate(solution["routes"]):
+        print(f"{r:>4} {route['t0']:>10.2f} {route['duration']:>10.2f} {res['t0_optimo'][r]:>10.2f} {res['duracion_optima'][r]:>10.2f}")
+
+    if args.salida:
+        with open(args.salida, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["route"] + [f"{t:.4f}" for t in res["grilla"]])
+            for r, fila in enumerate(res["duraciones"]):
+                w.writerow([r] + [f"{d:.6f}" for d in fila])
@@ -0,0 +1,89 @@
+"""
+Filtros y paginado de la tabla de arcos del lado del servidor, para no mandar al navegador cientos de
+miles de filas.
+
+IndiceArcos precalcula, una vez por tabla, códigos enteros chicos para las columnas de filtro (ruta,
+deciles, instancia) y un índice invertido por instancia. Filtrar devuelve solo las posiciones de las
+filas que pasan; la app muestra una página de esas filas y los conteos del total filtrado.
+No depende de Streamlit.
+"""
+
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tdvrp_analyzer import etiquetas_arcos
+
+
+TAMANOS_PAGINA = [50, 100, 500, 1000]
+
+
+class IndiceArcos:
+    '''índice de filtros sobre una tabla de arcos (analysis_df o global_df), que no se modifica'''
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.rutas = df['route_idx'].to_numpy(np.int32)
+        self.deciles = {
+            'decile_rank': df['decile_rank'].to_numpy(np.int8),
+            'decile_rank_distance': df['decile_rank_distance'].to_numpy(np.int8),
+        }
+        self.instancias = None
+        if 'instance_name' in df.columns:
+            nombres = df['instance_name'].astype('category')
+            self.instancias = list(nombres.cat.categories)
+            codigos = nombres.cat.codes.to_numpy(np.int32)
+            # índice invertido: las filas de la instancia k son _orden[_limites[k]:_limites[k + 1]]
+            self._orden = np.argsort(codigos, kind='stable')
+            self._limites = np.searchsorted(codigos[self._orden], np.arange(len(self.instancias) + 1))
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def rutas_disponibles(self) -> list:
+        return np.unique(self.rutas).tolist()
+
+    def filtrar(self, rutas: Iterable[int] = None, deciles: Tuple[int, int] = (0, 9),
+                instancias: Iterable[str] = None, columna_decil: str = 'decile_rank') -> np.ndarray:
+        '''
+        posiciones (ordenadas) de las filas que pasan los filtros.
+
+        recibe:
+            rutas: route_idx a incluir (None o vacío: todas)
+            deciles: rango (mínimo, máximo) inclusivo de columna_decil
+            instancias: instance_name a incluir (None o vacío: todas; solo en tablas globales)
+            columna_decil: decile_rank (tiempo) o decile_rank_distance
+        '''
+        if instancias and self.instancias is not None:
+            codigo = {nombre: k for k, nombre in enumerate(self.instancias)}
+            partes = [self._orden[self._limites[codigo[n]]:self._limites[codigo[n] + 1]] for n in instancias if n in codigo]
+            posiciones = np.sort(np.concatenate(partes)) if partes else np.zeros(0, dtype=np.int64)
+        else:
+            posiciones = np.arange(len(self.df))
+
+        decil = self.deciles[columna_decil][posiciones]
+        mascara = (decil >= deciles[0]) & (decil <= deciles[1])
+        if rutas:
+            mascara &= np.isin(self.rutas[posiciones], np.fromiter(rutas, dtype=np.int32))
+        return posiciones[mascara]
+
+    def pagina(self, posiciones: np.ndarray, numero: int, tamano: int = TAMANOS_PAGINA[1]) -> pd.DataFrame:
+        '''filas de la página numero (desde 0) de posiciones, con la etiqueta del arco para mostrar'''
+        pagina = self.df.iloc[posiciones[numero * tamano:(numero + 1) * tamano]].copy()
+        pagina.insert(2, 'arc_id', etiquetas_arcos(pagina))
+        return pagina
+
+    def conteos(self, posiciones: np.ndarray, columna_decil: str = 'decile_rank') -> Dict:
+        '''resumen de las filas filtradas: cantidad, arcos por decil y % en deciles óptimos (0-2)'''
+        por_decil = np.bincount(self.deciles[columna_decil][posiciones], minlength=10)
+        filas = len(posiciones)
+        return {
+            'filas': filas,
+            'por_decil': por_decil,
+            'optimos_pct': por_decil[:3].sum() / filas * 100 if filas else 0.0,
+        }
+
+
+def cantidad_paginas(filas: int, tamano: int) -> int:
+    return max(1, -(-filas // tamano))
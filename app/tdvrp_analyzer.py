@@ -7,12 +7,18 @@ import pandas as pd
 import numpy as np
 import json
 import io
+import os
 import zipfile
-from typing import Dict, List, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
 import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from build_pwl_arc import Z, P, fwd, tau_pts
-from simulacion import simulacion
-from metricas_arcos import clusters_arcos_ruta, duracion_arcos, metricas, metrica_distancia
+from simulacion import simulacion_lote, tramos_por_ruta, barrido_t0
+from metricas_arcos import (clusters_arcos_ruta, duracion_arcos, arrays_arcos_factibles, metricas_ruta,
+                            ETIQUETAS_PROXIMIDAD, ETIQUETAS_LONGITUD)
+from resumen_global import ResumenGlobal
+from cache_resultados import CacheResultados, clave_analisis
+import perfilado
 
 
 def process_files(instances_zip_bytes: bytes, solutions_json_bytes: bytes) -> Dict[str, Dict[str, Any]]:
@@ -80,16 +86,105 @@ def process_files(instances_zip_bytes: bytes, solutions_json_bytes: bytes) -> Di
     return paired_data
 
 
+def cargar_pares(instances_path: str, solutions_path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Versión de process_files que lee desde disco (para scripts y CLI).
+
+    recibe:
+        instances_path: archivo .zip de instancias o directorio con los .json de las instancias
+        solutions_path: archivo solutions.json
+
+    devuelve:
+        el mismo diccionario que process_files
+    """
+    with open(solutions_path, 'rb') as f:
+        solutions_bytes = f.read()
+
+    if not os.path.isdir(instances_path):
+        with open(instances_path, 'rb') as f:
+            return process_files(f.read(), solutions_bytes)
+
+    solutions_index = {}
+    for solution in json.loads(solutions_bytes.decode('utf-8')):
+        if solution.get("instance_name"):
+            solutions_index[solution["instance_name"]] = solution
+
+    paired_data = {}
+    for basename in sorted(os.listdir(instances_path)):
+        instance_name = basename.rsplit('.', 1)[0]
+        if basename.startswith('.') or not basename.endswith('.json') or instance_name not in solutions_index:
+            continue
+        try:
+            with open(os.path.join(instances_path, basename), 'rb') as f:
+                instance_data = json.loads(f.read().decode('utf-8'))
+            paired_data[instance_name] = {
+                'instance': instance_data,
+                'solution': solutions_index[instance_name]
+            }
+        except Exception as e:
+            print(f"Error al leer instancia {basename}: {str(e)}")
+    return paired_data
+
+
 def correr_analisis_instancia(instance_name: str, instance_data: dict, solution_data: dict, 
-                     epsilon: float = 0.1, cant_muestras: int = 10) -> pd.DataFrame:
+                     epsilon: float = 0.1, cant_muestras: int = 10, con_perfil: Optional[bool] = None,
+                     cache: Optional[CacheResultados] = None) -> pd.DataFrame:
+    """
+    Ejecuta el análisis completo sobre un par instancia-solución (ver _analisis_instancia).
+    Con una cache (cache_resultados.py), el resultado se lee de ella cuando el par y los parámetros
+    no cambiaron, y se guarda en ella cuando se calcula.
+    Con con_perfil=True (None: según TDVRP_PERFIL, ver perfilado.py), el perfil de la corrida queda en
+    analysis_df.attrs['perfil'].
+    """
+    analysis_df, summary = _analisis_con_cache(instance_name, instance_data, solution_data, epsilon, cant_muestras,
+                                               resumir=False, con_perfil=con_perfil, cache=cache)
+    if 'perfil' in summary:
+        analysis_df.attrs['perfil'] = summary['perfil']
+    return analysis_df
+
+
+def _analisis_con_cache(instance_name: str, instance_data: dict, solution_data: dict, epsilon: float,
+                        cant_muestras: int, resumir: bool = True,
+                        con_perfil: Optional[bool] = None,
+                        cache: Optional[CacheResultados] = None) -> Tuple[pd.DataFrame, Dict]:
+    """
+    _analisis_instancia y su resumen (resumen_metricas), pasando por cache si se indica.
+    Con resumir=False el resumen solo se calcula si hay que guardarlo en la caché (si no, queda vacío).
+    Con el perfilado activo (con_perfil, o TDVRP_PERFIL si es None), el perfil de la instancia queda en
+    el resumen, en 'perfil'.
+    """
+    with perfilado.perfilar(con_perfil) as perfil:
+        guardado = None
+        if cache is not None:
+            clave = clave_analisis(instance_data, solution_data, epsilon, cant_muestras)
+            guardado = cache.obtener(clave)
+            perfilado.contar('cache_aciertos' if guardado is not None else 'cache_fallos')
+
+        if guardado is not None:
+            analysis_df, summary = guardado
+        else:
+            analysis_df = _analisis_instancia(instance_name, instance_data, solution_data, epsilon, cant_muestras)
+            summary = {}
+            if resumir or cache is not None:
+                with perfilado.etapa('resumen'):
+                    summary = resumen_metricas(analysis_df)
+            if cache is not None:
+                cache.guardar(clave, analysis_df, summary)
+        if perfil is not None:
+            summary['perfil'] = perfil.a_dict()
+    return analysis_df, summary
+
+
+def _analisis_instancia(instance_name: str, instance_data: dict, solution_data: dict,
+                        epsilon: float = 0.1, cant_muestras: int = 10) -> pd.DataFrame:
     """
     Ejecuta el análisis completo sobre un par instancia-solución.
     
     Esta es la función principal, que integra toda la lógica de investigación:
-    1. Simula la ruta usando simulacion.py
+    1. Simula las rutas usando simulacion.py (simulacion_lote)
     2. Identifica arcos factibles por intervalo
-    3. Calcula duraciones y métricas
-    4. Asigna deciles de decisión
+    3. Calcula duraciones
+    4. Calcula métricas y deciles de decisión con el kernel fusionado (metricas_ruta)
     
     recibe:
         instance_name: Nombre de la instancia
@@ -99,7 +194,9 @@ def correr_analisis_instancia(instance_name: str, instance_data: dict, solution_
         cant_muestras: Muestras para calcular duraciones
         
     devuelve:
-        DataFrame con columnas detalladas del análisis
+        DataFrame con columnas detalladas del análisis. Las etiquetas son categóricas y los ids,
+        deciles y conteos usan enteros chicos (int16/int32/int8); el nombre del arco para mostrar
+        sale de etiquetas_arcos.
     """
     
     results = []
@@ -110,169 +207,123 @@ def correr_analisis_instancia(instance_name: str, instance_data: dict, solution_
     if not routes:
         raise ValueError(f"La solución para {instance_name} no contiene rutas")
     
-    # Ejecutar simulación para obtener time_departures
-    time_departures, error = simulacion(solution_data, instance_data)
+    # Ejecutar simulación (todas las rutas a la vez) para obtener los tiempos de salida de cada arco
+    with perfilado.etapa('simulacion'):
+        tabla_sim, reporte_sim = simulacion_lote(solution_data, instance_data)
+        time_departures = tramos_por_ruta(tabla_sim, len(routes))
+    error = not reporte_sim['ok'].all()
     
     if error:
         print(f"Advertencia: Error en simulación de {instance_name}")
     
+    distancias = np.asarray(instance_data["distances"], dtype=float)
+    xy = coordenadas_nodos(instance_data)
+
     # Procesar cada ruta
     for idx_ruta, route in enumerate(routes):
         path = route["path"]
         t0 = route["t0"]
         
         # Construir intervalos de tiempo de la ruta
-        intervalos_ruta = []
         td_ruta = time_departures[idx_ruta]
-        for i in range(len(td_ruta) - 1):
-            inter = (td_ruta[i][2], td_ruta[i+1][2])
-            intervalos_ruta.append(inter)
+        intervalos_ruta = list(zip(td_ruta['departure'][:-1].tolist(), td_ruta['departure'][1:].tolist()))
         
         # Arcos utilizados en la ruta
         arcos_utilizados = [(path[i], path[i+1]) for i in range(len(path) - 1)]
         
         # Obtener arcos factibles por intervalo
-        arcos_factibles = clusters_arcos_ruta(instance_data, intervalos_ruta, arcos_utilizados)
+        with perfilado.etapa('clusters'):
+            arcos_factibles = clusters_arcos_ruta(instance_data, intervalos_ruta, arcos_utilizados)
+        if perfilado.perfil_actual() is not None:
+            perfilado.registrar_arcos_factibles(len(arcos) for arcos in arcos_factibles.values())
         
         # Calcular duraciones de arcos factibles
-        duracion_arcos_factibles = duracion_arcos(
-            arcos_factibles, intervalos_ruta, instance_data, epsilon, cant_muestras
-        )
-        
-        # Calcular métricas (ahora devuelve 3 valores)
-        metricas_res, metricas_str, rels = metricas(
-            arcos_factibles, duracion_arcos_factibles, time_departures, idx_ruta
-        )
-        
-        distancias = instance_data["distances"]
-        
-        metricas_res_dist, metricas_str_dist, _ = metrica_distancia(arcos_factibles, distancias, path)
-        
-        # Construir DataFrame con resultados detallados
-        for idx_arco, (intervalo, arcos) in enumerate(arcos_factibles.items()):
-            arco_usado = arcos_utilizados[idx_arco]
-            duracion_optima = td_ruta[idx_arco][3]
-            
-            # Extraer duraciones de todos los arcos factibles
-            dur_entries = duracion_arcos_factibles.get(intervalo, [])
-            
-            duraciones = [entry["durations"]["mean"] for entry in dur_entries if entry["durations"]["mean"] > 0]
-            
-            # Extraer distancias de todos los arcos factibles para este intervalo
-            distancias_factibles = []
-            for arco in arcos:  # arcos son TODOS los arcos factibles para este intervalo
-                i, j = arco
-                if i < len(distancias) and j < len(distancias[i]):
-                    dist = distancias[i][j]
-                    if dist > 0:
-                        distancias_factibles.append(dist)
-        
-            # Distancia del arco utilizado
-            distancia_optima = distancias[arco_usado[0]][arco_usado[1]] if distancias else 0
-            
-            if not distancias_factibles and distancia_optima > 0:
-                distancias_factibles = [distancia_optima]    
-            
-            min_dur = min(duraciones) if duraciones else duracion_optima
-            max_dur = max(duraciones) if duraciones else duracion_optima
-            min_dist = min(distancias_factibles) if distancias_factibles else distancia_optima
-            max_dist = max(distancias_factibles) if distancias_factibles else distancia_optima
-            
-            # Calcular ratios
-            ratio_min = duracion_optima / min_dur if min_dur > 0 else None
-            ratio_max = duracion_optima / max_dur if max_dur > 0 else None
-            ratio_min_dist = distancia_optima / min_dist if min_dist > 0 else None
-            ratio_max_dist = distancia_optima / max_dist if max_dist > 0 else None
-            
-            # Calcular deciles
-            decile = _calcular_decil(duracion_optima, duraciones)
-            decile_dist = _calcular_decil(distancia_optima, distancias_factibles)
-                        
-            # Categoría de proximidad
-            proximity = metricas_str[idx_arco] if idx_arco < len(metricas_str) else "desconocido"
-            
-            # Coordenadas (si están disponibles en la instancia)
-            coords = _obtener_coordenadas(instance_data, arco_usado[0], arco_usado[1])
-            
-            results.append({
-                'route_idx': idx_ruta,
-                'arc_idx': idx_arco,
-                'arc_id': f"{arco_usado[0]}-{arco_usado[1]}",
-                'node_from': arco_usado[0],
-                'node_to': arco_usado[1],
-                'departure_time': intervalo[0],
-                'actual_travel_time': duracion_optima,
-                'fastest_feasible_time': min_dur,
-                'slowest_feasible_time': max_dur,
-                'actual_distance': distancia_optima,
-                'shortest_feasible_distance': min_dist,
-                'longest_feasible_distance': max_dist,
-                'ratio_to_min': ratio_min,
-                'ratio_to_max': ratio_max,
-                'ratio_to_min_dist': ratio_min_dist,
-                'ratio_to_max_dist': ratio_max_dist,
-                'longitud arco': metricas_str_dist[idx_arco],
-                'decile_rank': decile,
-                'decile_rank_distance': decile_dist,
-                'proximity_category': proximity, 
-                'num_feasible_arcs': len(arcos),
-                'node_from_lat': coords[0],
-                'node_from_lon': coords[1],
-                'node_to_lat': coords[2],
-                'node_to_lon': coords[3]
-            })
-    
-    return pd.DataFrame(results)
-
-
-def _calcular_decil(value: float, distribution: List[float]) -> int:
-    """
-    Calcula en qué decil cae un valor dentro de una distribución.
-    
-    recibe:
-        - value: Valor a clasificar
-        - distribution: Lista de valores que forman la distribución
+        with perfilado.etapa('duraciones'):
+            duracion_arcos_factibles = duracion_arcos(
+                arcos_factibles, intervalos_ruta, instance_data, epsilon, cant_muestras
+            )
         
+        # Métricas de tiempo y distancia en un único pase vectorizado por ruta
+        n_int = len(arcos_factibles)
+        arcos_usados_int = np.array(arcos_utilizados[:n_int], dtype=np.int64).reshape(n_int, 2)
+        dur_usadas = td_ruta['travel_time'][:n_int]
+        dist_usadas = distancias[arcos_usados_int[:, 0], arcos_usados_int[:, 1]] if n_int else np.zeros(0)
+
+        with perfilado.etapa('metricas'):
+            arrays = arrays_arcos_factibles(arcos_factibles, duracion_arcos_factibles, distancias)
+            m = metricas_ruta(arrays, dur_usadas, dist_usadas)
+
+        with perfilado.etapa('tabla'):
+            # Coordenadas de los extremos de cada arco: (n_int, 2 extremos, 2 coordenadas)
+            coords = xy[arcos_usados_int].reshape(n_int, 4)
+
+            results.append(pd.DataFrame({
+                'route_idx': np.full(n_int, idx_ruta, dtype=np.int16),
+                'arc_idx': np.arange(n_int, dtype=np.int16),
+                'node_from': arcos_usados_int[:, 0].astype(np.int32),
+                'node_to': arcos_usados_int[:, 1].astype(np.int32),
+                'departure_time': [intervalo[0] for intervalo in arcos_factibles],
+                'actual_travel_time': dur_usadas,
+                'fastest_feasible_time': m['min_dur'],
+                'slowest_feasible_time': m['max_dur'],
+                'actual_distance': dist_usadas,
+                'shortest_feasible_distance': m['min_dist'],
+                'longest_feasible_distance': m['max_dist'],
+                'ratio_to_min': m['ratio_min'],
+                'ratio_to_max': m['ratio_max'],
+                'ratio_to_min_dist': m['ratio_min_dist'],
+                'ratio_to_max_dist': m['ratio_max_dist'],
+                'longitud arco': pd.Categorical(m['longitud'], categories=ETIQUETAS_LONGITUD),
+                'decile_rank': m['decil'].astype(np.int8),
+                'decile_rank_distance': m['decil_dist'].astype(np.int8),
+                'proximity_category': pd.Categorical(m['proximidad'], categories=ETIQUETAS_PROXIMIDAD),
+                'num_feasible_arcs': m['num_arcos'].astype(np.int32),
+                'node_from_lat': coords[:, 0],
+                'node_from_lon': coords[:, 1],
+                'node_to_lat': coords[:, 2],
+                'node_to_lon': coords[:, 3]
+            }))
+
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+
+def etiquetas_arcos(analysis_df: pd.DataFrame) -> pd.Series:
+    """Nombre de cada arco para mostrar ("i-j"), calculado a partir de node_from y node_to"""
+    return analysis_df['node_from'].astype(str) + "-" + analysis_df['node_to'].astype(str)
+
+
+def reporte_memoria(analysis_df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Memoria ocupada por la tabla de arcos (contando el contenido de las columnas de texto/categóricas).
+
     devuelve:
-        Decil (0-9), donde 0 es el decil más bajo (valores más pequeños)
+        Diccionario con 'total_bytes', 'bytes_por_arco' y 'por_columna' ({columna: (dtype, bytes)})
     """
-    if not distribution or len(distribution) == 0:
-        return 5  # Valor medio por defecto
-    
-    sorted_dist = sorted(distribution)
-    
-    # Calcular percentiles
-    for decile in range(10):
-        percentile = np.percentile(sorted_dist, (decile + 1) * 10)
-        if value <= percentile:
-            return decile
-    
-    return 9  # Último decil
+    por_columna = analysis_df.memory_usage(deep=True, index=False)
+    total = int(por_columna.sum())
+    return {
+        'total_bytes': total,
+        'bytes_por_arco': total / len(analysis_df) if len(analysis_df) else 0.0,
+        'por_columna': {c: (str(analysis_df[c].dtype), int(por_columna[c])) for c in analysis_df.columns},
+    }
 
 
-def _obtener_coordenadas(instance_data: dict, node_from: int, node_to: int) -> Tuple[float, float, float, float]:
+def coordenadas_nodos(instance_data: dict) -> np.ndarray:
     """
-    Extrae coordenadas de nodos de la instancia.
-    
-    devuelve:
-        Tupla (lat_from, lon_from, lat_to, lon_to)
+    Coordenadas de todos los nodos de la instancia como array (n_nodos, 2).
+
+    Las instancias de Dabia et al. las guardan en digraph.coordinates; también se aceptan
+    "coordinates" o "nodes" (con lat/lon) en el primer nivel. Si no hay coordenadas, devuelve ceros.
     """
-    # Intentar diferentes estructuras de datos
-    if "coordinates" in instance_data:
+    if "coordinates" in instance_data.get("digraph", {}):
+        coords = instance_data["digraph"]["coordinates"]
+    elif "coordinates" in instance_data:
         coords = instance_data["coordinates"]
-        return (
-            coords[node_from][0], coords[node_from][1],
-            coords[node_to][0], coords[node_to][1]
-        )
     elif "nodes" in instance_data:
-        nodes = instance_data["nodes"]
-        return (
-            nodes[node_from].get("lat", 0), nodes[node_from].get("lon", 0),
-            nodes[node_to].get("lat", 0), nodes[node_to].get("lon", 0)
-        )
+        coords = [(node.get("lat", 0), node.get("lon", 0)) for node in instance_data["nodes"]]
     else:
-        # Coordenadas simuladas para pruebas
-        return (0.0, 0.0, 0.0, 0.0)
+        return np.zeros((len(instance_data["distances"]), 2))
+    return np.asarray(coords, dtype=float).reshape(-1, 2)
 
 
 def resumen_metricas(analysis_df: pd.DataFrame) -> Dict[str, Any]:
@@ -289,8 +340,6 @@ def resumen_metricas(analysis_df: pd.DataFrame) -> Dict[str, Any]:
     else:
         print("La columna 'longitud arco' no existe en analysis_df")
     
-    print(analysis_df.columns)
-
     
     # Contar arcos por categoría de proximidad
     near_min = (analysis_df['proximity_category'] == 'mas cerca del min').sum()
@@ -370,136 +419,461 @@ def datos_histograma_distancia(analysis_df: pd.DataFrame) -> pd.DataFrame:
         'Porcentaje': (decile_counts.values / len(analysis_df) * 100)
     })
 
+def tablas_resultados(analysis_df: pd.DataFrame, summary_metrics: Dict, incluir_arcos: bool = True) -> Dict[str, pd.DataFrame]:
+    """
+    Tablas lógicas del análisis de una instancia (las mismas que las hojas del Excel).
+    Con incluir_arcos=False se omite el detalle por arco.
+    """
+    tablas = {}
+    if incluir_arcos:
+        tablas['Detalle_Arcos'] = analysis_df
+    tablas['Resumen'] = pd.DataFrame([summary_metrics])
+    tablas['Distribucion_Deciles'] = datos_histograma_tiempo(analysis_df)
+    return tablas
+
 def export_results_to_excel(analysis_df: pd.DataFrame, summary_metrics: Dict, 
-                            output_path: str = "resultados_analisis.xlsx"):
+                            output_path: str = "resultados_analisis.xlsx", solo_resumen: bool = False):
     """
     Exporta resultados completos a Excel (similar a metricas_arcos.py).
+    Con solo_resumen=True no se escribe la hoja de detalle por arco (ver export_results_columnar).
     """
     with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        # Hoja 1: Análisis detallado
-        analysis_df.to_excel(writer, sheet_name='Detalle_Arcos', index=False)
-        
-        # Hoja 2: Resumen de métricas
-        summary_df = pd.DataFrame([summary_metrics])
-        summary_df.to_excel(writer, sheet_name='Resumen', index=False)
-        
-        # Hoja 3: Distribución de deciles
-        decile_dist = datos_histograma_tiempo(analysis_df)
-        decile_dist.to_excel(writer, sheet_name='Distribucion_Deciles', index=False)
+        for nombre, tabla in tablas_resultados(analysis_df, summary_metrics, not solo_resumen).items():
+            tabla.to_excel(writer, sheet_name=nombre, index=False)
+
+
+TIPOS_INSTANCIA = ['C', 'R', 'RC']  # familias de Dabia et al.; otros prefijos se conservan tal cual
+
+def _tipo_instancia(instance_name: str) -> str:
+    """Tipo de instancia (C, R o RC) a partir del nombre"""
+    return "RC" if instance_name.startswith("RC") else instance_name[0]
 
 
-def correr_analisis_general(paired_data: Dict, epsilon: float = 0.1, cant_muestras: int = 10) -> Tuple[pd.DataFrame, Dict]:
+def _concatenar_arcos(frames: List[pd.DataFrame], instance_names: List[str]) -> pd.DataFrame:
+    """
+    Concatena las tablas de arcos de varias instancias. instance_name queda categórica con todas
+    las instancias como categorías e instance_type con los tipos presentes (C, R, RC primero y
+    después cualquier otro prefijo); si las categorías difieren entre tablas, pd.concat la
+    convertiría a texto. Las tablas recibidas no se modifican.
+    """
+    if not frames:
+        return pd.DataFrame()
+    tipos = {}
+    for df in frames:
+        if 'instance_type' in df.columns:
+            tipos.update(dict.fromkeys(df['instance_type'].cat.categories))
+    tipos = [t for t in TIPOS_INSTANCIA if t in tipos] + [t for t in tipos if t not in TIPOS_INSTANCIA]
+
+    alineados = []
+    for df in frames:
+        columnas = {}
+        if 'instance_name' in df.columns:
+            columnas['instance_name'] = df['instance_name'].cat.set_categories(instance_names)
+        if 'instance_type' in df.columns:
+            columnas['instance_type'] = df['instance_type'].cat.set_categories(tipos)
+        # assign devuelve una tabla nueva: la del llamador (p. ej. el estado incremental) queda igual
+        alineados.append(df.assign(**columnas) if columnas else df)
+    return pd.concat(alineados, ignore_index=True)
+
+
+def _analizar_par(instance_name: str, data: Dict, epsilon: float, cant_muestras: int,
+                  con_perfil: Optional[bool] = None, cache: Optional[CacheResultados] = None) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Analiza un par instancia-solución y devuelve su DataFrame (con instance_name e instance_type)
+    junto con el resumen de la instancia (con su perfil en "perfil" si el perfilado está activo).
+    """
+    instance_df, instance_summary = _analisis_con_cache(
+        instance_name, data['instance'], data['solution'], epsilon, cant_muestras, con_perfil=con_perfil, cache=cache
+    )
+
+    # Agregar columnas de instancia y tipo
+    tipo = _tipo_instancia(instance_name)
+    instance_df['instance_name'] = pd.Categorical([instance_name] * len(instance_df), categories=[instance_name])
+    instance_df['instance_type'] = pd.Categorical([tipo] * len(instance_df), categories=[tipo])
+    instance_summary['instance_name'] = instance_name
+    instance_summary['instance_type'] = tipo
+    return instance_df, instance_summary
+
+
+def _analizar_par_aislado(instance_name: str, data: Dict, epsilon: float, cant_muestras: int,
+                          con_perfil: Optional[bool] = None, cache: Optional[CacheResultados] = None) -> Tuple:
+    """
+    _analizar_par con el error capturado, para que una instancia que falla no corte la corrida
+    (ni el pool de procesos). Devuelve (instance_name, instance_df, instance_summary, error).
+    """
+    try:
+        instance_df, instance_summary = _analizar_par(instance_name, data, epsilon, cant_muestras, con_perfil, cache)
+        return instance_name, instance_df, instance_summary, None
+    except Exception as e:
+        return instance_name, None, None, str(e)
+
+
+def _analizar_pares(paired_data: Dict, epsilon: float, cant_muestras: int, workers: int = 1,
+                    con_perfil: Optional[bool] = None, cache: Optional[CacheResultados] = None):
+    """
+    Genera (instance_name, instance_df, instance_summary, error) por cada par, en el orden de paired_data.
+
+    Con workers > 1 los pares se reparten en un ProcessPoolExecutor: a cada proceso se le envía solo
+    el par que analiza, y los resultados que terminan antes de tiempo esperan en un buffer hasta que
+    terminan los anteriores, así la salida es determinística. Cada proceso recibe su copia de cache
+    (comparten el directorio).
+    """
+    # se resuelve acá (y no en cada proceso) para que todos los pares usen el mismo valor
+    con_perfil = perfilado.perfilado_activo() if con_perfil is None else con_perfil
+    if workers <= 1 or len(paired_data) <= 1:
+        for instance_name, data in paired_data.items():
+            yield _analizar_par_aislado(instance_name, data, epsilon, cant_muestras, con_perfil, cache)
+        return
+
+    orden = list(paired_data)
+    pendientes = {}
+    siguiente = 0
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futuros = {
+            executor.submit(_analizar_par_aislado, instance_name, paired_data[instance_name], epsilon, cant_muestras,
+                            con_perfil, cache): instance_name
+            for instance_name in orden
+        }
+        for futuro in as_completed(futuros):
+            try:
+                resultado = futuro.result()
+            except Exception as e:  # el proceso murió (p. ej. sin memoria)
+                resultado = (futuros[futuro], None, None, str(e))
+            pendientes[resultado[0]] = resultado
+            while siguiente < len(orden) and orden[siguiente] in pendientes:
+                yield pendientes.pop(orden[siguiente])
+                siguiente += 1
+    finally:
+        # si se corta la iteración (cancelación), no se arrancan los pares que quedaban en cola
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def correr_analisis_general(paired_data: Dict, epsilon: float = 0.1, cant_muestras: int = 10,
+                            streaming: bool = False, conservar_arcos: bool = True,
+                            workers: int = 1, con_perfil: Optional[bool] = None,
+                            cache: Optional[CacheResultados] = None,
+                            resumen: Optional[ResumenGlobal] = None) -> Tuple[pd.DataFrame, Dict]:
     """
     Ejecuta análisis sobre TODAS las instancias y genera métricas globales.
+
+    recibe:
+        paired_data: salida de process_files
+        epsilon, cant_muestras: parámetros de correr_analisis_instancia
+        streaming: si es True, las métricas globales se agregan instancia por instancia en un
+            ResumenGlobal (resumen_global.py) en lugar de recalcularse sobre global_df.
+            global_metrics tiene las mismas claves que sin streaming, salvo 'agregados'.
+        conservar_arcos: solo en modo streaming; si es False no se arma la tabla completa de arcos
+            y global_df se devuelve vacío.
+        workers: cantidad de procesos; con workers > 1 las instancias se analizan en paralelo.
+            Los resultados se combinan en el orden de paired_data, igual que en la corrida secuencial.
+        con_perfil: perfilar cada instancia (perfilado.py; resumen en global_metrics['rendimiento']).
+            None: según la variable de entorno TDVRP_PERFIL.
+        cache: CacheResultados donde leer y guardar el resultado de cada par (None: sin caché).
+        resumen: solo en modo streaming; ResumenGlobal (vacío) donde se acumulan las instancias, para
+            quien necesite después sus tablas (resumen.datos_comparacion() o datos_comparacion_general).
     
     devuelve:
         Tuple[DataFrame completo, métricas agregadas globales]
     """
     all_results = []
     instance_summaries = []
+    if streaming and resumen is None:
+        resumen = ResumenGlobal()
+    elif not streaming:
+        resumen = None
     
-    for instance_name, data in paired_data.items():
-        try:
-            # Ejecutar análisis por instancia
-            instance_df = correr_analisis_instancia(
-                instance_name=instance_name,
-                instance_data=data['instance'],
-                solution_data=data['solution'],
-                epsilon=epsilon,
-                cant_muestras=cant_muestras
-            )
-            
-            # Agregar columna de instancia
-            instance_df['instance_name'] = instance_name
-            
-            # Determinar tipo de instancia
-            tipo = "RC" if instance_name.startswith("RC") else instance_name[0]
-            instance_df['instance_type'] = tipo
-            
-            # Agregar a resultados globales
+    # Ejecutar análisis por instancia
+    for instance_name, instance_df, instance_summary, error in _analizar_pares(paired_data, epsilon, cant_muestras, workers, con_perfil, cache):
+        if error is not None:
+            print(f"Error procesando {instance_name}: {error}")
+            continue
+
+        if resumen is not None:
+            resumen.actualizar(instance_name, instance_summary['instance_type'], instance_df, instance_summary)
+            if conservar_arcos:
+                all_results.append(instance_df)
+        else:
             all_results.append(instance_df)
-            
-            # Calcular resumen por instancia
-            instance_summary = resumen_metricas(instance_df)
-            instance_summary['instance_name'] = instance_name
-            instance_summary['instance_type'] = tipo
             instance_summaries.append(instance_summary)
-            
-        except Exception as e:
-            print(f"Error procesando {instance_name}: {str(e)}")
-            continue
     
     # Combinar todos los resultados
-    global_df = pd.concat(all_results, ignore_index=True) if all_results else pd.DataFrame()
+    global_df = _concatenar_arcos(all_results, list(paired_data))
     
     # Métricas globales agregadas
-    global_metrics = _calcular_metricas_generales(global_df, instance_summaries)
+    if resumen is not None:
+        global_metrics = resumen.metricas_generales()
+    else:
+        global_metrics = _calcular_metricas_generales(global_df, instance_summaries)
+    if global_metrics and not global_df.empty:
+        global_metrics['memory_report'] = reporte_memoria(global_df)
     
     return global_df, global_metrics
 
+def iterar_analisis_general(paired_data: Dict, epsilon: float = 0.1, cant_muestras: int = 10,
+                            workers: int = 1, estado: Dict = None, con_perfil: Optional[bool] = None,
+                            cache: Optional[CacheResultados] = None):
+    """
+    Versión generadora del análisis global: devuelve el resultado de cada instancia apenas termina,
+    sin esperar al resto, y mantiene los agregados globales al día en un ResumenGlobal.
+
+    recibe:
+        paired_data, epsilon, cant_muestras, workers, con_perfil, cache: igual que en correr_analisis_general
+        estado: estado de actualizar_analisis_general; los pares que no cambiaron desde esa corrida
+            se devuelven primero, con el resultado guardado y sin re-analizarse.
+
+    genera, por cada instancia, un diccionario con:
+        - "instance_name", "instance_df", "instance_summary" (None si hubo error) y "error"
+        - "clave": hash de contenido del par (ver cache_resultados.clave_analisis)
+        - "reutilizada": True si el resultado salió de estado
+        - "procesadas", "total": avance de la corrida
+        - "resumen": ResumenGlobal con las instancias procesadas hasta el momento
+          (metricas_generales() y datos_comparacion() dan los agregados parciales)
+    """
+    anteriores = estado['resultados'] if estado else {}
+    claves = {
+        name: clave_analisis(data['instance'], data['solution'], epsilon, cant_muestras)
+        for name, data in paired_data.items()
+    }
+    cambiados = {
+        name: data for name, data in paired_data.items()
+        if name not in anteriores or anteriores[name][0] != claves[name]
+    }
+    reutilizados = ((name, *anteriores[name][1:], None) for name in paired_data if name not in cambiados)
+
+    resumen = ResumenGlobal()
+    procesadas = 0
+    for reutilizada, pares in ((True, reutilizados), (False, _analizar_pares(cambiados, epsilon, cant_muestras, workers, con_perfil, cache))):
+        for instance_name, instance_df, instance_summary, error in pares:
+            procesadas += 1
+            if error is None:
+                resumen.actualizar(instance_name, instance_summary['instance_type'], instance_df, instance_summary)
+            yield {
+                'instance_name': instance_name,
+                'instance_df': instance_df,
+                'instance_summary': instance_summary,
+                'error': error,
+                'clave': claves[instance_name],
+                'reutilizada': reutilizada,
+                'procesadas': procesadas,
+                'total': len(paired_data),
+                'resumen': resumen,
+            }
+
+
+class AnalisisCancelado(Exception):
+    """
+    El análisis se interrumpió porque la función detener devolvió True.
+    En estado queda lo ya calculado, en el formato del estado de actualizar_analisis_general
+    (se puede pasar como estado a la corrida siguiente para no repetir esas instancias).
+    """
+
+    def __init__(self, mensaje: str, estado: Dict = None):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def actualizar_analisis_general(paired_data: Dict, estado: Dict = None, epsilon: float = 0.1,
+                                cant_muestras: int = 10, workers: int = 1,
+                                al_avanzar: Callable[[Dict], None] = None,
+                                detener: Callable[[], bool] = None,
+                                con_perfil: Optional[bool] = None,
+                                cache: Optional[CacheResultados] = None) -> Tuple[pd.DataFrame, Dict, Dict]:
+    """
+    Versión incremental de correr_analisis_general: compara cada par instancia-solución con la
+    corrida anterior por hash de contenido (ver cache_resultados.clave_analisis), re-analiza solo
+    los pares nuevos o modificados y reutiliza los resultados guardados del resto.
+
+    recibe:
+        paired_data: salida de process_files
+        estado: estado devuelto por la llamada anterior (None en la primera corrida)
+        epsilon, cant_muestras, workers, con_perfil, cache: igual que en correr_analisis_general
+        al_avanzar: función opcional que recibe cada paso de iterar_analisis_general
+            (por ejemplo, para mostrar resultados parciales)
+        detener: función opcional que se consulta después de cada instancia; si devuelve True,
+            se cancelan los pares que quedaban y se lanza AnalisisCancelado, con el estado parcial
+            (las instancias terminadas más las del estado anterior que no se llegaron a revisar)
+
+    devuelve:
+        Tuple[DataFrame completo, métricas agregadas globales, nuevo estado]
+        En el estado, 'recalculadas' tiene los nombres de las instancias que se re-analizaron.
+    """
+    resultados = {}
+    recalculadas = []
+    vistas = set()
+    pasos = iterar_analisis_general(paired_data, epsilon, cant_muestras, workers, estado, con_perfil, cache)
+    try:
+        for paso in pasos:
+            instance_name = paso['instance_name']
+            vistas.add(instance_name)
+            if paso['error'] is not None:
+                print(f"Error procesando {instance_name}: {paso['error']}")
+            else:
+                resultados[instance_name] = (paso['clave'], paso['instance_df'], paso['instance_summary'])
+            if not paso['reutilizada']:
+                recalculadas.append(instance_name)
+            if al_avanzar is not None:
+                al_avanzar(paso)
+            if detener is not None and detener():
+                # los resultados anteriores de los pares sin revisar se conservan: se validan por clave al reusarlos
+                parcial = {name: r for name, r in (estado or {}).get('resultados', {}).items()
+                           if name in paired_data and name not in vistas}
+                parcial.update(resultados)
+                raise AnalisisCancelado(
+                    f"Análisis cancelado con {paso['procesadas']} de {paso['total']} instancias procesadas",
+                    estado={'resultados': parcial, 'recalculadas': recalculadas}
+                )
+    finally:
+        pasos.close()  # cierra el pool de procesos y descarta los pares en cola
+
+    # Combinar en el orden de paired_data (las instancias eliminadas quedan afuera)
+    ordenados = [resultados[name] for name in paired_data if name in resultados]
+    global_df = _concatenar_arcos([df for _, df, _ in ordenados], list(paired_data))
+    global_metrics = _calcular_metricas_generales(global_df, [summary for _, _, summary in ordenados])
+    if global_metrics:
+        global_metrics['memory_report'] = reporte_memoria(global_df)
+
+    return global_df, global_metrics, {'resultados': resultados, 'recalculadas': recalculadas}
+
+COLUMNAS_RATIOS = ['ratio_to_min', 'ratio_to_max', 'ratio_to_min_dist', 'ratio_to_max_dist']
+
+def _agregados_arcos(global_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Una única pasada agrupada sobre global_df: sumas y conteos por (instancia, tipo, ruta) a partir
+    de columnas booleanas precalculadas. De esta tabla (chica: una fila por ruta) salen las métricas
+    globales de _calcular_metricas_generales y todas las tablas de datos_comparacion_general.
+    """
+    decil = global_df['decile_rank'].to_numpy()
+    decil_dist = global_df['decile_rank_distance'].to_numpy()
+    columnas = {
+        'instance_name': global_df['instance_name'],
+        'instance_type': global_df['instance_type'],
+        'route_idx': global_df['route_idx'],
+        'decil': decil.astype(np.int64),
+        'decil_2': decil.astype(np.int64) ** 2,
+        'decil_dist': decil_dist.astype(np.int64),
+        'decil_dist_2': decil_dist.astype(np.int64) ** 2,
+        'optimo': decil <= 2,
+        'optimo_dist': decil_dist <= 2,
+        'cerca_min': (global_df['proximity_category'] == ETIQUETAS_PROXIMIDAD[0]).to_numpy(),
+        'corto': (global_df['longitud arco'] == ETIQUETAS_LONGITUD[0]).to_numpy(),
+        'tiempo': global_df['actual_travel_time'],
+        'arcos_factibles': global_df['num_feasible_arcs'],
+        **{c: global_df[c] for c in COLUMNAS_RATIOS},
+        **{f'hist_decil_{k}': decil == k for k in range(10)},
+        **{f'hist_decil_dist_{k}': decil_dist == k for k in range(10)},
+    }
+    sumas = [c for c in columnas if c not in ('instance_name', 'instance_type', 'route_idx')]
+    aux = pd.DataFrame(columnas)
+    agregados = aux.groupby(['instance_name', 'instance_type', 'route_idx'], observed=True, sort=False).agg(
+        arcos=('decil', 'size'),
+        **{c: (c, 'sum') for c in sumas},
+        **{f'n_{c}': (c, 'count') for c in COLUMNAS_RATIOS},
+    )
+    return agregados
+
+def _agregados_por_instancia(agregados: pd.DataFrame) -> pd.DataFrame:
+    """suma de _agregados_arcos por instancia, con la cantidad de rutas en 'num_routes'"""
+    por_instancia = agregados.groupby(level=['instance_name', 'instance_type'], observed=True, sort=False).sum()
+    por_instancia['num_routes'] = agregados.groupby(level=['instance_name', 'instance_type'], observed=True, sort=False).size()
+    return por_instancia
+
 def _calcular_metricas_generales(global_df: pd.DataFrame, instance_summaries: List[Dict]) -> Dict:
-    """Calcula métricas agregadas a nivel global"""
+    """
+    Calcula métricas agregadas a nivel global.
+    La tabla de agregados (_agregados_arcos) queda en 'agregados' para que datos_comparacion_general la reutilice.
+    Si las instancias traen perfil (perfilado.py), su resumen queda en 'rendimiento'.
+    """
     if global_df.empty:
         return {}
+
+    agregados = _agregados_arcos(global_df)
+    por_instancia = _agregados_por_instancia(agregados)
+    por_tipo = por_instancia.groupby(level='instance_type', observed=True, sort=False).sum()
+    total = por_tipo.sum()
     
     # Métricas por tipo de instancia
     by_type = {}
-    for inst_type in global_df['instance_type'].unique():
-        type_df = global_df[global_df['instance_type'] == inst_type]
+    for inst_type, fila in por_tipo.iterrows():
         by_type[inst_type] = {
-            'total_arcs': len(type_df),
-            'optimal_arcs_pct': (type_df['decile_rank'] <= 2).sum() / len(type_df) * 100,
-            'optimal_arcs_pct_dist': (type_df['decile_rank_distance'] <= 2).sum() / len(type_df) * 100,
-            'avg_decile': type_df['decile_rank'].mean(),
-            'avg_decile_dist': type_df['decile_rank_distance'].mean(),
+            'total_arcs': int(fila['arcos']),
+            'optimal_arcs_pct': fila['optimo'] / fila['arcos'] * 100,
+            'optimal_arcs_pct_dist': fila['optimo_dist'] / fila['arcos'] * 100,
+            'avg_decile': fila['decil'] / fila['arcos'],
+            'avg_decile_dist': fila['decil_dist'] / fila['arcos'],
     
         }
     
-    return {
-        'total_instances': len(set(global_df['instance_name'])),
-        'total_arcs': len(global_df),
-        'total_routes': global_df['route_idx'].nunique(),
-        'global_optimal_pct': (global_df['decile_rank'] <= 2).sum() / len(global_df) * 100,
-        'global_optimal_pct_dist': (global_df['decile_rank_distance'] <= 2).sum() / len(global_df) * 100,
-        'global_avg_decile': global_df['decile_rank'].mean(),
-        'global_avg_decile_dist': global_df['decile_rank_distance'].mean(),
+    global_metrics = {
+        'total_instances': len(por_instancia),
+        'total_arcs': int(total['arcos']),
+        'total_routes': agregados.index.get_level_values('route_idx').nunique(),
+        'global_optimal_pct': total['optimo'] / total['arcos'] * 100,
+        'global_optimal_pct_dist': total['optimo_dist'] / total['arcos'] * 100,
+        'global_avg_decile': total['decil'] / total['arcos'],
+        'global_avg_decile_dist': total['decil_dist'] / total['arcos'],
         'by_instance_type': by_type,
-        'instance_summaries': instance_summaries
+        'instance_summaries': instance_summaries,
+        'agregados': agregados
     }
+    rendimiento = perfilado.resumen_rendimiento(instance_summaries)
+    if rendimiento is not None:
+        global_metrics['rendimiento'] = rendimiento
+    return global_metrics
+
+def datos_comparacion_general(global_df: pd.DataFrame, resumen: ResumenGlobal = None,
+                              agregados: pd.DataFrame = None) -> Dict[str, pd.DataFrame]:
+    """
+    Prepara datos para gráficos comparativos globales.
+    Si se pasa el ResumenGlobal de una corrida en modo streaming, las tablas salen de él y global_df no se usa.
+    Todas las tablas salen de una misma pasada agrupada (_agregados_arcos); si ya se calculó en
+    _calcular_metricas_generales, se puede pasar global_metrics['agregados'] para no repetirla.
+    """
+    if resumen is not None:
+        return resumen.datos_comparacion()
+
+    if agregados is None:
+        agregados = _agregados_arcos(global_df)
+    por_instancia = _agregados_por_instancia(agregados)
+    por_tipo = por_instancia.groupby(level='instance_type', observed=True).sum()
+    por_tipo.index = por_tipo.index.astype(str)
+
+    def _deciles_por_tipo(prefijo: str, columna: str) -> pd.DataFrame:
+        conteos = por_tipo[[f'{prefijo}_{k}' for k in range(10)]].to_numpy()
+        tipos, deciles = np.nonzero(conteos)
+        return pd.DataFrame({
+            'instance_type': por_tipo.index[tipos],
+            columna: deciles,
+            'count': conteos[tipos, deciles],
+            'percentage': conteos[tipos, deciles] / conteos.sum(axis=1)[tipos] * 100
+        })
 
-def datos_comparacion_general(global_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
-    """Prepara datos para gráficos comparativos globales"""
-    
     # 1. Deciles por tipo de instancia
-    deciles_by_type = global_df.groupby(['instance_type', 'decile_rank']).size().reset_index(name='count')
-    deciles_by_type['percentage'] = deciles_by_type.groupby('instance_type')['count'].transform(lambda x: x / x.sum() * 100)
+    deciles_by_type = _deciles_por_tipo('hist_decil', 'decile_rank')
     
     # 2. Deciles de distancia por tipo
-    deciles_dist_by_type = global_df.groupby(['instance_type', 'decile_rank_distance']).size().reset_index(name='count')
-    deciles_dist_by_type['percentage'] = deciles_dist_by_type.groupby('instance_type')['count'].transform(lambda x: x / x.sum() * 100)
+    deciles_dist_by_type = _deciles_por_tipo('hist_decil_dist', 'decile_rank_distance')
     
     # 3. Resumen por instancia individual
-    instance_summary = global_df.groupby('instance_name').agg({
-        'decile_rank': ['mean', 'std'],
-        'decile_rank_distance': ['mean', 'std'],
-        'proximity_category': lambda x: (x == 'mas cerca del min').sum() / len(x) * 100,
-        'longitud arco': lambda x: (x == 'arco corto').sum() / len(x) * 100,
-        'route_idx': 'nunique',
-        'actual_travel_time': 'sum'
-    }).round(2)
-    
-    instance_summary.columns = ['avg_decile_time', 'std_decile_time', 'avg_decile_dist', 'std_decile_dist', 
-                               'near_min_pct', 'short_arcs_pct', 'num_routes', 'total_time']
-    instance_summary = instance_summary.reset_index()
+    n = por_instancia['arcos']
+    instance_summary = pd.DataFrame({
+        'instance_name': por_instancia.index.get_level_values('instance_name').astype(str),
+        'avg_decile_time': por_instancia['decil'] / n,
+        'std_decile_time': _desvio(por_instancia['decil'], por_instancia['decil_2'], n),
+        'avg_decile_dist': por_instancia['decil_dist'] / n,
+        'std_decile_dist': _desvio(por_instancia['decil_dist'], por_instancia['decil_dist_2'], n),
+        'near_min_pct': por_instancia['cerca_min'] / n * 100,
+        'short_arcs_pct': por_instancia['corto'] / n * 100,
+        'num_routes': por_instancia['num_routes'],
+        'total_time': por_instancia['tiempo'],
+    }).reset_index(drop=True).round(2).sort_values('instance_name').reset_index(drop=True)
     
     # 4. Comparación de ratios por tipo
-    ratios_by_type = global_df.groupby('instance_type').agg({
-        'ratio_to_min': 'mean',
-        'ratio_to_max': 'mean',
-        'ratio_to_min_dist': 'mean',
-        'ratio_to_max_dist': 'mean',
-        'num_feasible_arcs': 'mean'
-    }).round(3).reset_index()
+    ratios_by_type = pd.DataFrame({
+        'instance_type': por_tipo.index,
+        **{c: por_tipo[c] / por_tipo[f'n_{c}'] for c in COLUMNAS_RATIOS},
+        'num_feasible_arcs': por_tipo['arcos_factibles'] / por_tipo['arcos'],
+    }).round(3).reset_index(drop=True)
     
     return {
         'deciles_by_type': deciles_by_type,
@@ -508,43 +882,219 @@ def datos_comparacion_general(global_df: pd.DataFrame) -> Dict[str, pd.DataFrame
         'ratios_by_type': ratios_by_type
     }
 
+def _desvio(suma: pd.Series, suma_cuadrados: pd.Series, n: pd.Series) -> pd.Series:
+    """desvío estándar muestral (como Series.std) a partir de sumas; NaN con un solo valor"""
+    var = (suma_cuadrados - suma ** 2 / n) / (n - 1)
+    return np.sqrt(var.clip(lower=0)).where(n > 1)
+
+def tablas_analisis_general(global_df: pd.DataFrame, global_metrics: Dict, comparison_data: Dict,
+                             incluir_arcos: bool = True) -> Dict[str, pd.DataFrame]:
+    """
+    Tablas lógicas del análisis global (las mismas que las hojas del Excel).
+    Con incluir_arcos=False se omite la tabla de todos los arcos.
+    """
+    tablas = {}
+    if incluir_arcos:
+        tablas['Todos_los_Arcos'] = global_df
+
+    tablas['Resumen_Global'] = pd.DataFrame([{
+        'Total_Instancias': global_metrics['total_instances'],
+        'Total_Arcos': global_metrics['total_arcs'],
+        'Total_Rutas': global_metrics['total_routes'],
+        'Pct_Optimos_Tiempo': global_metrics['global_optimal_pct'],
+        'Pct_Optimos_Distancia': global_metrics['global_optimal_pct_dist'],
+        'Decil_Promedio_Tiempo': global_metrics['global_avg_decile'],
+        'Decil_Promedio_Distancia': global_metrics['global_avg_decile_dist']
+    }])
+    tablas['Resumen_por_Tipo'] = pd.DataFrame([
+        {'Tipo_Instancia': inst_type, **metrics}
+        for inst_type, metrics in global_metrics['by_instance_type'].items()
+    ])
+    tablas['Resumen_por_Instancia'] = comparison_data['instance_summary']
+    tablas['Deciles_por_Tipo'] = comparison_data['deciles_by_type']
+    tablas['Deciles_Dist_por_Tipo'] = comparison_data['deciles_dist_by_type']
+    tablas['Ratios_por_Tipo'] = comparison_data['ratios_by_type']
+    return tablas
+
 def export_general_analysis_excel(global_df: pd.DataFrame, global_metrics: Dict, 
-                                comparison_data: Dict, output_path: str = "analisis_global_completo.xlsx"):
-    """Exporta análisis global completo a Excel"""
+                                comparison_data: Dict, output_path: str = "analisis_global_completo.xlsx",
+                                solo_resumen: bool = False, streaming: bool = False):
+    """
+    Exporta análisis global completo a Excel.
+    Con solo_resumen=True no se escribe la hoja Todos_los_Arcos (ver export_general_analysis_columnar).
+    Con streaming=True se usa EscritorExcelStreaming: las filas se escriben por bloques sin armar
+    el libro en memoria y la hoja de arcos se parte si supera el límite de filas de Excel.
+    """
+    tablas = tablas_analisis_general(global_df, global_metrics, comparison_data, not solo_resumen)
+    if streaming:
+        with EscritorExcelStreaming(output_path) as escritor:
+            for nombre, tabla in tablas.items():
+                escritor.agregar_tabla(nombre, tabla)
+        return
+
     with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        # Hoja 1: Datos completos de todos los arcos
-        global_df.to_excel(writer, sheet_name='Todos_los_Arcos', index=False)
-        
-        # Hoja 2: Resumen global
-        global_summary_df = pd.DataFrame([{
-            'Total_Instancias': global_metrics['total_instances'],
-            'Total_Arcos': global_metrics['total_arcs'],
-            'Total_Rutas': global_metrics['total_routes'],
-            'Pct_Optimos_Tiempo': global_metrics['global_optimal_pct'],
-            'Pct_Optimos_Distancia': global_metrics['global_optimal_pct_dist'],
-            'Decil_Promedio_Tiempo': global_metrics['global_avg_decile'],
-            'Decil_Promedio_Distancia': global_metrics['global_avg_decile_dist']
-        }])
-        global_summary_df.to_excel(writer, sheet_name='Resumen_Global', index=False)
-        
-        # Hoja 3: Resumen por tipo de instancia
-        type_summary_list = []
-        for inst_type, metrics in global_metrics['by_instance_type'].items():
-            type_summary_list.append({
-                'Tipo_Instancia': inst_type,
-                **metrics
-            })
-        type_summary_df = pd.DataFrame(type_summary_list)
-        type_summary_df.to_excel(writer, sheet_name='Resumen_por_Tipo', index=False)
-        
-        # Hoja 4: Resumen por instancia individual
-        comparison_data['instance_summary'].to_excel(writer, sheet_name='Resumen_por_Instancia', index=False)
-        
-        # Hoja 5: Distribución de deciles por tipo
-        comparison_data['deciles_by_type'].to_excel(writer, sheet_name='Deciles_por_Tipo', index=False)
-        
-        # Hoja 6: Distribución de deciles de distancia por tipo
-        comparison_data['deciles_dist_by_type'].to_excel(writer, sheet_name='Deciles_Dist_por_Tipo', index=False)
-        
-        # Hoja 7: Ratios por tipo
-        comparison_data['ratios_by_type'].to_excel(writer, sheet_name='Ratios_por_Tipo', index=False)
\ No newline at end of file
+        for nombre, tabla in tablas.items():
+            tabla.to_excel(writer, sheet_name=nombre, index=False)
+
+
+# ============= EXCEL EN STREAMING (WRITE-ONLY) =============
+
+MAX_FILAS_EXCEL = 1_048_576
+FILAS_POR_BLOQUE = 10_000
+
+class EscritorExcelStreaming:
+    """
+    Escribe un Excel con un libro write-only de openpyxl: las filas van a disco a medida que se
+    agregan, así que la memoria no crece con la cantidad de filas. Las hojas se escriben en el
+    orden en que se crean y una hoja que supera el límite de filas de Excel sigue en otra
+    (Todos_los_Arcos, Todos_los_Arcos_2, ...).
+
+    Uso:
+        with EscritorExcelStreaming("salida.xlsx") as escritor:
+            escritor.agregar_filas('Todos_los_Arcos', instance_df)   # una vez por instancia
+            escritor.agregar_tabla('Resumen_Global', resumen_df)
+    """
+
+    def __init__(self, output_path, max_filas: int = MAX_FILAS_EXCEL):
+        from openpyxl import Workbook
+
+        self.output_path = output_path
+        self.max_filas = max_filas
+        self.libro = Workbook(write_only=True)
+        self.hojas = {}  # nombre base -> [hoja actual, filas escritas, partes, columnas]
+
+    def _nueva_hoja(self, nombre: str, columnas: List[str], partes: int):
+        titulo = nombre if partes == 1 else f"{nombre}_{partes}"
+        hoja = self.libro.create_sheet(title=titulo[:31])
+        hoja.append(columnas)
+        self.hojas[nombre] = [hoja, 1, partes, columnas]
+
+    def agregar_filas(self, nombre: str, df: pd.DataFrame) -> None:
+        """agrega las filas de df al final de la hoja nombre (la crea con el encabezado si no existe)"""
+        if nombre not in self.hojas:
+            self._nueva_hoja(nombre, [str(c) for c in df.columns], 1)
+        for inicio in range(0, len(df), FILAS_POR_BLOQUE):
+            bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+            bloque = bloque.astype(object).where(bloque.notna(), None)
+            for fila in bloque.itertuples(index=False, name=None):
+                hoja, filas, partes, columnas = self.hojas[nombre]
+                if filas >= self.max_filas:
+                    self._nueva_hoja(nombre, columnas, partes + 1)
+                    hoja = self.hojas[nombre][0]
+                hoja.append(fila)
+                self.hojas[nombre][1] += 1
+
+    def agregar_tabla(self, nombre: str, df: pd.DataFrame) -> None:
+        """escribe una tabla completa en su propia hoja"""
+        self.agregar_filas(nombre, df)
+
+    def cerrar(self) -> None:
+        self.libro.save(self.output_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.cerrar()
+        return False
+
+
+def export_general_analysis_excel_streaming(paired_data: Dict, output_path: str = "analisis_global_completo.xlsx",
+                                            epsilon: float = 0.1, cant_muestras: int = 10,
+                                            workers: int = 1, cache: Optional[CacheResultados] = None) -> Dict:
+    """
+    Corre el análisis global y escribe el mismo Excel que export_general_analysis_excel sin armar
+    global_df: las filas de Todos_los_Arcos se escriben a medida que termina cada instancia y las
+    hojas de resumen salen del ResumenGlobal al final. La memoria del export no depende de la
+    cantidad de instancias. epsilon, cant_muestras, workers y cache: igual que en correr_analisis_general.
+    Si ninguna instancia se pudo analizar se lanza ValueError y no se escribe el archivo.
+
+    devuelve:
+        métricas agregadas globales (como en correr_analisis_general en modo streaming)
+    """
+    resumen = ResumenGlobal()
+    with EscritorExcelStreaming(output_path) as escritor:
+        for paso in iterar_analisis_general(paired_data, epsilon, cant_muestras, workers, cache=cache):
+            if paso['error'] is not None:
+                print(f"Error procesando {paso['instance_name']}: {paso['error']}")
+                continue
+            escritor.agregar_filas('Todos_los_Arcos', paso['instance_df'])
+            resumen = paso['resumen']
+
+        global_metrics = resumen.metricas_generales()
+        if not global_metrics:
+            # al salir del with con la excepción el libro no se guarda (quedaría sin hojas)
+            raise ValueError(f"Ninguna de las {len(paired_data)} instancias se pudo analizar: no hay nada para exportar")
+        comparison_data = resumen.datos_comparacion()
+        for nombre, tabla in tablas_analisis_general(None, global_metrics, comparison_data, incluir_arcos=False).items():
+            escritor.agregar_tabla(nombre, tabla)
+    return global_metrics
+
+
+# ============= EXPORTACIÓN COLUMNAR (PARQUET / ARROW) =============
+
+FORMATOS_COLUMNARES = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+def tabla_arrow(df: pd.DataFrame):
+    """
+    Convierte un DataFrame a una tabla de pyarrow con las columnas de texto codificadas como
+    diccionario (las etiquetas y nombres de instancia se repiten en todas las filas).
+    """
+    import pyarrow as pa
+
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    for i, campo in enumerate(tabla.schema):
+        if pa.types.is_string(campo.type) or pa.types.is_large_string(campo.type):
+            tabla = tabla.set_column(i, campo.name, tabla.column(i).dictionary_encode())
+    return tabla
+
+def escribir_tabla_columnar(df: pd.DataFrame, destino, formato: str = 'parquet') -> None:
+    """
+    Escribe un DataFrame como Parquet o Arrow IPC (formato 'parquet' o 'arrow').
+    destino puede ser una ruta o un archivo binario abierto.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if formato not in FORMATOS_COLUMNARES:
+        raise ValueError(f"Formato desconocido: {formato} (opciones: {', '.join(FORMATOS_COLUMNARES)})")
+    tabla = tabla_arrow(df)
+    if formato == 'parquet':
+        pq.write_table(tabla, destino)
+    else:
+        with pa.ipc.new_file(destino, tabla.schema) as writer:
+            writer.write_table(tabla)
+
+def export_tablas_columnar(tablas: Dict[str, pd.DataFrame], output_dir: str, formato: str = 'parquet') -> Dict[str, str]:
+    """
+    Escribe cada tabla en output_dir/<nombre>.<formato>. Devuelve {nombre: ruta}.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rutas = {}
+    for nombre, tabla in tablas.items():
+        rutas[nombre] = os.path.join(output_dir, nombre + FORMATOS_COLUMNARES[formato])
+        escribir_tabla_columnar(tabla, rutas[nombre], formato)
+    return rutas
+
+def tablas_columnar_zip(tablas: Dict[str, pd.DataFrame], formato: str = 'parquet') -> bytes:
+    """
+    Las tablas en formato columnar dentro de un ZIP en memoria (para descargar desde la app).
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+        for nombre, tabla in tablas.items():
+            archivo = io.BytesIO()
+            escribir_tabla_columnar(tabla, archivo, formato)
+            zf.writestr(nombre + FORMATOS_COLUMNARES[formato], archivo.getvalue())
+    return buffer.getvalue()
+
+def export_results_columnar(analysis_df: pd.DataFrame, summary_metrics: Dict,
+                            output_dir: str = "resultados_analisis", formato: str = 'parquet') -> Dict[str, str]:
+    """Exporta las tablas de export_results_to_excel como archivos Parquet/Arrow en output_dir"""
+    return export_tablas_columnar(tablas_resultados(analysis_df, summary_metrics), output_dir, formato)
+
+def export_general_analysis_columnar(global_df: pd.DataFrame, global_metrics: Dict, comparison_data: Dict,
+                                     output_dir: str = "analisis_global_completo", formato: str = 'parquet') -> Dict[str, str]:
+    """Exporta las tablas de export_general_analysis_excel como archivos Parquet/Arrow en output_dir"""
+    return export_tablas_columnar(tablas_analisis_general(global_df, global_metrics, comparison_data), output_dir, formato)
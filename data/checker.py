@@ -1,8 +1,10 @@
-import sys, os, json, datetime, os, argparse
+import sys, os, json, datetime, os, argparse, time
+from concurrent.futures import ProcessPoolExecutor
 
 CHECKER_DIR = os.path.abspath(os.path.dirname(__file__)) # Directory where checker files are located.
 CURRENT_DIR = os.path.abspath(os.getcwd()) # Current directory in the command line.
 INSTANCES_DIR = os.path.abspath(os.path.join(CHECKER_DIR, "..", "instances")) # Directory where datasets are stored.
+APP_DIR = os.path.abspath(os.path.join(CHECKER_DIR, "..", "app")) # Analyzer code (shared travel-time engine for --batch).
 
 # Util functions
 # Returns: JSON content of the file at the specified path.
@@ -23,17 +25,6 @@ INFTY = 10e8; EPS = 10e-6
 def epsilon_equal(a, b): return abs(a - b) < EPS
 def epsilon_bigger(a, b): return a > b + EPS
 
-# Set command line parameters.
-arg_parser = argparse.ArgumentParser(description="Check if the solutions in the output file are correct.")
-arg_parser.add_argument("output_files", metavar="OUT_FILE", help="JSON output file(s) to run the checker on.", type=argparse.FileType('r'), nargs='+')
-
-# Read command line parameters.
-args = vars(arg_parser.parse_args())
-output_files = args["output_files"]
-
-# Show parameters.
-print(blue(F"Output files: {[e.name for e in output_files]}"))
-
 instance_cache = {}
 
 def read_instance(dataset_name, instance_name):
@@ -121,7 +112,122 @@ def check_routes(instance, solution, error_messages):
 			valid = False
 	return valid
 
-def main():
+# Batched mode.
+# Instances are turned once into a shared numpy context (see app/simulacion.py) and all the routes of
+# an output are checked together: capacity with prefix sums of the demands, time windows with one
+# lockstep simulation of every route (non-cyclic travel times, as travel_time above).
+context_cache = {}
+solutions_cache = {}
+
+def read_instance_context(dataset_name, instance_name):
+	from simulacion import contexto_instancia
+	key = (dataset_name, instance_name)
+	if not key in context_cache:
+		context_cache[key] = contexto_instancia(read_instance(dataset_name, instance_name))
+	return context_cache[key]
+
+# Returns: the best known solution, reading the solutions file of the dataset only once.
+def best_known_solution_cached(dataset_name, instance_name):
+	if not dataset_name in solutions_cache:
+		solutions_cache[dataset_name] = {}
+		for s in read_json_from_file(F"{dataset_name}/solutions.json"):
+			bks = solutions_cache[dataset_name].get(s["instance_name"], {"value":10e8})
+			if s["value"] <= bks["value"]: solutions_cache[dataset_name][s["instance_name"]] = s
+	return solutions_cache[dataset_name].get(instance_name, {"value":10e8})
+
+# Returns: true if the routes are valid (same checks and messages as check_routes).
+def check_routes_batch(ctx, solution, error_messages):
+	import numpy as np
+	from simulacion import avanzar_rutas, matriz_rutas
+	if not solution: return True
+	paths = [route["path"] for route in solution]
+	t0 = np.array([route["t0"] for route in solution], dtype=float)
+	M, lengths = matriz_rutas(paths)
+	valid_pos = M >= 0
+	a, b, s = ctx["tw"][:, 0], ctx["tw"][:, 1], ctx["st"]
+
+	# Path elementarity: no repeated vertex in the padded and sorted rows.
+	S = np.sort(np.where(valid_pos, M, -np.arange(1, M.shape[1] + 1)), axis=1)
+	elementary = ~(S[:, 1:] == S[:, :-1]).any(axis=1)
+
+	# Capacity: the cumulative demand along the route never exceeds Q.
+	load = np.cumsum(np.where(valid_pos, ctx["q"][M], 0.0), axis=1)
+	capacity_ok = (load <= ctx["Q"] + EPS).all(axis=1)
+
+	# Time windows: arrival at every vertex after the first before its deadline.
+	sim = avanzar_rutas(ctx, paths, t0, ciclico=False)
+	arrival = sim["arrival"]
+	deadline = np.where(valid_pos[:, 1:], b[M[:, 1:]], np.inf)
+	windows_ok = ~(arrival > deadline + EPS).any(axis=1)
+	finite = np.isfinite(sim["fin"])
+
+	last = M[np.arange(len(paths)), lengths - 1]
+	tf = np.maximum(sim["fin"], a[last]) + s[last]
+	expected_duration = tf - t0
+
+	valid = True
+	for r, route in enumerate(solution):
+		if not (elementary[r] and capacity_ok[r] and windows_ok[r] and finite[r]):
+			error_messages.append(F"\tInfeasible: {route}")
+			valid = False
+		elif not epsilon_equal(expected_duration[r], route["duration"]):
+			error_messages.append(F"\tDifferent duration: {route} - Expected: {expected_duration[r]}")
+			valid = False
+	return valid
+
+# Returns: counters, console lines and number of routes for one output file (runs in a worker process).
+def check_file_batch(file_name):
+	if not APP_DIR in sys.path: sys.path.insert(0, APP_DIR)
+	counts = {"ok": 0, "wrong": 0, "suboptimal": 0}
+	lines = [F"Checking {file_name}"]
+	routes = 0
+	for output in read_json_from_file(file_name):
+		instance_name = output["instance_name"]
+		dataset_name = "instancias-dabia_et_al_2013"
+		ctx = read_instance_context(dataset_name, instance_name)
+		bks = best_known_solution_cached(dataset_name, instance_name)
+
+		status = output["tags"]
+		opt_found = status == "OPT" or status == "Finished" # Indicates if the optimum solution was found.
+
+		solution = output["routes"]
+		routes += len(solution)
+		errors = []
+		valid = check_routes_batch(ctx, solution, errors)
+		if not valid:
+			lines.append(F"Checking - {dataset_name} {instance_name}")
+			lines.extend(red(error) for error in errors)
+			counts["wrong"] += 1
+		elif opt_found and epsilon_bigger(output["value"], bks["value"]):
+			counts["suboptimal"] += 1
+			lines.append(F"Checking - {dataset_name} {instance_name}")
+			lines.append(blue(F"Suboptimal - BKS: {bks} - Obtained: {solution}"))
+		else:
+			counts["ok"] += 1
+	return counts, lines, routes
+
+def main_batch(output_files, workers=1):
+	file_names = [output_file.name for output_file in output_files]
+	for output_file in output_files: output_file.close()
+	totals = {"ok": 0, "wrong": 0, "suboptimal": 0}
+	routes = 0
+	start = time.perf_counter()
+	if workers > 1 and len(file_names) > 1:
+		with ProcessPoolExecutor(max_workers=workers) as executor:
+			results = list(executor.map(check_file_batch, file_names))
+	else:
+		results = [check_file_batch(file_name) for file_name in file_names]
+	elapsed = time.perf_counter() - start
+
+	for counts, lines, file_routes in results:
+		for line in lines: print(line)
+		for key in totals: totals[key] += counts[key]
+		routes += file_routes
+
+	print(green(F"ok: {totals['ok']}"), red(F"wrong: {totals['wrong']}"), blue(F"suboptimal: {totals['suboptimal']}"), purple(F"skipped: 0"), purple(F"memlim: 0"), purple(F"error: 0"))
+	print(purple(F"Checked {routes} routes in {elapsed:.3f}s ({routes / elapsed if elapsed > 0 else 0:.0f} routes/s, {min(workers, len(file_names))} worker(s))"))
+
+def main_default(output_files):
 	ok = 0
 	wrong = 0
 	suboptimal = 0
@@ -160,5 +266,21 @@ def main():
 
 	print(green(F"ok: {ok}"), red(F"wrong: {wrong}"), blue(F"suboptimal: {suboptimal}"), purple(F"skipped: {skip}"), purple(F"memlim: {mlim}"), purple(F"error: {error}"))
 
+def main():
+	# Set command line parameters.
+	arg_parser = argparse.ArgumentParser(description="Check if the solutions in the output file are correct.")
+	arg_parser.add_argument("output_files", metavar="OUT_FILE", help="JSON output file(s) to run the checker on.", type=argparse.FileType('r'), nargs='+')
+	arg_parser.add_argument("--batch", action="store_true", help="Check all routes of each instance in one vectorized pass using the analyzer's travel-time engine.")
+	arg_parser.add_argument("--workers", type=int, default=1, help="Worker processes used to check output files in parallel (only with --batch).")
+
+	# Read command line parameters.
+	args = vars(arg_parser.parse_args())
+	output_files = args["output_files"]
+
+	# Show parameters.
+	print(blue(F"Output files: {[e.name for e in output_files]}"))
+
+	main_batch(output_files, args["workers"]) if args["batch"] else main_default(output_files)
+
 if __name__== "__main__":
   main()
\ No newline at end of file
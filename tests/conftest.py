@@ -0,0 +1,44 @@
+"""
+Configuración común de los tests: los módulos de app/ se importan planos (como en la app y los CLI)
+y los pares instancia-solución se leen de data/.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'app'))
+
+DIRECTORIO_INSTANCIAS = os.path.join(RAIZ, 'data', 'instancias-dabia_et_al_2013')
+ARCHIVO_SOLUCIONES = os.path.join(RAIZ, 'data', 'solutions.json')
+
+# instancias chicas de las tres familias
+INSTANCIAS = ['C101_25', 'R101_25', 'RC201_25', 'C205_25']
+
+
+@pytest.fixture(scope='session')
+def soluciones():
+    with open(ARCHIVO_SOLUCIONES) as f:
+        return {s['instance_name']: s for s in json.load(f)}
+
+
+@pytest.fixture(scope='session')
+def cargar_par(soluciones):
+    '''devuelve una función nombre -> (instance_data, solution_data)'''
+    def cargar(nombre):
+        with open(os.path.join(DIRECTORIO_INSTANCIAS, f'{nombre}.json')) as f:
+            return json.load(f), soluciones[nombre]
+    return cargar
+
+
+@pytest.fixture(scope='session')
+def paired_data(cargar_par):
+    '''pares como los arma process_files, para INSTANCIAS'''
+    pares = {}
+    for nombre in INSTANCIAS:
+        instance_data, solution_data = cargar_par(nombre)
+        pares[nombre] = {'instance': instance_data, 'solution': solution_data}
+    return pares
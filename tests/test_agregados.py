@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+import tdvrp_analyzer as core
+
+
+def _metricas_referencia(global_df):
+    '''las métricas globales con un filtro/groupby por métrica, sin la pasada agrupada'''
+    by_type = {}
+    for inst_type in global_df['instance_type'].unique():
+        type_df = global_df[global_df['instance_type'] == inst_type]
+        by_type[inst_type] = {
+            'total_arcs': len(type_df),
+            'optimal_arcs_pct': (type_df['decile_rank'] <= 2).sum() / len(type_df) * 100,
+            'optimal_arcs_pct_dist': (type_df['decile_rank_distance'] <= 2).sum() / len(type_df) * 100,
+            'avg_decile': type_df['decile_rank'].mean(),
+            'avg_decile_dist': type_df['decile_rank_distance'].mean(),
+        }
+    return {
+        'total_instances': global_df['instance_name'].nunique(),
+        'total_arcs': len(global_df),
+        'total_routes': global_df['route_idx'].nunique(),
+        'global_optimal_pct': (global_df['decile_rank'] <= 2).sum() / len(global_df) * 100,
+        'global_optimal_pct_dist': (global_df['decile_rank_distance'] <= 2).sum() / len(global_df) * 100,
+        'global_avg_decile': global_df['decile_rank'].mean(),
+        'global_avg_decile_dist': global_df['decile_rank_distance'].mean(),
+        'by_instance_type': by_type,
+    }
+
+
+def _comparacion_referencia(global_df):
+    df = global_df.assign(instance_type=global_df['instance_type'].astype(str),
+                          instance_name=global_df['instance_name'].astype(str))
+
+    def deciles(columna):
+        t = df.groupby(['instance_type', columna]).size().reset_index(name='count')
+        t['percentage'] = t.groupby('instance_type')['count'].transform(lambda x: x / x.sum() * 100)
+        return t
+
+    instance_summary = df.groupby('instance_name').agg({
+        'decile_rank': ['mean', 'std'],
+        'decile_rank_distance': ['mean', 'std'],
+        'proximity_category': lambda x: (x == 'mas cerca del min').sum() / len(x) * 100,
+        'longitud arco': lambda x: (x == 'arco corto').sum() / len(x) * 100,
+        'route_idx': 'nunique',
+        'actual_travel_time': 'sum'
+    }).round(2)
+    instance_summary.columns = ['avg_decile_time', 'std_decile_time', 'avg_decile_dist', 'std_decile_dist',
+                                'near_min_pct', 'short_arcs_pct', 'num_routes', 'total_time']
+
+    ratios_by_type = df.groupby('instance_type').agg({
+        'ratio_to_min': 'mean', 'ratio_to_max': 'mean', 'ratio_to_min_dist': 'mean',
+        'ratio_to_max_dist': 'mean', 'num_feasible_arcs': 'mean'
+    }).round(3).reset_index()
+
+    return {
+        'deciles_by_type': deciles('decile_rank'),
+        'deciles_dist_by_type': deciles('decile_rank_distance'),
+        'instance_summary': instance_summary.reset_index(),
+        'ratios_by_type': ratios_by_type,
+    }
+
+
+@pytest.fixture(scope='module')
+def analisis(paired_data):
+    return core.correr_analisis_general(paired_data)
+
+
+def test_metricas_generales_igual_a_filtrar(analisis):
+    global_df, global_metrics = analisis
+    esperadas = _metricas_referencia(global_df)
+
+    for clave, valor in esperadas.items():
+        if clave != 'by_instance_type':
+            assert global_metrics[clave] == pytest.approx(valor), clave
+    assert set(global_metrics['by_instance_type']) == set(esperadas['by_instance_type'])
+    for tipo, metricas in esperadas['by_instance_type'].items():
+        assert global_metrics['by_instance_type'][tipo] == pytest.approx(metricas), tipo
+
+
+@pytest.mark.parametrize('reutilizar', [False, True])
+def test_comparacion_igual_a_groupby(analisis, reutilizar):
+    global_df, global_metrics = analisis
+    agregados = global_metrics['agregados'] if reutilizar else None
+    obtenidas = core.datos_comparacion_general(global_df, agregados=agregados)
+    esperadas = _comparacion_referencia(global_df)
+
+    assert set(obtenidas) == set(esperadas)
+    for nombre, tabla in esperadas.items():
+        pd.testing.assert_frame_equal(obtenidas[nombre].reset_index(drop=True), tabla, check_dtype=False,
+                                      check_index_type=False, check_column_type=False, obj=nombre)
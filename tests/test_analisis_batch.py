@@ -0,0 +1,85 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import analisis_batch
+import tdvrp_analyzer as core
+from conftest import DIRECTORIO_INSTANCIAS, INSTANCIAS
+
+
+@pytest.fixture(scope='module')
+def entrada(tmp_path_factory, soluciones):
+    '''directorio con las INSTANCIAS y un solutions.json con sus soluciones'''
+    base = tmp_path_factory.mktemp('entrada')
+    instancias = base / 'instancias'
+    instancias.mkdir()
+    for nombre in INSTANCIAS:
+        shutil.copy(os.path.join(DIRECTORIO_INSTANCIAS, f'{nombre}.json'), instancias)
+    with open(base / 'solutions.json', 'w') as f:
+        json.dump([soluciones[n] for n in INSTANCIAS], f)
+    return str(instancias), str(base / 'solutions.json')
+
+
+@pytest.fixture(scope='module')
+def directo(entrada):
+    return core.correr_analisis_general(core.cargar_pares(*entrada))
+
+
+def _comparar_arcos(leidos, global_df):
+    esperados = global_df.astype({'instance_name': str, 'instance_type': str,
+                                  'proximity_category': str, 'longitud arco': str})
+    leidos = leidos.astype({c: str for c in ('instance_name', 'instance_type', 'proximity_category', 'longitud arco')})
+    pd.testing.assert_frame_equal(leidos[list(esperados.columns)], esperados, check_dtype=False)
+
+
+@pytest.mark.parametrize('formato', ['parquet', 'arrow', 'csv'])
+def test_cli_escribe_los_arcos_y_los_resumenes(tmp_path, entrada, directo, formato):
+    salida = str(tmp_path / 'salida')
+    assert analisis_batch.main([*entrada, '--salida', salida, '--formato', formato, '--workers', '2',
+                                '--silencioso']) == 0
+
+    global_df, global_metrics = directo
+    if formato == 'parquet':
+        leidos = pq.read_table(os.path.join(salida, 'Todos_los_Arcos.parquet')).to_pandas()
+    elif formato == 'arrow':
+        leidos = pa.ipc.open_stream(os.path.join(salida, 'Todos_los_Arcos.arrows')).read_all().to_pandas()
+    else:
+        leidos = pd.read_csv(os.path.join(salida, 'Todos_los_Arcos.csv'))
+    _comparar_arcos(leidos, global_df)
+
+    extension = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv'}[formato]
+    archivo = os.path.join(salida, 'Resumen_Global' + extension)
+    if formato == 'csv':
+        resumen = pd.read_csv(archivo)
+    elif formato == 'parquet':
+        resumen = pq.read_table(archivo).to_pandas()
+    else:
+        resumen = pa.ipc.open_file(archivo).read_all().to_pandas()
+    assert resumen.loc[0, 'Total_Arcos'] == global_metrics['total_arcs']
+    assert resumen.loc[0, 'Pct_Optimos_Tiempo'] == pytest.approx(global_metrics['global_optimal_pct'])
+
+
+def test_cli_con_corrida_reanuda(tmp_path, entrada, directo):
+    salida, corrida = str(tmp_path / 'salida'), str(tmp_path / 'corrida')
+    argumentos = [*entrada, '--salida', salida, '--corrida', corrida, '--workers', '1', '--silencioso']
+    assert analisis_batch.main(argumentos) == 0
+    # la segunda vez la corrida ya está completa: solo se vuelve a exportar desde disco
+    assert analisis_batch.main(argumentos) == 0
+
+    _comparar_arcos(pq.read_table(os.path.join(salida, 'Todos_los_Arcos.parquet')).to_pandas(), directo[0])
+
+
+def test_cli_cuenta_las_instancias_con_error(tmp_path, entrada, soluciones):
+    instancias, _ = entrada
+    rotas = [dict(soluciones[n], routes=[]) if n == INSTANCIAS[0] else soluciones[n] for n in INSTANCIAS]
+    archivo = tmp_path / 'solutions.json'
+    with open(archivo, 'w') as f:
+        json.dump(rotas, f)
+
+    errores = analisis_batch.correr(instancias, str(archivo), str(tmp_path / 'salida'), silencioso=True)
+    assert errores == 1
@@ -0,0 +1,56 @@
+import time
+
+import pandas as pd
+
+import tdvrp_analyzer as core
+from analisis_fondo import GestorAnalisis
+
+
+def _esperar(tarea, limite=120.0):
+    fin = time.monotonic() + limite
+    while not tarea.terminada and time.monotonic() < fin:
+        time.sleep(0.05)
+    assert tarea.terminada, tarea.avance()
+
+
+def test_tarea_completa_igual_al_analisis_directo(paired_data):
+    tarea = GestorAnalisis().enviar(paired_data, epsilon=0.1, cant_muestras=10)
+    _esperar(tarea)
+
+    assert tarea.estado == 'completa', tarea.error
+    assert tarea.avance()['procesadas'] == len(paired_data)
+    global_df, _, estado = tarea.resultado
+    pd.testing.assert_frame_equal(global_df, core.correr_analisis_general(paired_data, 0.1, 10)[0])
+    assert sorted(estado['recalculadas']) == sorted(paired_data)
+
+
+def test_cancelar_detiene_la_tarea(paired_data):
+    gestor = GestorAnalisis()
+    tarea = gestor.enviar(paired_data, epsilon=0.1, cant_muestras=10)
+    tarea.cancelar()
+    _esperar(tarea)
+
+    assert tarea.estado == 'cancelada'
+    assert tarea.avance()['procesadas'] < len(paired_data)
+    assert gestor.obtener(tarea.id) is tarea
+
+    # el estado parcial de la tarea cancelada evita repetir las instancias terminadas
+    terminadas = list(tarea.estado_parcial['resultados'])
+    siguiente = gestor.enviar(paired_data, epsilon=0.1, cant_muestras=10, estado=tarea.estado_parcial)
+    _esperar(siguiente)
+    assert siguiente.estado == 'completa', siguiente.error
+    assert sorted(siguiente.resultado[2]['recalculadas'] + terminadas) == sorted(paired_data)
+
+
+def test_estado_de_una_corrida_en_directorio_sirve_para_actualizar(tmp_path, paired_data):
+    gestor = GestorAnalisis()
+    tarea = gestor.enviar(paired_data, epsilon=0.1, cant_muestras=10, directorio_corrida=str(tmp_path / 'corrida'))
+    _esperar(tarea)
+    assert tarea.estado == 'completa', tarea.error
+
+    # la actualización siguiente, sin directorio, no re-analiza nada
+    actualizacion = gestor.enviar(paired_data, epsilon=0.1, cant_muestras=10, estado=tarea.resultado[2])
+    _esperar(actualizacion)
+    assert actualizacion.estado == 'completa', actualizacion.error
+    assert actualizacion.resultado[2]['recalculadas'] == []
+    pd.testing.assert_frame_equal(actualizacion.resultado[0], tarea.resultado[0])
@@ -0,0 +1,111 @@
+import pandas as pd
+import pytest
+
+import tdvrp_analyzer as core
+
+
+@pytest.fixture(scope='module')
+def secuencial(paired_data):
+    return core.correr_analisis_general(paired_data, epsilon=0.1, cant_muestras=10)
+
+
+def _metricas_iguales(obtenidas, esperadas):
+    pd.testing.assert_frame_equal(obtenidas['agregados'], esperadas['agregados'])
+    ignorar = {'agregados', 'memory_report'}
+    assert {k: v for k, v in obtenidas.items() if k not in ignorar} == \
+        {k: v for k, v in esperadas.items() if k not in ignorar}
+
+
+def test_paralelo_igual_a_secuencial(paired_data, secuencial):
+    global_df, global_metrics = core.correr_analisis_general(paired_data, epsilon=0.1, cant_muestras=10, workers=2)
+
+    pd.testing.assert_frame_equal(global_df, secuencial[0])
+    _metricas_iguales(global_metrics, secuencial[1])
+
+
+def test_paralelo_sigue_si_falla_una_instancia(paired_data, secuencial):
+    # un par roto en el medio no corta el pool ni cambia el orden del resto
+    pares = dict(paired_data)
+    nombres = list(pares)
+    rotos = {**pares, 'X999_25': {'instance': pares[nombres[0]]['instance'], 'solution': {'routes': []}}}
+    orden = {n: rotos[n] for n in nombres[:2] + ['X999_25'] + nombres[2:]}
+
+    global_df, global_metrics = core.correr_analisis_general(orden, epsilon=0.1, cant_muestras=10, workers=2)
+
+    # la categoría del par roto queda declarada aunque no tenga filas
+    global_df['instance_name'] = global_df['instance_name'].cat.remove_unused_categories()
+    pd.testing.assert_frame_equal(global_df, secuencial[0])
+    assert global_metrics['total_instances'] == len(paired_data)
+
+
+def test_actualizar_solo_recalcula_lo_que_cambio(paired_data, secuencial):
+    global_df, global_metrics, estado = core.actualizar_analisis_general(paired_data)
+    assert estado['recalculadas'] == list(paired_data)
+    pd.testing.assert_frame_equal(global_df, secuencial[0])
+    _metricas_iguales(global_metrics, secuencial[1])
+
+    # sin cambios no se re-analiza nada
+    global_df, _, estado = core.actualizar_analisis_general(paired_data, estado)
+    assert estado['recalculadas'] == []
+    pd.testing.assert_frame_equal(global_df, secuencial[0])
+
+    # otra solución para un par y otro par eliminado
+    modificados = {n: d for n, d in paired_data.items() if n != 'C205_25'}
+    solucion = dict(paired_data['R101_25']['solution'])
+    solucion['routes'] = [dict(r, t0=r['t0'] + 5.0) for r in solucion['routes']]
+    modificados['R101_25'] = {'instance': paired_data['R101_25']['instance'], 'solution': solucion}
+
+    global_df, global_metrics, estado = core.actualizar_analisis_general(modificados, estado)
+    assert estado['recalculadas'] == ['R101_25']
+    assert set(estado['resultados']) == set(modificados)
+    esperado_df, esperadas = core.correr_analisis_general(modificados)
+    pd.testing.assert_frame_equal(global_df, esperado_df)
+    _metricas_iguales(global_metrics, esperadas)
+
+
+def test_actualizar_se_detiene_al_cancelar(paired_data):
+    pasos = []
+    with pytest.raises(core.AnalisisCancelado) as cancelado:
+        core.actualizar_analisis_general(paired_data, al_avanzar=pasos.append, detener=lambda: len(pasos) >= 2)
+    terminadas = list(paired_data)[:2]
+    assert [p['instance_name'] for p in pasos] == terminadas
+
+    # lo ya calculado no se pierde: la corrida siguiente solo analiza lo que faltaba
+    parcial = cancelado.value.estado
+    assert list(parcial['resultados']) == terminadas
+    global_df, _, estado = core.actualizar_analisis_general(paired_data, parcial)
+    assert estado['recalculadas'] == list(paired_data)[2:]
+    pd.testing.assert_frame_equal(global_df, core.correr_analisis_general(paired_data)[0])
+
+
+def test_iterar_devuelve_cada_instancia_con_el_resumen_parcial(paired_data, secuencial):
+    nombres = list(paired_data)
+    pasos = []
+    for paso in core.iterar_analisis_general(paired_data):
+        # el resumen ya incluye la instancia recién terminada
+        assert paso['resumen'].metricas_generales()['total_instances'] == paso['procesadas']
+        pasos.append(paso)
+
+    assert [p['instance_name'] for p in pasos] == nombres
+    assert [p['procesadas'] for p in pasos] == list(range(1, len(nombres) + 1))
+    assert all(p['total'] == len(nombres) and not p['reutilizada'] and p['error'] is None for p in pasos)
+    for paso in pasos:
+        esperado = secuencial[0][secuencial[0]['instance_name'] == paso['instance_name']]
+        assert len(paso['instance_df']) == len(esperado)
+
+    finales = pasos[-1]['resumen'].metricas_generales()
+    for clave in ('total_arcs', 'total_routes', 'global_optimal_pct', 'global_avg_decile'):
+        assert finales[clave] == pytest.approx(secuencial[1][clave])
+
+
+def test_iterar_devuelve_primero_lo_reutilizado(paired_data):
+    _, _, estado = core.actualizar_analisis_general(paired_data)
+    modificados = dict(paired_data)
+    solucion = dict(paired_data['C101_25']['solution'], value=0.0)
+    modificados['C101_25'] = {'instance': paired_data['C101_25']['instance'], 'solution': solucion}
+
+    pasos = list(core.iterar_analisis_general(modificados, estado=estado))
+    assert [p['instance_name'] for p in pasos] == [n for n in modificados if n != 'C101_25'] + ['C101_25']
+    assert [p['reutilizada'] for p in pasos] == [True] * (len(pasos) - 1) + [False]
+    for paso in pasos[:-1]:
+        assert paso['instance_df'] is estado['resultados'][paso['instance_name']][1]
@@ -0,0 +1,52 @@
+import pytest
+
+import tdvrp_analyzer as core
+from barrido_parametros import (EPSILONS_POR_DEFECTO, METRICAS_BARRIDO, barrido_instancia, correr_barrido_general,
+                                grilla_epsilons, resumen_barrido)
+from conftest import INSTANCIAS
+
+EPSILONS = [50.0, 1000.0]
+MUESTRAS = [2, 10]
+
+
+@pytest.mark.parametrize('nombre', INSTANCIAS)
+def test_barrido_igual_a_correr_cada_combinacion(cargar_par, nombre):
+    instance_data, solution_data = cargar_par(nombre)
+    tabla = barrido_instancia(nombre, instance_data, solution_data, EPSILONS, MUESTRAS)
+    assert len(tabla) == len(EPSILONS) * len(MUESTRAS) * len(METRICAS_BARRIDO)
+
+    for epsilon in EPSILONS:
+        for cant_muestras in MUESTRAS:
+            df = core.correr_analisis_instancia(nombre, instance_data, solution_data, epsilon, cant_muestras)
+            esperado = core.resumen_metricas(df)
+            combinacion = tabla[(tabla['epsilon'] == epsilon) & (tabla['cant_muestras'] == cant_muestras)]
+            obtenido = dict(zip(combinacion['metric'], combinacion['value']))
+            for metrica in METRICAS_BARRIDO:
+                assert obtenido[metrica] == pytest.approx(esperado[metrica], nan_ok=True), (epsilon, cant_muestras, metrica)
+
+
+def test_muestras_invalidas(cargar_par):
+    instance_data, solution_data = cargar_par('C101_25')
+    with pytest.raises(ValueError):
+        barrido_instancia('C101_25', instance_data, solution_data, [0.1], [1])
+
+
+def test_barrido_general_en_orden(paired_data):
+    tabla = correr_barrido_general(paired_data, EPSILONS, MUESTRAS, workers=2)
+    assert tabla['instance_name'].unique().tolist() == list(paired_data)
+
+    resumen = resumen_barrido(tabla, por_tipo=True)
+    assert len(resumen) == tabla['instance_type'].nunique() * len(EPSILONS) * len(MUESTRAS) * len(METRICAS_BARRIDO)
+
+
+def test_grilla_epsilons_en_la_escala_de_la_app():
+    assert EPSILONS_POR_DEFECTO == grilla_epsilons(100) == [10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0]
+    assert grilla_epsilons(3) == [1.0, 1.5, 3.0, 6.0, 15.0, 30.0]
+    assert grilla_epsilons(4000) == [400.0, 800.0, 2000.0, 4000.0, 5000.0]
+
+
+def test_barrido_por_defecto_no_es_plano(cargar_par):
+    instance_data, solution_data = cargar_par('C101_25')
+    tabla = barrido_instancia('C101_25', instance_data, solution_data, muestras=[10])
+    por_metrica = tabla.groupby('metric')['value'].nunique()
+    assert (por_metrica > 1).any()
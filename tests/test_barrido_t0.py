@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from conftest import INSTANCIAS
+from simulacion import barrido_t0
+
+
+@pytest.mark.parametrize('nombre', INSTANCIAS)
+def test_t0_optimo_es_factible(cargar_par, nombre):
+    instance_data, solution_data = cargar_par(nombre)
+    res = barrido_t0(solution_data, instance_data, pasos=50)
+
+    for r in range(len(solution_data['routes'])):
+        factibles = res['factible'][r]
+        if not factibles.any():
+            assert np.isnan(res['t0_optimo'][r]) and np.isnan(res['duracion_optima'][r])
+            continue
+        g = int(np.flatnonzero(res['grilla'] == res['t0_optimo'][r])[0])
+        assert factibles[g]
+        assert res['duracion_optima'][r] == pytest.approx(np.nanmin(res['duraciones'][r][factibles]))
+
+
+def test_sin_t0_factible_devuelve_nan(cargar_par):
+    instance_data, solution_data = cargar_par('C101_25')
+    # después del cierre del horizonte ninguna ruta llega a tiempo
+    fin = instance_data['horizon'][1]
+    res = barrido_t0(solution_data, instance_data, grilla=[fin + 1000.0, fin + 2000.0])
+
+    assert not res['factible'].any()
+    assert np.isnan(res['t0_optimo']).all()
+    assert np.isnan(res['duracion_optima']).all()
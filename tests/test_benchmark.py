@@ -0,0 +1,43 @@
+import copy
+
+import pytest
+
+import benchmark
+
+
+@pytest.fixture(scope='module')
+def medicion(paired_data):
+    filas = [benchmark.medir_instancia(nombre, datos['instance'], datos['solution'], repeticiones=1)
+             for nombre, datos in paired_data.items()]
+    return {'instancias': filas}
+
+
+def test_etapas_del_analisis_real(medicion):
+    for fila in medicion['instancias']:
+        assert set(benchmark.ETAPAS) <= set(fila)
+        # las etapas del análisis salen del perfil de _analisis_instancia
+        assert all(fila[etapa] > 0 for etapa in ('simulacion', 'clusters', 'duraciones', 'metricas', 'tabla', 'resumen'))
+        assert fila['total'] == pytest.approx(sum(fila[etapa] for etapa in benchmark.ETAPAS))
+    assert 'deciles' not in benchmark.ETAPAS
+
+
+def test_comparar_marca_regresiones(medicion):
+    base = copy.deepcopy(medicion)
+    for fila in base['instancias']:
+        fila['duraciones'] /= 10  # la base era 10 veces más rápida en duraciones
+    comparacion = benchmark.comparar(medicion, base, piso=0.0)
+
+    regresiones = comparacion[comparacion['regresion']]
+    assert set(regresiones['etapa']) <= {'duraciones', 'total'}
+    assert 'duraciones' in set(regresiones['etapa'])
+    assert not benchmark.comparar(medicion, medicion)['regresion'].any()
+
+
+def test_comparar_con_una_base_de_otra_version(medicion):
+    # una base sin las etapas nuevas se compara en las etapas que tienen las dos
+    base = copy.deepcopy(medicion)
+    for fila in base['instancias']:
+        del fila['tabla']
+    comparacion = benchmark.comparar(medicion, base)
+    assert 'tabla' not in set(comparacion['etapa'])
+    assert 'resumen' in set(comparacion['etapa'])
@@ -0,0 +1,90 @@
+import copy
+import os
+
+import pandas as pd
+import pytest
+
+import cache_resultados
+import tdvrp_analyzer as core
+from cache_resultados import CacheResultados, cache_por_defecto, clave_analisis, escribir_atomico
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheResultados(str(tmp_path / 'cache'), max_bytes=None)
+
+
+def test_clave_depende_del_contenido(cargar_par, monkeypatch):
+    instance_data, solution_data = cargar_par('C101_25')
+    clave = clave_analisis(instance_data, solution_data, 0.1, 10)
+
+    # mismo contenido (otra copia, otro orden de claves): misma clave
+    reordenada = dict(reversed(list(copy.deepcopy(instance_data).items())))
+    assert clave_analisis(reordenada, solution_data, 0.1, 10) == clave
+
+    otra_solucion = copy.deepcopy(solution_data)
+    otra_solucion['routes'][0]['path'] = list(reversed(otra_solucion['routes'][0]['path']))
+    assert clave_analisis(instance_data, otra_solucion, 0.1, 10) != clave
+    assert clave_analisis(instance_data, solution_data, 0.2, 10) != clave
+    assert clave_analisis(instance_data, solution_data, 0.1, 20) != clave
+
+    # cambiar el código del análisis invalida las entradas
+    monkeypatch.setattr(cache_resultados, 'VERSION_CODIGO', 'otra-version')
+    assert clave_analisis(instance_data, solution_data, 0.1, 10) != clave
+
+
+def test_correr_analisis_instancia_lee_de_la_cache(cargar_par, cache):
+    instance_data, solution_data = cargar_par('R101_25')
+    calculado = core.correr_analisis_instancia('R101_25', instance_data, solution_data, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    leido = core.correr_analisis_instancia('R101_25', instance_data, solution_data, cache=cache)
+    assert cache.hits == 1
+    pd.testing.assert_frame_equal(leido, calculado)
+
+    # sin cache explícita no se consulta ninguna
+    core.correr_analisis_instancia('R101_25', instance_data, solution_data)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_analisis_general_con_cache_igual_al_directo(paired_data, cache):
+    directo_df, _ = core.correr_analisis_general(paired_data)
+    primera_df, _ = core.correr_analisis_general(paired_data, cache=cache)
+    segunda_df, segunda = core.correr_analisis_general(paired_data, cache=cache)
+
+    assert cache.hits == len(paired_data)
+    pd.testing.assert_frame_equal(primera_df, directo_df)
+    pd.testing.assert_frame_equal(segunda_df, directo_df)
+    assert [s['instance_name'] for s in segunda['instance_summaries']] == list(paired_data)
+
+
+def test_variable_de_entorno_solo_como_valor_por_defecto(tmp_path, monkeypatch):
+    monkeypatch.delenv('TDVRP_CACHE_DIR', raising=False)
+    assert cache_por_defecto() is None
+
+    monkeypatch.setenv('TDVRP_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setenv('TDVRP_CACHE_MAX_BYTES', '1000')
+    cache = cache_por_defecto()
+    assert (cache.directorio, cache.max_bytes) == (str(tmp_path / 'cache'), 1000)
+
+
+def test_desalojo_respeta_max_bytes(tmp_path):
+    cache = CacheResultados(str(tmp_path), max_bytes=1)
+    df = pd.DataFrame({'a': range(100)})
+    cache.guardar('vieja', df, {})
+    cache.guardar('nueva', df, {})
+    assert cache.obtener('vieja') is None
+
+
+def test_escritura_atomica_no_deja_archivos_a_medias(tmp_path):
+    ruta = tmp_path / 'archivo.json'
+    escribir_atomico(str(ruta), lambda f: f.write(b'original'))
+
+    def falla(f):
+        f.write(b'a medias')
+        raise RuntimeError('corte')
+
+    with pytest.raises(RuntimeError):
+        escribir_atomico(str(ruta), falla)
+    assert ruta.read_bytes() == b'original'
+    assert os.listdir(tmp_path) == ['archivo.json']
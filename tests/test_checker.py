@@ -0,0 +1,95 @@
+import copy
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import INSTANCIAS, RAIZ
+
+DIRECTORIO_DATOS = os.path.join(RAIZ, 'data')
+
+
+@pytest.fixture(scope='module')
+def checker():
+    # importarlo no lee argumentos ni archivos: el CLI está en main()
+    spec = importlib.util.spec_from_file_location('checker', os.path.join(DIRECTORIO_DATOS, 'checker.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def _correr_checker(archivo, *opciones):
+    '''salida del checker (se corre desde data/, como espera para encontrar los datasets)'''
+    res = subprocess.run([sys.executable, 'checker.py', *opciones, str(archivo)], cwd=DIRECTORIO_DATOS,
+                         capture_output=True, text=True, check=True)
+    return res.stdout.splitlines()
+
+
+@pytest.fixture(scope='module')
+def salidas(tmp_path_factory, soluciones):
+    correctas = [soluciones[n] for n in INSTANCIAS]
+
+    duracion = copy.deepcopy(soluciones['C101_25'])
+    duracion['routes'][0]['duration'] += 1.0
+    repetido = copy.deepcopy(soluciones['RC201_25'])
+    path = repetido['routes'][0]['path']
+    path.insert(2, path[1])
+    tarde = copy.deepcopy(soluciones['C205_25'])
+    tarde['routes'][-1]['t0'] += 5000.0
+
+    archivo = tmp_path_factory.mktemp('checker') / 'salida.json'
+    with open(archivo, 'w') as f:
+        json.dump(correctas + [duracion, repetido, tarde], f)
+    return archivo
+
+
+def test_batch_mismos_veredictos_que_el_checker(salidas):
+    normal = _correr_checker(salidas)
+    batch = _correr_checker(salidas, '--batch')
+
+    assert batch[-1].startswith('\033[95mChecked ')
+    assert batch[:-2] == normal[:-1]
+    # en el resumen del modo original, "error:" muestra el último mensaje (el bucle de errores pisa el contador)
+    for resumen in (normal[-1], batch[-2]):
+        assert f'ok: {len(INSTANCIAS)}' in resumen and 'wrong: 3' in resumen and 'suboptimal: 0' in resumen
+
+
+def test_batch_con_procesos(tmp_path, salidas):
+    otra = tmp_path / 'otra.json'
+    otra.write_text(salidas.read_text())
+    una = _correr_checker(salidas, '--batch')
+    dos = subprocess.run([sys.executable, 'checker.py', '--batch', '--workers', '2', str(salidas), str(otra)],
+                         cwd=DIRECTORIO_DATOS, capture_output=True, text=True, check=True).stdout.splitlines()
+
+    assert f'ok: {2 * len(INSTANCIAS)}' in dos[-2] and 'wrong: 6' in dos[-2]
+    assert dos[1:len(una) - 2] == una[1:-2]
+
+
+def test_batch_salida_fuera_del_horizonte(tmp_path, soluciones):
+    # el checker original corta con ValueError; --batch la informa como infactible
+    fuera = copy.deepcopy(soluciones['R101_25'])
+    fuera['routes'][0]['t0'] = 10e6
+    archivo = tmp_path / 'fuera.json'
+    archivo.write_text(json.dumps([fuera]))
+
+    batch = _correr_checker(archivo, '--batch')
+    assert any('Infeasible' in linea for linea in batch)
+    assert 'wrong: 1' in batch[-2]
+
+
+def test_check_routes_batch_importado(checker, soluciones, monkeypatch):
+    monkeypatch.chdir(DIRECTORIO_DATOS)
+    dataset = 'instancias-dabia_et_al_2013'
+    for nombre in INSTANCIAS:
+        rutas = copy.deepcopy(soluciones[nombre]['routes'])
+        rutas[0]['duration'] += 1.0
+        instancia = checker.read_instance(dataset, nombre)
+        ctx = checker.read_instance_context(dataset, nombre)
+
+        esperados, obtenidos = [], []
+        assert checker.check_routes_batch(ctx, rutas, obtenidos) == checker.check_routes(instancia, rutas, esperados) is False
+        assert len(obtenidos) == len(esperados) == 1
+        assert obtenidos[0].startswith('\tDifferent duration') and esperados[0].startswith('\tDifferent duration')
@@ -0,0 +1,87 @@
+import json
+import multiprocessing
+import os
+import time
+
+import pandas as pd
+
+import cola_trabajo
+import tdvrp_analyzer as core
+
+
+def _competir(ruta, trabajador, barrera, salida, demora):
+    # agranda la ventana entre ver la lease vencida y renombrarla (en este proceso hijo)
+    rename = os.rename
+
+    def rename_lento(origen, destino):
+        time.sleep(demora)
+        rename(origen, destino)
+
+    os.rename = rename_lento
+    barrera.wait()
+    salida.put((trabajador, cola_trabajo._tomar_lease(ruta, trabajador, 60.0)))
+
+
+def _lease_vencida(ruta):
+    with open(ruta, 'w') as f:
+        json.dump({'trabajador': 'muerto'}, f)
+    hace_mucho = time.time() - 3600
+    os.utime(ruta, (hace_mucho, hace_mucho))
+
+
+def test_una_lease_vencida_la_reclama_un_solo_proceso(tmp_path):
+    contexto = multiprocessing.get_context('fork')
+    procesos = 8
+    for ronda in range(25):
+        ruta = str(tmp_path / f'par{ronda}.lock')
+        _lease_vencida(ruta)
+        barrera, salida = contexto.Barrier(procesos), contexto.Queue()
+        hijos = [contexto.Process(target=_competir, args=(ruta, f't{i}', barrera, salida, 0.002 * i)) for i in range(procesos)]
+        for hijo in hijos:
+            hijo.start()
+        resultados = dict(salida.get(timeout=30) for _ in hijos)
+        for hijo in hijos:
+            hijo.join()
+
+        ganadores = [t for t, tomada in resultados.items() if tomada]
+        assert len(ganadores) == 1, f"ronda {ronda}: {ganadores}"
+        assert cola_trabajo._duenio_lease(ruta) == ganadores[0]
+    assert not [n for n in os.listdir(tmp_path) if '.vencida.' in n]
+
+
+def test_lease_vigente_no_se_reclama(tmp_path):
+    ruta = str(tmp_path / 'par.lock')
+    assert cola_trabajo._tomar_lease(ruta, 'a', 60.0)
+    assert not cola_trabajo._tomar_lease(ruta, 'b', 60.0)
+
+    cola_trabajo._liberar_lease(ruta, 'b')  # no es de b: no la libera
+    assert cola_trabajo._duenio_lease(ruta) == 'a'
+    cola_trabajo._liberar_lease(ruta, 'a')
+    assert not os.path.exists(ruta)
+
+
+def test_lease_apartada_vigente_vuelve_a_su_lugar(tmp_path):
+    # simula la carrera: el nodo vio una lease vencida, pero cuando la renombra ya es la nueva de otro nodo
+    ruta = str(tmp_path / 'par.lock')
+    assert cola_trabajo._tomar_lease(ruta, 'b', 60.0)
+    apartada = ruta + '.vencida.a'
+    os.rename(ruta, apartada)
+    assert not cola_trabajo._vencida(apartada, 60.0)
+    cola_trabajo._restaurar_lease(apartada, ruta)
+    assert cola_trabajo._duenio_lease(ruta) == 'b'
+    assert not os.path.exists(apartada)
+
+
+def test_varios_procesos_analizan_cada_par_una_vez(tmp_path, paired_data):
+    directorio = str(tmp_path / 'cola')
+    cola_trabajo.crear_cola(directorio, paired_data, epsilon=0.1, cant_muestras=10)
+    conteo = cola_trabajo.trabajar_local(directorio, procesos=3, esperar=False)
+
+    assert conteo == {'completas': len(paired_data), 'errores': 0}
+    estado = cola_trabajo.estado_cola(directorio)
+    assert estado['completa'] == len(paired_data) and estado['en_curso'] == 0
+    assert os.listdir(os.path.join(directorio, 'leases')) == []
+
+    global_df, _ = cola_trabajo.combinar_cola(directorio)
+    directo_df, _ = core.correr_analisis_general(paired_data, epsilon=0.1, cant_muestras=10)
+    pd.testing.assert_frame_equal(global_df, directo_df)
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+import tdvrp_analyzer as core
+from corridas import CorridaAnalisis, correr_analisis_reanudable
+
+
+@pytest.fixture(scope='module')
+def directo(paired_data):
+    return core.correr_analisis_general(paired_data, epsilon=0.1, cant_muestras=10)
+
+
+def test_reanudar_despues_de_cancelar(tmp_path, paired_data, directo):
+    directorio = str(tmp_path / 'corrida')
+    analizadas = []
+
+    def registrar(paso):
+        analizadas.append(paso['instance_name'])
+
+    # se cancela después de la segunda instancia
+    assert correr_analisis_reanudable(paired_data, directorio, detener=lambda: len(analizadas) >= 2,
+                                      al_avanzar=registrar) is None
+    corrida = CorridaAnalisis(directorio, 0.1, 10)
+    assert corrida.estado == 'cancelada'
+    assert corrida.completas(paired_data) == set(analizadas[:2])
+
+    # al reanudar se analizan solo las que faltaban
+    analizadas.clear()
+    global_df, global_metrics = correr_analisis_reanudable(paired_data, directorio, al_avanzar=registrar)
+    assert sorted(analizadas) == sorted(set(paired_data) - corrida.completas(paired_data))
+    assert CorridaAnalisis(directorio, 0.1, 10).estado == 'completa'
+
+    pd.testing.assert_frame_equal(global_df, directo[0])
+    assert global_metrics['total_arcs'] == directo[1]['total_arcs']
+
+
+def test_par_modificado_se_vuelve_a_analizar(tmp_path, paired_data):
+    directorio = str(tmp_path / 'corrida')
+    corrida = CorridaAnalisis(directorio, 0.1, 10)
+    assert corrida.ejecutar(paired_data)
+
+    modificados = dict(paired_data)
+    solucion = dict(paired_data['C101_25']['solution'], value=0.0)
+    modificados['C101_25'] = {'instance': paired_data['C101_25']['instance'], 'solution': solucion}
+    assert CorridaAnalisis(directorio, 0.1, 10).completas(modificados) == set(paired_data) - {'C101_25'}
+
+
+def test_estado_incremental_reutiliza_la_corrida(tmp_path, paired_data):
+    corrida = CorridaAnalisis(str(tmp_path / 'corrida'), 0.1, 10)
+    corrida.ejecutar(paired_data)
+
+    estado = corrida.estado_incremental(paired_data)
+    assert list(estado['resultados']) == list(paired_data)
+    _, _, nuevo = core.actualizar_analisis_general(paired_data, estado, epsilon=0.1, cant_muestras=10)
+    assert nuevo['recalculadas'] == []
+
+
+def test_otros_parametros_no_se_reanudan(tmp_path):
+    CorridaAnalisis(str(tmp_path), 0.1, 10)
+    with pytest.raises(ValueError):
+        CorridaAnalisis(str(tmp_path), 0.2, 10)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import escenarios
+from conftest import INSTANCIAS
+from escenarios import correr_escenarios_general, muestrear_velocidades, simular_escenarios
+from simulacion import avanzar_rutas, contexto_instancia, simulacion_lote
+
+
+@pytest.mark.parametrize('nombre', INSTANCIAS)
+def test_sin_ruido_es_la_simulacion(cargar_par, nombre):
+    instance_data, solution_data = cargar_par(nombre)
+    res = simular_escenarios(solution_data, instance_data, K=5, sigma=0.0)
+    _, reporte = simulacion_lote(solution_data, instance_data)
+
+    for r in range(len(solution_data['routes'])):
+        assert res['duraciones'][r] == pytest.approx(np.full(5, reporte['simulated_duration'][r]), rel=1e-12)
+
+
+def test_cada_escenario_es_una_simulacion_con_sus_velocidades(cargar_par, monkeypatch):
+    instance_data, solution_data = cargar_par('RC201_25')
+    ctx = contexto_instancia(instance_data)
+    paths = [r['path'] for r in solution_data['routes']]
+    t0 = [r['t0'] for r in solution_data['routes']]
+    # lotes chicos, para cubrir el corte de los escenarios en varias llamadas
+    monkeypatch.setattr(escenarios, 'MAX_CARRILES', 2 * len(paths))
+
+    K = 5
+    res = simular_escenarios(solution_data, instance_data, K=K, sigma=0.2, sigma_comun=0.1, semilla=3, ctx=ctx)
+    speeds = muestrear_velocidades(ctx['speeds'], K, 0.2, 0.1, 3)
+    for k in range(K):
+        sim = avanzar_rutas(ctx, paths, t0, speeds=speeds[k])
+        assert res['duraciones'][:, k] == pytest.approx(sim['fin'] - np.asarray(t0), rel=1e-12)
+
+
+def test_ruido_de_media_uno():
+    v = np.ones((3, 4))
+    muestras = muestrear_velocidades(v, 20000, sigma=0.2, sigma_comun=0.1, semilla=1)
+    assert muestras.shape == (20000, 3, 4)
+    assert muestras.mean() == pytest.approx(1.0, abs=0.01)
+    np.testing.assert_array_equal(muestras, muestrear_velocidades(v, 20000, sigma=0.2, sigma_comun=0.1, semilla=1))
+
+
+def test_general_no_depende_de_los_procesos(paired_data):
+    secuencial = correr_escenarios_general(paired_data, K=50, semilla=7)
+    paralelo = correr_escenarios_general(paired_data, K=50, semilla=7, workers=2)
+
+    pd.testing.assert_frame_equal(paralelo, secuencial)
+    assert secuencial['instance_name'].unique().tolist() == list(paired_data)
+    # la semilla de cada instancia no depende de qué otras instancias se corren
+    sola = correr_escenarios_general({'R101_25': paired_data['R101_25']}, K=50, semilla=7)
+    pd.testing.assert_frame_equal(sola, secuencial[secuencial['instance_name'] == 'R101_25'].reset_index(drop=True))
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from conftest import INSTANCIAS
+from evaluacion_incremental import EvaluadorIncremental
+from simulacion import simulacion
+
+
+def _completa(ev, path, t0):
+    '''resultado de simular la ruta entera, sin reutilizar nada de la caché'''
+    return ev._resultado(ev._cachear(list(path), t0), 0)
+
+
+def _iguales(obtenido, esperado):
+    assert obtenido['duration'] == pytest.approx(esperado['duration'], abs=1e-9)
+    for campo in ('carga', 'violaciones', 'factible'):
+        assert obtenido[campo] == esperado[campo], campo
+
+
+def _ediciones(path, clientes, rng, cantidad):
+    '''caminos editados al azar (inserción, eliminación o movimiento), sin tocar los depósitos'''
+    for _ in range(cantidad):
+        p = list(path)
+        tipo = rng.choice(['insertar', 'eliminar', 'mover'] if len(p) > 3 else ['insertar'])
+        if tipo == 'insertar':
+            p.insert(rng.randrange(1, len(p)), rng.choice(clientes))
+        elif tipo == 'eliminar':
+            del p[rng.randrange(1, len(p) - 1)]
+        else:
+            c = p.pop(rng.randrange(1, len(p) - 1))
+            p.insert(rng.randrange(1, len(p)), c)
+        yield p
+
+
+@pytest.mark.parametrize('nombre', INSTANCIAS)
+def test_duraciones_iguales_a_simulacion(cargar_par, nombre):
+    instance_data, solution_data = cargar_par(nombre)
+    ev = EvaluadorIncremental(solution_data, instance_data)
+    res, _ = simulacion(solution_data, instance_data)
+
+    for idx, route in enumerate(solution_data['routes']):
+        ultimo = res[idx][-1]
+        assert ev.duracion(idx) == pytest.approx(ultimo[2] + ultimo[3] - route['t0'])
+
+
+@pytest.mark.parametrize('nombre', INSTANCIAS)
+def test_evaluar_igual_a_resimular(cargar_par, nombre):
+    instance_data, solution_data = cargar_par(nombre)
+    ev = EvaluadorIncremental(solution_data, instance_data)
+    rng = random.Random(nombre)
+    clientes = list(range(1, len(instance_data['distances'])))
+
+    for idx, cache in enumerate(ev.rutas):
+        for path in _ediciones(cache['path'], clientes, rng, 15):
+            _iguales(ev.evaluar(idx, path), _completa(ev, path, cache['t0']))
+        t0 = cache['t0'] + 7.5
+        _iguales(ev.evaluar(idx, cache['path'], t0=t0), _completa(ev, cache['path'], t0))
+
+
+def test_corta_cuando_la_espera_absorbe_el_cambio(cargar_par):
+    instance_data, solution_data = cargar_par('R101_25')
+    ev = EvaluadorIncremental(solution_data, instance_data)
+
+    cortes = 0
+    for idx, cache in enumerate(ev.rutas):
+        for pos in range(1, len(cache['path']) - 1):
+            path = cache['path'][:pos] + cache['path'][pos + 1:]
+            r = ev.evaluar(idx, path)
+            _iguales(r, _completa(ev, path, cache['t0']))
+            cortes += r['posiciones_simuladas'] < len(path) - pos
+    # en R101_25 hay rutas que esperan a que abra una ventana: alguna eliminación se absorbe ahí
+    assert cortes > 0
+
+
+@pytest.mark.parametrize('nombre', ['R101_25', 'RC201_25'])
+def test_aplicar_actualiza_la_cache(cargar_par, nombre):
+    instance_data, solution_data = cargar_par(nombre)
+    ev = EvaluadorIncremental(solution_data, instance_data)
+    rng = random.Random(nombre)
+    clientes = list(range(1, len(instance_data['distances'])))
+
+    for idx in range(len(ev.rutas)):
+        for paso in range(6):
+            cache = ev.rutas[idx]
+            path = next(_ediciones(cache['path'], clientes, rng, 1))
+            # la última edición además corre la salida de la ruta
+            t0 = cache['t0'] + (10.0 if paso == 5 else 0.0)
+            ev.aplicar(idx, path, t0=t0)
+            esperada = ev._cachear(path, t0)
+            for campo in ('path', 'carga', 'viol'):
+                assert ev.rutas[idx][campo] == esperada[campo], campo
+            for campo in ('llegada', 'inicio', 'salida'):
+                assert ev.rutas[idx][campo] == pytest.approx(esperada[campo], abs=1e-9), campo
+
+
+def test_movimiento_entre_rutas(cargar_par):
+    instance_data, solution_data = cargar_par('R101_25')
+    ev = EvaluadorIncremental(solution_data, instance_data)
+    origen, destino = ev.rutas[0]['path'], ev.rutas[1]['path']
+
+    mov = ev.evaluar_movimiento(0, 1, 1, 2)
+    sin_cliente = origen[:1] + origen[2:]
+    con_cliente = destino[:2] + [origen[1]] + destino[2:]
+    _iguales(mov['rutas'][0], _completa(ev, sin_cliente, ev.rutas[0]['t0']))
+    _iguales(mov['rutas'][1], _completa(ev, con_cliente, ev.rutas[1]['t0']))
+    esperado = sum(mov['rutas'][i]['duration'] - ev.duracion(i) for i in (0, 1))
+    assert mov['delta_duration'] == pytest.approx(esperado)
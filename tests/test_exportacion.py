@@ -0,0 +1,111 @@
+import io
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import tdvrp_analyzer as core
+
+
+@pytest.fixture(scope='module')
+def analisis(paired_data):
+    global_df, global_metrics = core.correr_analisis_general(paired_data)
+    return global_df, global_metrics, core.datos_comparacion_general(global_df)
+
+
+@pytest.mark.parametrize('formato', ['parquet', 'arrow'])
+def test_columnar_ida_y_vuelta(tmp_path, analisis, formato):
+    global_df, global_metrics, comparison_data = analisis
+    tablas = core.tablas_analisis_general(global_df, global_metrics, comparison_data)
+    rutas = core.export_general_analysis_columnar(global_df, global_metrics, comparison_data,
+                                                  str(tmp_path), formato)
+
+    assert set(rutas) == set(tablas)
+    for nombre, tabla in tablas.items():
+        leida = pq.read_table(rutas[nombre]) if formato == 'parquet' else pa.ipc.open_file(rutas[nombre]).read_all()
+        pd.testing.assert_frame_equal(leida.to_pandas().reset_index(drop=True), tabla.reset_index(drop=True),
+                                      check_dtype=False, check_categorical=False)
+
+
+def test_texto_como_diccionario(analisis):
+    global_df = analisis[0]
+    tabla = core.tabla_arrow(global_df.assign(etiqueta=core.etiquetas_arcos(global_df)))
+    for columna in ('instance_name', 'instance_type', 'proximity_category', 'etiqueta'):
+        assert pa.types.is_dictionary(tabla.schema.field(columna).type), columna
+
+
+def test_zip_columnar(analisis):
+    global_df, global_metrics, comparison_data = analisis
+    tablas = core.tablas_analisis_general(global_df, global_metrics, comparison_data, incluir_arcos=False)
+    contenido = core.tablas_columnar_zip(tablas, 'arrow')
+
+    with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+        assert sorted(zf.namelist()) == sorted(n + '.arrow' for n in tablas)
+        leida = pa.ipc.open_file(io.BytesIO(zf.read('Resumen_Global.arrow'))).read_all().to_pandas()
+    pd.testing.assert_frame_equal(leida, tablas['Resumen_Global'], check_dtype=False)
+
+
+def test_formato_desconocido(analisis):
+    with pytest.raises(ValueError):
+        core.escribir_tabla_columnar(analisis[0], io.BytesIO(), 'csv')
+
+
+def _hojas(ruta):
+    return pd.read_excel(ruta, sheet_name=None, engine='openpyxl')
+
+
+def _excel_normal(tmp_path, df):
+    '''df escrito y leído con pandas, para comparar contra lo que escribe EscritorExcelStreaming'''
+    ruta = tmp_path / 'arcos.xlsx'
+    df.to_excel(ruta, index=False)
+    return pd.read_excel(ruta, engine='openpyxl')
+
+
+def test_excel_streaming_igual_al_normal(tmp_path, analisis):
+    global_df, global_metrics, comparison_data = analisis
+    core.export_general_analysis_excel(global_df, global_metrics, comparison_data, str(tmp_path / 'normal.xlsx'))
+    core.export_general_analysis_excel(global_df, global_metrics, comparison_data, str(tmp_path / 'streaming.xlsx'),
+                                       streaming=True)
+
+    normal, streaming = _hojas(tmp_path / 'normal.xlsx'), _hojas(tmp_path / 'streaming.xlsx')
+    assert list(streaming) == list(normal)
+    for nombre in normal:
+        pd.testing.assert_frame_equal(streaming[nombre], normal[nombre], check_dtype=False)
+
+
+def test_excel_streaming_parte_las_hojas_largas(tmp_path, analisis):
+    global_df = analisis[0]
+    ruta = str(tmp_path / 'partes.xlsx')
+    with core.EscritorExcelStreaming(ruta, max_filas=41) as escritor:
+        # dos llamadas, como al escribir instancia por instancia
+        escritor.agregar_filas('Todos_los_Arcos', global_df.iloc[:30])
+        escritor.agregar_filas('Todos_los_Arcos', global_df.iloc[30:])
+
+    hojas = _hojas(ruta)
+    partes = -(-len(global_df) // 40)
+    assert list(hojas) == ['Todos_los_Arcos'] + [f'Todos_los_Arcos_{i}' for i in range(2, partes + 1)]
+    juntas = pd.concat(hojas.values(), ignore_index=True)
+    assert [len(h) for h in hojas.values()][:-1] == [40] * (partes - 1)
+    pd.testing.assert_frame_equal(juntas, _excel_normal(tmp_path, global_df), check_dtype=False)
+
+
+def test_excel_streaming_desde_los_pares(tmp_path, paired_data, analisis):
+    global_df, global_metrics, comparison_data = analisis
+    core.export_general_analysis_excel(global_df, global_metrics, comparison_data, str(tmp_path / 'normal.xlsx'))
+    metricas = core.export_general_analysis_excel_streaming(paired_data, str(tmp_path / 'pares.xlsx'))
+
+    assert metricas['total_arcs'] == global_metrics['total_arcs']
+    normal, pares = _hojas(tmp_path / 'normal.xlsx'), _hojas(tmp_path / 'pares.xlsx')
+    assert list(pares) == list(normal)
+    for nombre in normal:
+        pd.testing.assert_frame_equal(pares[nombre], normal[nombre], check_dtype=False, rtol=1e-9)
+
+
+def test_excel_streaming_sin_instancias_analizadas(tmp_path, paired_data):
+    # ninguna solución se puede analizar: error claro y ningún libro sin hojas en disco
+    rotos = {name: {'instance': data['instance'], 'solution': {}} for name, data in paired_data.items()}
+    with pytest.raises(ValueError, match='Ninguna'):
+        core.export_general_analysis_excel_streaming(rotos, str(tmp_path / 'vacio.xlsx'))
+    assert not (tmp_path / 'vacio.xlsx').exists()
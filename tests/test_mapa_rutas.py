@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import tdvrp_analyzer as core
+from mapa_rutas import segmentos_arcos
+
+
+@pytest.fixture(scope='module')
+def analisis(cargar_par):
+    instance_data, solution_data = cargar_par('R101_25')
+    df = core.correr_analisis_instancia('R101_25', instance_data, solution_data)
+    return df, core.coordenadas_nodos(instance_data)
+
+
+def _arcos_al_azar(n, nodos, semilla=0):
+    rng = np.random.default_rng(semilla)
+    desde = rng.integers(0, nodos, n)
+    hasta = (desde + rng.integers(1, nodos, n)) % nodos
+    return pd.DataFrame({'node_from': desde, 'node_to': hasta, 'decile_rank': rng.integers(0, 10, n)})
+
+
+def test_un_segmento_por_arco(analisis):
+    df, xy = analisis
+    seg = segmentos_arcos(df, xy)
+
+    assert len(seg) == len(df)
+    np.testing.assert_array_equal(seg[['x0', 'y0']].to_numpy(), xy[df['node_from']])
+    np.testing.assert_array_equal(seg[['x1', 'y1']].to_numpy(), xy[df['node_to']])
+    np.testing.assert_array_equal(seg['decil'], df['decile_rank'])
+    assert (seg['arcos'] == 1).all()
+
+
+def test_agrupa_pares_de_nodos_sin_perder_arcos(analisis):
+    _, xy = analisis
+    df = _arcos_al_azar(5000, len(xy))
+    pares = df.assign(a=np.minimum(df['node_from'], df['node_to']), b=np.maximum(df['node_from'], df['node_to']))
+    distintos = len(pares.drop_duplicates(['a', 'b', 'decile_rank']))
+
+    seg = segmentos_arcos(df, xy, max_segmentos=distintos)
+    assert len(seg) == distintos
+    assert seg['arcos'].sum() == len(df)
+    # cada decil conserva su cantidad de arcos
+    np.testing.assert_array_equal(seg.groupby('decil')['arcos'].sum().to_numpy(),
+                                  df.groupby('decile_rank').size().to_numpy())
+
+
+def test_simplifica_en_grilla_hasta_el_limite(analisis):
+    _, xy = analisis
+    df = _arcos_al_azar(5000, len(xy), semilla=1)
+
+    # 200 se alcanza antes de la grilla mínima (2x2: 6 pares de celdas por decil)
+    seg = segmentos_arcos(df, xy, max_segmentos=200)
+    assert len(seg) <= 200
+    assert 0 < seg['arcos'].sum() <= len(df)
+    minimo, maximo = xy.min(axis=0), xy.max(axis=0)
+    for extremo in (['x0', 'y0'], ['x1', 'y1']):
+        puntos = seg[extremo].to_numpy()
+        assert ((puntos >= minimo) & (puntos <= maximo)).all()
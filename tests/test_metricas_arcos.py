@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from conftest import INSTANCIAS
+from metricas_arcos import (_deciles_segmentos, arrays_arcos_factibles, clusters_arcos_ruta, duracion_arcos, metricas, metricas_ruta,
+                            ETIQUETAS_LONGITUD, ETIQUETAS_PROXIMIDAD)
+from simulacion import simulacion
+
+
+def _decil_referencia(valor, distribucion):
+    '''primer decil d con valor <= percentil (d + 1) * 10 de distribucion (5 si está vacía)'''
+    if not distribucion:
+        return 5
+    for decil in range(10):
+        if valor <= np.percentile(distribucion, (decil + 1) * 10):
+            return decil
+    return 9
+
+
+def _referencia(arcos_factibles, duraciones, distancias, dur_usadas, dist_usadas):
+    '''el bucle por intervalo que reemplaza metricas_ruta'''
+    filas = []
+    for k, (intervalo, arcos) in enumerate(arcos_factibles.items()):
+        durs = [e['durations']['mean'] for e in duraciones.get(intervalo, []) if e['durations']['mean'] > 0]
+        dists = [distancias[i][j] for i, j in arcos if distancias[i][j] > 0]
+        if not dists and dist_usadas[k] > 0:
+            dists = [dist_usadas[k]]
+        min_dur = min(durs) if durs else dur_usadas[k]
+        max_dur = max(durs) if durs else dur_usadas[k]
+        min_dist = min(dists) if dists else dist_usadas[k]
+        max_dist = max(dists) if dists else dist_usadas[k]
+        if max_dist == min_dist:
+            longitud = ETIQUETAS_LONGITUD[2]
+        else:
+            rel = min(max((dist_usadas[k] - min_dist) / (max_dist - min_dist), 0), 1)
+            longitud = ETIQUETAS_LONGITUD[0] if rel < 0.5 else ETIQUETAS_LONGITUD[1]
+        filas.append({
+            'min_dur': min_dur, 'max_dur': max_dur, 'min_dist': min_dist, 'max_dist': max_dist,
+            'ratio_min': dur_usadas[k] / min_dur if min_dur > 0 else np.nan,
+            'ratio_max': dur_usadas[k] / max_dur if max_dur > 0 else np.nan,
+            'ratio_min_dist': dist_usadas[k] / min_dist if min_dist > 0 else np.nan,
+            'ratio_max_dist': dist_usadas[k] / max_dist if max_dist > 0 else np.nan,
+            'decil': _decil_referencia(dur_usadas[k], durs),
+            'decil_dist': _decil_referencia(dist_usadas[k], dists),
+            'longitud': longitud,
+            'num_arcos': len(arcos),
+        })
+    return filas
+
+
+@pytest.mark.parametrize('nombre', INSTANCIAS)
+def test_metricas_ruta_igual_al_bucle(cargar_par, nombre):
+    instance_data, solution_data = cargar_par(nombre)
+    distancias = instance_data['distances']
+    time_departures, _ = simulacion(solution_data, instance_data)
+
+    for idx_ruta, route in enumerate(solution_data['routes']):
+        td = time_departures[idx_ruta]
+        intervalos = [(td[i][2], td[i + 1][2]) for i in range(len(td) - 1)]
+        path = route['path']
+        arcos_usados = [(path[i], path[i + 1]) for i in range(len(path) - 1)]
+        arcos_factibles = clusters_arcos_ruta(instance_data, intervalos, arcos_usados)
+        duraciones = duracion_arcos(arcos_factibles, intervalos, instance_data, 0.1, 5)
+
+        n = len(arcos_factibles)
+        dur_usadas = [a[3] for a in td[:n]]
+        dist_usadas = [distancias[i][j] for i, j in arcos_usados[:n]]
+        m = metricas_ruta(arrays_arcos_factibles(arcos_factibles, duraciones, distancias), dur_usadas, dist_usadas)
+        esperado = _referencia(arcos_factibles, duraciones, distancias, dur_usadas, dist_usadas)
+
+        for campo in ('min_dur', 'max_dur', 'min_dist', 'max_dist',
+                      'ratio_min', 'ratio_max', 'ratio_min_dist', 'ratio_max_dist'):
+            assert m[campo] == pytest.approx([f[campo] for f in esperado], nan_ok=True), campo
+        for campo in ('decil', 'decil_dist', 'longitud', 'num_arcos'):
+            assert m[campo].tolist() == [f[campo] for f in esperado], campo
+        # la proximidad sigue siendo la de metricas (extremos sobre las 5 estadísticas)
+        _, proximidad, _ = metricas(arcos_factibles, duraciones, time_departures, idx_ruta)
+        assert m['proximidad'].tolist() == proximidad
+
+
+def test_segmentos_vacios_e_iguales():
+    # intervalo 0: sin arcos; intervalo 1: todos iguales; intervalo 2: duraciones 1..10
+    arcos_factibles = {(0, 1): [], (1, 2): [(0, 1), (0, 2)], (2, 3): [(1, 2)] * 10}
+    duraciones = {
+        (1, 2): [{'durations': dict.fromkeys(('start', 'mean', 'minimo', 'maximo', 'end'), 4.0)}] * 2,
+        (2, 3): [{'durations': dict.fromkeys(('start', 'mean', 'minimo', 'maximo', 'end'), float(d))}
+                 for d in range(1, 11)],
+    }
+    distancias = [[0, 3, 3], [3, 0, 5], [3, 5, 0]]
+    dur_usadas, dist_usadas = [2.0, 4.0, 3.5], [3.0, 3.0, 5.0]
+
+    m = metricas_ruta(arrays_arcos_factibles(arcos_factibles, duraciones, distancias), dur_usadas, dist_usadas)
+    esperado = _referencia(arcos_factibles, duraciones, distancias, dur_usadas, dist_usadas)
+
+    assert m['decil'].tolist() == [f['decil'] for f in esperado] == [5, 0, 2]
+    assert m['decil_dist'].tolist() == [f['decil_dist'] for f in esperado]
+    assert m['num_arcos'].tolist() == [0, 2, 10]
+    assert m['proximidad'].tolist() == [ETIQUETAS_PROXIMIDAD[2], ETIQUETAS_PROXIMIDAD[2], ETIQUETAS_PROXIMIDAD[0]]
+    assert m['longitud'].tolist() == [f['longitud'] for f in esperado]
+
+
+def test_deciles_segmentos_igual_a_np_percentile():
+    rng = np.random.default_rng(0)
+    largos = rng.integers(0, 15, 200)
+    offsets = np.concatenate([[0], np.cumsum(largos)])
+    valores = rng.choice([0.0, 1.0, 2.5, 3.0, 7.0], offsets[-1])  # con repetidos, como las duraciones
+    validos = valores > 0
+    objetivo = rng.choice([0.5, 1.0, 2.5, 3.0, 5.0, 8.0], len(largos))
+
+    deciles = _deciles_segmentos(valores, offsets, validos, objetivo)
+    for k in range(len(largos)):
+        segmento = valores[offsets[k]:offsets[k + 1]]
+        assert deciles[k] == _decil_referencia(objetivo[k], segmento[segmento > 0].tolist()), k
@@ -0,0 +1,63 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import perfilado
+import tdvrp_analyzer as core
+
+
+@pytest.fixture(autouse=True)
+def sin_variable_de_entorno(monkeypatch):
+    monkeypatch.delenv('TDVRP_PERFIL', raising=False)
+
+
+def test_perfil_por_llamada_sin_tocar_el_proceso(cargar_par):
+    instance_data, solution_data = cargar_par('R101_25')
+    sin = core.correr_analisis_instancia('R101_25', instance_data, solution_data)
+    con = core.correr_analisis_instancia('R101_25', instance_data, solution_data, con_perfil=True)
+
+    assert 'perfil' not in sin.attrs
+    assert not perfilado.perfilado_activo()
+    pd.testing.assert_frame_equal(sin, con, check_flags=False)
+
+    perfil = con.attrs['perfil']
+    assert set(perfil['etapas']) >= {'simulacion', 'clusters', 'duraciones', 'metricas', 'tabla'}
+    assert perfil['contadores']['pwl_f'] > 0 and perfil['contadores']['fwd_vec'] > 0
+    assert perfil['arcos_factibles']['intervalos'] == len(con)
+
+
+def test_con_perfil_false_ignora_la_variable_de_entorno(cargar_par, monkeypatch):
+    monkeypatch.setenv('TDVRP_PERFIL', '1')
+    instance_data, solution_data = cargar_par('C101_25')
+    assert 'perfil' in core.correr_analisis_instancia('C101_25', instance_data, solution_data).attrs
+    assert 'perfil' not in core.correr_analisis_instancia('C101_25', instance_data, solution_data, con_perfil=False).attrs
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_rendimiento_global(paired_data, workers):
+    global_df, global_metrics = core.correr_analisis_general(paired_data, workers=workers, con_perfil=True)
+    rendimiento = global_metrics['rendimiento']
+
+    assert sorted(rendimiento['por_instancia']['instance_name']) == sorted(paired_data)
+    assert rendimiento['por_instancia']['segundos'].is_monotonic_decreasing
+    assert rendimiento['contadores']['pwl_f'] > 0
+    assert 'rendimiento' not in core.correr_analisis_general(paired_data, workers=workers)[1]
+
+
+def test_el_perfil_es_de_cada_hilo():
+    vistos = {}
+
+    def otro_hilo():
+        perfilado.contar('pwl_f', 5)
+        vistos['perfil'] = perfilado.perfil_actual()
+
+    with perfilado.perfilar(True) as perfil:
+        hilo = threading.Thread(target=otro_hilo)
+        hilo.start()
+        hilo.join()
+        perfilado.contar('pwl_f', 2)
+
+    assert vistos['perfil'] is None
+    assert perfil.contadores['pwl_f'] == 2
+    assert perfilado.perfil_actual() is None
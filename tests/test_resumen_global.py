@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import tdvrp_analyzer as core
+from resumen_global import Momentos, ResumenGlobal, SketchCuantiles
+
+
+@pytest.fixture(scope='module')
+def valores():
+    rng = np.random.default_rng(7)
+    v = rng.lognormal(0.0, 0.5, 5000)
+    v[::97] = np.nan
+    v[::101] = 0.0
+    return v
+
+
+def _partes(valores, cortes=(0, 700, 701, 3100, 5000)):
+    return [valores[a:b] for a, b in zip(cortes[:-1], cortes[1:])]
+
+
+def test_momentos_combinados_igual_a_una_pasada(valores):
+    combinados = Momentos()
+    for parte in _partes(valores):
+        p = Momentos()
+        p.agregar(parte)
+        combinados.combinar(p)
+
+    validos = valores[~np.isnan(valores)]
+    assert combinados.n == validos.size
+    assert combinados.promedio() == pytest.approx(validos.mean(), rel=1e-12)
+    assert combinados.desvio() == pytest.approx(validos.std(ddof=1), rel=1e-9)
+    assert math.isnan(Momentos().promedio())
+
+
+def test_sketch_combinado_igual_a_una_pasada(valores):
+    una_pasada = SketchCuantiles()
+    una_pasada.agregar(valores)
+    combinado = SketchCuantiles()
+    for parte in _partes(valores):
+        s = SketchCuantiles()
+        s.agregar(parte)
+        combinado.combinar(s)
+
+    assert (combinado.n, combinado.ceros, combinado.buckets) == (una_pasada.n, una_pasada.ceros, una_pasada.buckets)
+    for q in (0.0, 0.1, 0.5, 0.9, 1.0):
+        assert combinado.cuantil(q) == una_pasada.cuantil(q)
+
+
+@pytest.mark.parametrize('q', [0.1, 0.25, 0.5, 0.75, 0.9, 0.99])
+def test_sketch_error_relativo_acotado(valores, q):
+    sketch = SketchCuantiles(error_relativo=0.01)
+    sketch.agregar(valores)
+    ordenados = np.sort(valores[~np.isnan(valores)])
+    exacto = ordenados[int(q * (len(ordenados) - 1))]
+    assert sketch.cuantil(q) == pytest.approx(exacto, rel=0.01, abs=1e-12)
+
+
+def test_sketch_con_otro_error_no_se_combina():
+    with pytest.raises(ValueError):
+        SketchCuantiles(0.01).combinar(SketchCuantiles(0.02))
+
+
+def test_resumen_global_igual_a_las_metricas_sobre_la_tabla(paired_data):
+    global_df, directas = core.correr_analisis_general(paired_data)
+    resumen = ResumenGlobal()
+    _, streaming = core.correr_analisis_general(paired_data, streaming=True, resumen=resumen)
+
+    # mismas claves en los dos modos ('agregados' es la tabla intermedia del modo sin streaming)
+    assert set(streaming) == set(directas) - {'agregados'}
+
+    for clave in ('total_instances', 'total_arcs', 'total_routes'):
+        assert streaming[clave] == directas[clave]
+    for clave in ('global_optimal_pct', 'global_optimal_pct_dist', 'global_avg_decile', 'global_avg_decile_dist'):
+        assert streaming[clave] == pytest.approx(directas[clave])
+    assert streaming['by_instance_type'].keys() == directas['by_instance_type'].keys()
+
+    comparacion = core.datos_comparacion_general(global_df, agregados=directas['agregados'])
+    pd.testing.assert_frame_equal(resumen.datos_comparacion()['deciles_by_type'],
+                                  comparacion['deciles_by_type'], check_dtype=False, check_categorical=False)
+
+
+def test_resumenes_parciales_combinados(paired_data):
+    pasos = [core._analizar_par(nombre, datos, 0.1, 10) for nombre, datos in paired_data.items()]
+    completo, primera, segunda = ResumenGlobal(), ResumenGlobal(), ResumenGlobal()
+    for i, (df, summary) in enumerate(pasos):
+        nombre = summary['instance_name']
+        completo.actualizar(nombre, summary['instance_type'], df, summary)
+        (primera if i < 2 else segunda).actualizar(nombre, summary['instance_type'], df, summary)
+    primera.combinar(segunda)
+
+    a, b = primera.metricas_generales(), completo.metricas_generales()
+    assert a['by_instance_type'] == b['by_instance_type']
+    assert a['total_arcs'] == b['total_arcs'] and a['total_routes'] == b['total_routes']
+    pd.testing.assert_frame_equal(primera.datos_comparacion()['ratio_quantiles_by_type'],
+                                  completo.datos_comparacion()['ratio_quantiles_by_type'])
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from build_pwl_arc import P, Z, fwd, fwd_vec
+from conftest import INSTANCIAS
+from simulacion import avanzar_rutas, contexto_instancia, simulacion, simulacion_lote, tramos_por_ruta
+
+
+@pytest.mark.parametrize('nombre', INSTANCIAS)
+def test_simulacion_lote_igual_a_escalar(cargar_par, nombre):
+    instance_data, solution_data = cargar_par(nombre)
+    res, error = simulacion(solution_data, instance_data)
+    tabla, reporte = simulacion_lote(solution_data, instance_data)
+
+    n_rutas = len(solution_data['routes'])
+    for esperado, tramos in zip(res, tramos_por_ruta(tabla, n_rutas)):
+        assert len(tramos) == len(esperado)
+        assert tramos['node_from'].tolist() == [a[0] for a in esperado]
+        assert tramos['node_to'].tolist() == [a[1] for a in esperado]
+        assert tramos['departure'] == pytest.approx([a[2] for a in esperado], rel=1e-12)
+        assert tramos['travel_time'] == pytest.approx([a[3] for a in esperado], rel=1e-12)
+        assert tramos['arrival'] == pytest.approx(tramos['departure'] + tramos['travel_time'])
+    assert error == int(not reporte['ok'].all())
+
+
+def test_varias_soluciones_en_un_lote(cargar_par):
+    instance_data, solution_data = cargar_par('R101_25')
+    corrida = {**solution_data, 'routes': [{**r, 't0': r['t0'] + 5.0} for r in solution_data['routes']]}
+    tabla, reporte = simulacion_lote([solution_data, corrida], instance_data)
+
+    n_rutas = len(solution_data['routes'])
+    for s, sol in enumerate([solution_data, corrida]):
+        res, _ = simulacion(sol, instance_data)
+        for esperado, tramos in zip(res, tramos_por_ruta(tabla, n_rutas, solucion=s)):
+            assert tramos['departure'] == pytest.approx([a[2] for a in esperado], rel=1e-12)
+            assert tramos['travel_time'] == pytest.approx([a[3] for a in esperado], rel=1e-12)
+    assert reporte['solution'].tolist() == [0] * n_rutas + [1] * n_rutas
+
+
+def test_fwd_vec_igual_a_fwd(cargar_par):
+    instance_data, _ = cargar_par('C101_25')
+    Zs, per = Z(instance_data), P(instance_data)
+    speeds = np.asarray(instance_data['cluster_speeds'], dtype=float)
+    rng = np.random.default_rng(0)
+    n = 500
+    D = rng.uniform(0, 100, n)
+    D[:10] = 0.0
+    x = rng.uniform(0, instance_data['horizon'][1], n)
+    VZ = speeds[rng.integers(0, len(speeds), n)]
+
+    esperado = [fwd(d, t, list(vz), Zs, per) for d, t, vz in zip(D, x, VZ)]
+    assert fwd_vec(D, x, VZ, Zs, per) == pytest.approx(esperado, rel=1e-12)
+
+
+def test_velocidades_por_ruta_igual_a_compartidas(cargar_par):
+    instance_data, solution_data = cargar_par('RC201_25')
+    ctx = contexto_instancia(instance_data)
+    paths = [r['path'] for r in solution_data['routes']]
+    t0 = [r['t0'] for r in solution_data['routes']]
+
+    compartidas = avanzar_rutas(ctx, paths, t0)
+    por_ruta = avanzar_rutas(ctx, paths, t0, speeds=np.repeat(ctx['speeds'][None], len(paths), axis=0))
+    for campo in ('departure', 'travel_time', 'wait', 'fin'):
+        np.testing.assert_array_equal(por_ruta[campo], compartidas[campo])
+
+    # una ruta más lenta solo cambia esa ruta
+    lentas = np.repeat(ctx['speeds'][None], len(paths), axis=0)
+    lentas[0] *= 0.5
+    mixtas = avanzar_rutas(ctx, paths, t0, speeds=lentas)
+    np.testing.assert_array_equal(mixtas['travel_time'][1:], compartidas['travel_time'][1:])
+    assert mixtas['fin'][0] > compartidas['fin'][0]
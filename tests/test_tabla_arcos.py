@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import tdvrp_analyzer as core
+
+
+@pytest.fixture(scope='module')
+def pares_con_prefijo_nuevo(paired_data):
+    # la misma instancia con un prefijo que no es de Dabia et al. (C, R, RC)
+    pares = dict(paired_data)
+    pares['X101_25'] = paired_data['C101_25']
+    return pares
+
+
+def test_tipos_de_datos_chicos(cargar_par):
+    instance_data, solution_data = cargar_par('C101_25')
+    df = core.correr_analisis_instancia('C101_25', instance_data, solution_data)
+
+    assert df['route_idx'].dtype == np.int16
+    assert df['decile_rank'].dtype == np.int8
+    assert isinstance(df['proximity_category'].dtype, pd.CategoricalDtype)
+    assert len(core.etiquetas_arcos(df)) == len(df)
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_prefijo_desconocido_no_se_pierde(pares_con_prefijo_nuevo, streaming):
+    global_df, global_metrics = core.correr_analisis_general(pares_con_prefijo_nuevo, streaming=streaming)
+
+    assert not global_df['instance_type'].isna().any()
+    assert global_df['instance_type'].cat.categories.tolist() == ['C', 'R', 'RC', 'X']
+    filas_x = global_df['instance_name'] == 'X101_25'
+    assert (global_df.loc[filas_x, 'instance_type'] == 'X').all()
+    assert global_metrics['by_instance_type']['X']['total_arcs'] == int(filas_x.sum())
+    assert global_metrics['total_arcs'] == len(global_df)
+
+
+def test_concatenar_no_modifica_las_tablas(paired_data):
+    pasos = [core._analizar_par(nombre, datos, 0.1, 10) for nombre, datos in paired_data.items()]
+    frames = [df for df, _ in pasos]
+    antes = [df['instance_name'].cat.categories.tolist() for df in frames]
+
+    global_df = core._concatenar_arcos(frames, list(paired_data))
+
+    assert [df['instance_name'].cat.categories.tolist() for df in frames] == antes
+    assert global_df['instance_name'].cat.categories.tolist() == list(paired_data)
+    assert len(global_df) == sum(len(df) for df in frames)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import tdvrp_analyzer as core
+from tabla_paginada import IndiceArcos, cantidad_paginas
+
+
+@pytest.fixture(scope='module')
+def global_df(paired_data):
+    return core.correr_analisis_general(paired_data)[0]
+
+
+def _filtrar_pandas(df, rutas=None, deciles=(0, 9), instancias=None, columna_decil='decile_rank'):
+    mascara = df[columna_decil].between(*deciles)
+    if rutas:
+        mascara &= df['route_idx'].isin(rutas)
+    if instancias:
+        mascara &= df['instance_name'].isin(instancias)
+    return np.flatnonzero(mascara.to_numpy())
+
+
+@pytest.mark.parametrize('filtros', [
+    {},
+    {'rutas': [0, 2]},
+    {'deciles': (0, 2)},
+    {'deciles': (3, 9), 'columna_decil': 'decile_rank_distance'},
+    {'instancias': ['R101_25', 'C205_25']},
+    {'instancias': ['C205_25', 'C101_25'], 'rutas': [1], 'deciles': (0, 5)},
+    {'instancias': ['no_existe']},
+])
+def test_filtrar_igual_a_pandas(global_df, filtros):
+    indice = IndiceArcos(global_df)
+    np.testing.assert_array_equal(indice.filtrar(**filtros), _filtrar_pandas(global_df, **filtros))
+
+
+def test_paginas_y_conteos(global_df):
+    indice = IndiceArcos(global_df)
+    posiciones = indice.filtrar(deciles=(0, 4))
+    tamano = 7
+
+    paginas = [indice.pagina(posiciones, k, tamano) for k in range(cantidad_paginas(len(posiciones), tamano))]
+    juntas = pd.concat(paginas)
+    assert len(juntas) == len(posiciones)
+    pd.testing.assert_frame_equal(juntas.drop(columns='arc_id'), global_df.iloc[posiciones])
+    assert (juntas['arc_id'] == juntas['node_from'].astype(str) + '-' + juntas['node_to'].astype(str)).all()
+
+    conteos = indice.conteos(posiciones)
+    esperados = global_df['decile_rank'].iloc[posiciones].value_counts().reindex(range(10), fill_value=0)
+    np.testing.assert_array_equal(conteos['por_decil'], esperados.to_numpy())
+    assert conteos['optimos_pct'] == pytest.approx((global_df['decile_rank'].iloc[posiciones] <= 2).mean() * 100)
+
+
+def test_tabla_de_una_instancia(cargar_par):
+    instance_data, solution_data = cargar_par('C101_25')
+    df = core.correr_analisis_instancia('C101_25', instance_data, solution_data)
+    indice = IndiceArcos(df)
+
+    assert indice.rutas_disponibles() == sorted(df['route_idx'].unique().tolist())
+    # sin columna instance_name el filtro por instancia se ignora
+    np.testing.assert_array_equal(indice.filtrar(instancias=['C101_25'], rutas=[0]), _filtrar_pandas(df, rutas=[0]))
+    assert indice.conteos(indice.filtrar(deciles=(9, 9)))['filas'] == (df['decile_rank'] == 9).sum()
+    assert cantidad_paginas(0, 50) == 1